@@ -0,0 +1,141 @@
+# asset_loader.py
+import heapq
+import itertools
+import queue
+import threading
+import pygame
+import config
+
+# Posted whenever a background job finishes, so an idle main loop wakes up to poll()
+ASSET_LOADED_EVENT = pygame.event.custom_type()
+
+
+class AssetLoader:
+    """Runs image decodes and other slow jobs on worker threads, lowest priority value first.
+
+    Workers only decode files; results are handed back to the main thread by
+    poll(), which converts surfaces to the display format and runs callbacks.
+    Requesting a key that is already queued adds the callback unless it is
+    registered already (callers re-request pending keys every frame) and,
+    if the new priority is more urgent, moves the job forward.
+    """
+
+    def __init__(self, workers=None):
+        self._heap = []  # (priority, sequence, key)
+        self._condition = threading.Condition()
+        self._jobs = {}  # key -> (func, convert) for queued jobs
+        self._priorities = {}  # key -> current priority of a queued job
+        self._callbacks = {}  # key -> [callback(key, result)] for queued or running jobs
+        self._results = queue.Queue()
+        self._sequence = itertools.count()
+        self._running = True
+        self._threads = []
+        for i in range(workers or config.ASSET_LOADER_WORKERS):
+            thread = threading.Thread(target=self._worker, name=f"AssetLoader-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, key, func, callback=None, priority=0, convert=False):
+        """Queue func() to run in the background; callback(key, result) runs on the main thread."""
+        with self._condition:
+            if key in self._callbacks:
+                if callback is not None and callback not in self._callbacks[key]:
+                    self._callbacks[key].append(callback)
+                if key in self._priorities and priority < self._priorities[key]:
+                    self._priorities[key] = priority
+                    heapq.heappush(self._heap, (priority, next(self._sequence), key))
+                    self._condition.notify()
+                return
+            self._callbacks[key] = [callback] if callback is not None else []
+            self._jobs[key] = (func, convert)
+            self._priorities[key] = priority
+            heapq.heappush(self._heap, (priority, next(self._sequence), key))
+            self._condition.notify()
+
+    def request_image(self, key, path, callback=None, priority=0):
+        """Decode an image file in the background; the callback gets a convert_alpha()'d surface."""
+        self.submit(key, lambda: pygame.image.load(path), callback, priority, convert=True)
+
+    def is_pending(self, key):
+        with self._condition:
+            return key in self._callbacks
+
+    def cancel(self, key):
+        """Drop a job that has not started yet. Returns True if it was removed."""
+        with self._condition:
+            if key not in self._jobs:
+                return False
+            del self._jobs[key]
+            del self._priorities[key]
+            del self._callbacks[key]
+            return True
+
+    def _worker(self):
+        while True:
+            with self._condition:
+                while self._running and not self._heap:
+                    self._condition.wait()
+                if not self._running:
+                    return
+                priority, _, key = heapq.heappop(self._heap)
+                # Skip entries superseded by a reprioritization or a cancel
+                if self._priorities.get(key) != priority or key not in self._jobs:
+                    continue
+                del self._priorities[key]
+                func, convert = self._jobs.pop(key)
+
+            try:
+                result, error = func(), None
+            except Exception as e:
+                result, error = None, e
+            self._results.put((key, result, error, convert))
+            try:
+                pygame.event.post(pygame.event.Event(ASSET_LOADED_EVENT))
+            except pygame.error:
+                pass  # Display already shut down
+
+    def poll(self, max_results=None):
+        """Hand finished jobs to their callbacks. Call from the main thread once per frame."""
+        max_results = max_results or config.ASSET_MAX_RESULTS_PER_FRAME
+        handled = 0
+        while handled < max_results:
+            try:
+                key, result, error, convert = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if error is not None:
+                print(f"AssetLoader: Failed to load {key}: {error}")
+            elif convert and result is not None:
+                try:
+                    result = result.convert_alpha()
+                except pygame.error as e:
+                    print(f"AssetLoader: Could not convert {key}: {e}")
+                    result = None
+            with self._condition:
+                callbacks = self._callbacks.pop(key, [])
+            for callback in callbacks:
+                try:
+                    callback(key, result)
+                except Exception as e:
+                    print(f"AssetLoader: Callback for {key} failed: {e}")
+            handled += 1
+        return handled
+
+    def has_results(self):
+        return not self._results.empty()
+
+    def is_idle(self):
+        """True when nothing is queued, running or waiting to be polled."""
+        with self._condition:
+            return not self._callbacks and self._results.empty()
+
+    def stop(self, timeout=None):
+        """Stop the workers and wait for running decodes to finish; queued jobs are discarded."""
+        with self._condition:
+            self._running = False
+            self._heap.clear()
+            self._jobs.clear()
+            self._priorities.clear()
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join(timeout if timeout is not None else config.ASSET_LOADER_STOP_TIMEOUT)
@@ -0,0 +1,137 @@
+# async_db.py
+import queue
+import threading
+from concurrent.futures import Future
+import pygame
+import database
+
+# Posted whenever a database job with a callback finishes, so an idle main loop wakes up to poll()
+DB_RESULT_EVENT = pygame.event.custom_type()
+
+
+class AsyncDatabase:
+    """Runs every Database call on one owner thread so the game loop never waits on SQLite.
+
+    submit() queues a call and returns a Future; an optional callback gets the
+    result on the main thread from poll(). Jobs run in submission order, so a
+    read queued after a write sees that write. Any other attribute is a
+    blocking proxy for the Database method of the same name, for the few
+    one-off dialogs that need an answer immediately; every such call is
+    logged so new frame stalls show up.
+    """
+
+    def __init__(self, db_path=None, write_behind=None, instrument=None):
+        self._requests = queue.Queue()
+        self._results = queue.Queue()
+        self._db = None
+        self._ready = threading.Event()
+        self._init_error = None
+        self.completed = 0
+        self.cancelled = 0
+        self.blocking_calls = 0
+        self._thread = threading.Thread(target=self._worker, args=(db_path, write_behind, instrument),
+                                        name="DatabaseWorker", daemon=True)
+        self._thread.start()
+        # Opening and migrating the database happens on the worker, but callers need it ready
+        self._ready.wait()
+        if self._init_error is not None:
+            raise self._init_error
+
+    def _worker(self, db_path, write_behind, instrument):
+        try:
+            self._db = database.Database(db_path, write_behind, instrument)
+        except Exception as e:
+            self._init_error = e
+            self._ready.set()
+            return
+        self._ready.set()
+
+        while True:
+            try:
+                job = self._requests.get(timeout=self._db.flush_interval or None)
+            except queue.Empty:
+                self._db.flush_if_due()
+                continue
+            if job is None:
+                break
+            future, method, args, kwargs, callback = job
+            if not future.set_running_or_notify_cancel():
+                self.cancelled += 1  # Cancelled while queued; nothing to run or report
+                continue
+            try:
+                future.set_result(getattr(self._db, method)(*args, **kwargs))
+            except Exception as e:
+                future.set_exception(e)
+            self.completed += 1
+            if callback is not None:
+                self._results.put((method, future, callback))
+                try:
+                    pygame.event.post(pygame.event.Event(DB_RESULT_EVENT))
+                except pygame.error:
+                    pass  # Display already shut down
+            if self._requests.empty():
+                self._db.flush_if_due()
+
+    def submit(self, method, *args, callback=None, **kwargs):
+        """Queue db.method(*args, **kwargs); callback(result) runs on the main thread in poll().
+
+        Cancelling the Future before the worker reaches it skips the call and its callback.
+        """
+        future = Future()
+        self._requests.put((future, method, args, kwargs, callback))
+        return future
+
+    def call(self, method, *args, **kwargs):
+        """Run db.method(*args, **kwargs) on the worker and wait for the result."""
+        return self.submit(method, *args, **kwargs).result()
+
+    def __getattr__(self, name):
+        if name.startswith('_') or not callable(getattr(database.Database, name, None)):
+            raise AttributeError(name)
+        def blocking_call(*args, **kwargs):
+            self.blocking_calls += 1
+            print(f"AsyncDatabase: blocking call to {name}(); use submit() with a callback instead")
+            return self.call(name, *args, **kwargs)
+        return blocking_call
+
+    def poll(self, max_results=None):
+        """Hand finished jobs to their callbacks. Call from the main thread once per frame."""
+        handled = 0
+        while max_results is None or handled < max_results:
+            try:
+                method, future, callback = self._results.get_nowait()
+            except queue.Empty:
+                break
+            error = future.exception()
+            if error is not None:
+                print(f"AsyncDatabase: {method} failed: {error}")
+            else:
+                try:
+                    callback(future.result())
+                except Exception as e:
+                    print(f"AsyncDatabase: Callback for {method} failed: {e}")
+            handled += 1
+        return handled
+
+    def has_results(self):
+        return not self._results.empty()
+
+    def flush(self):
+        """Commit queued write-behind mutations without waiting."""
+        return self.submit('flush')
+
+    def stats(self):
+        """Counters for debugging and profiling."""
+        stats = {'queued': self._requests.qsize(), 'jobs': self.completed, 'cancelled': self.cancelled,
+                 'blocking': self.blocking_calls}
+        if self._db is not None:
+            stats.update(self._db.stats())
+        return stats
+
+    def close(self):
+        """Finish queued jobs, flush, close the connection and stop the worker."""
+        if not self._thread.is_alive():
+            return
+        self.call('close')
+        self._requests.put(None)
+        self._thread.join(timeout=5)
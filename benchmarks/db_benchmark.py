@@ -0,0 +1,184 @@
+# db_benchmark.py
+"""Timeline query benchmark for the game database.
+
+Builds a synthetic campaign (maps, tokens with a position history row per
+turn, timeline events and token actions) in a temporary SQLite file, then
+times the hot timeline queries twice: with the schema's indexes and history
+keyframes dropped ("before") and after the migrations have recreated them
+("after"). Keyframes dropped for "before" are rebuilt lazily by the first
+reads, as they would be in the game.
+
+Usage:
+    python benchmarks/db_benchmark.py                         # JSON to stdout
+    python benchmarks/db_benchmark.py --turns 2000 -o db.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import database  # noqa: E402
+import migrations  # noqa: E402
+import token_history  # noqa: E402
+
+RANDOM_SEED = 1234
+
+
+def populate(db, maps, tokens_per_map, turns, events_per_turn):
+    """Fill an empty database with one world of synthetic campaign data. Returns its ids."""
+    rng = random.Random(RANDOM_SEED)
+    cur = db.conn.cursor()
+    cur.execute("INSERT INTO worlds (name) VALUES (?)", ("Benchmark World",))
+    world_id = cur.lastrowid
+    map_ids, map_token_ids = [], []
+    for m in range(maps):
+        cur.execute("INSERT INTO maps (world_id, name, image_path) VALUES (?, ?, ?)",
+                    (world_id, f"Map {m}", f"map_{m}.png"))
+        map_ids.append(cur.lastrowid)
+    for i in range(maps * tokens_per_map):
+        cur.execute("INSERT INTO tokens (name, image_path) VALUES (?, ?)", (f"Token {i}", "token.png"))
+        token_id = cur.lastrowid
+        cur.execute("INSERT INTO map_tokens (map_id, token_id, x, y) VALUES (?, ?, ?, ?)",
+                    (map_ids[i // tokens_per_map], token_id, 0, 0))
+        map_token_ids.append(cur.lastrowid)
+
+    history = ((map_ids[i // tokens_per_map], map_token_id, turn, rng.randrange(4096), rng.randrange(4096), 10)
+               for turn in range(turns) for i, map_token_id in enumerate(map_token_ids))
+    cur.executemany("INSERT INTO token_history_deltas (map_id, map_token_id, turn_number, x, y, hp) "
+                    "VALUES (?, ?, ?, ?, ?, ?)", history)
+    token_history.rebuild_keyframes(db.conn)
+    actions = ((map_token_id, turn, "moved", "move")
+               for turn in range(0, turns, 5) for map_token_id in map_token_ids)
+    cur.executemany("INSERT INTO token_actions (map_token_id, turn_number, action_text, action_type) "
+                    "VALUES (?, ?, ?, ?)", actions)
+    events = ((world_id, rng.choice(map_ids), turn, "note", f"Event {turn}.{e}")
+              for turn in range(turns) for e in range(events_per_turn))
+    cur.executemany("INSERT INTO timeline_events (world_id, map_id, turn_number, event_type, event_title) "
+                    "VALUES (?, ?, ?, ?, ?)", events)
+    db.conn.commit()
+    return world_id, map_ids, map_token_ids
+
+
+def queries(db, world_id, map_ids, map_token_ids, turns):
+    """name -> zero-argument callable running one randomly parameterized query."""
+    rng = random.Random(RANDOM_SEED)
+    return {
+        'token_position_at_turn': lambda: db.get_token_position_at_turn(
+            rng.choice(map_token_ids), rng.randrange(turns)),
+        'all_token_positions_at_turn': lambda: db.get_all_token_positions_at_turn(
+            rng.choice(map_ids), rng.randrange(turns)),
+        'timeline_events_range': lambda: db.get_timeline_events(
+            world_id, *sorted((rng.randrange(turns), rng.randrange(turns)))),
+        'token_actions_at_turn': lambda: db.get_token_actions(
+            rng.choice(map_token_ids), rng.randrange(turns)),
+        'map_tokens': lambda: db.get_map_tokens_with_history(rng.choice(map_ids)),
+    }
+
+
+def time_queries(named_queries, repeats):
+    results = {}
+    for name, query in named_queries.items():
+        times = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            query()
+            times.append((time.perf_counter() - start) * 1000.0)
+        times.sort()
+        results[name] = {
+            'median_ms': round(times[len(times) // 2], 3),
+            'max_ms': round(times[-1], 3),
+        }
+    return results
+
+
+def drop_indexes(db):
+    """Remove every explicit index and history keyframe and roll the schema back to before the index migration."""
+    names = [row[0] for row in db.conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL")]
+    for name in names:
+        db.conn.execute(f"DROP INDEX {name}")
+    db.conn.execute("DELETE FROM token_history_keyframes")
+    db.conn.execute("PRAGMA user_version = 1")
+    db.conn.commit()
+    return names
+
+
+def run(maps, tokens_per_map, turns, events_per_turn, repeats, work_dir):
+    path = os.path.join(work_dir, "db_benchmark.db")
+    if os.path.exists(path):
+        os.remove(path)
+    db = database.Database(path)
+    try:
+        start = time.perf_counter()
+        ids = populate(db, maps, tokens_per_map, turns, events_per_turn)
+        populate_s = time.perf_counter() - start
+
+        dropped = drop_indexes(db)
+        before = time_queries(queries(db, *ids, turns), repeats)
+
+        db.flush()
+        start = time.perf_counter()
+        migrations.migrate(db.conn)
+        migrate_s = time.perf_counter() - start
+        after = time_queries(queries(db, *ids, turns), repeats)
+    finally:
+        db.close()
+        os.remove(path)
+
+    comparison = {}
+    for name in before:
+        old, new = before[name]['median_ms'], after[name]['median_ms']
+        comparison[name] = {'before': before[name], 'after': after[name],
+                            'speedup': round(old / new, 1) if new else None}
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'maps': maps,
+            'tokens': maps * tokens_per_map,
+            'turns': turns,
+            'history_rows': maps * tokens_per_map * turns,
+            'repeats': repeats,
+            'populate_s': round(populate_s, 2),
+            'migrate_s': round(migrate_s, 2),
+            'indexes': dropped,
+        },
+        'queries': comparison,
+    }
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--maps", type=int, default=4, help="Maps in the synthetic world")
+    parser.add_argument("--tokens", type=int, default=50, help="Tokens per map")
+    parser.add_argument("--turns", type=int, default=500, help="Turns of position history per token")
+    parser.add_argument("--events", type=int, default=2, help="Timeline events per turn")
+    parser.add_argument("--repeats", type=int, default=10, help="Timed runs of each query")
+    parser.add_argument("--work-dir", help="Directory for the temporary database")
+    parser.add_argument("-o", "--output", help="Write JSON results to this file instead of stdout")
+    args = parser.parse_args()
+
+    work_dir = os.path.abspath(args.work_dir or tempfile.gettempdir())
+    os.makedirs(work_dir, exist_ok=True)
+    report = run(args.maps, args.tokens, args.turns, args.events, args.repeats, work_dir)
+
+    for name, result in report['queries'].items():
+        print(f"{name:<30}{result['before']['median_ms']:>10.2f} ms -> {result['after']['median_ms']:>8.2f} ms",
+              file=sys.stderr)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,159 @@
+# records_benchmark.py
+"""Map load benchmark: positional tuples copied into dicts vs. slotted records.
+
+Fills a temporary database with one map holding N tokens, then loads the map
+the way GameApp.load_map_tokens used to (fetch tuples, copy each row into a
+fresh dict) and the way it does now (MapTokenRecords from the row factory,
+kept as they are). Reports the median load time and the memory held by the
+loaded token list, measured with tracemalloc.
+
+Usage:
+    python benchmarks/records_benchmark.py                  # JSON to stdout
+    python benchmarks/records_benchmark.py --tokens 5000 -o records.json
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import database  # noqa: E402
+
+MAP_TOKENS_QUERY = '''
+    SELECT mt.id, mt.token_id, t.name, t.image_path, t.size, t.color, t.type,
+           mt.x, mt.y, mt.rotation, mt.active, mt.initiative, mt.has_moved,
+           t.current_hp, t.max_hp
+    FROM map_tokens mt
+    JOIN tokens t ON mt.token_id = t.id
+    WHERE mt.map_id = ?
+    ORDER BY mt.initiative DESC
+'''
+
+
+def populate(db, tokens):
+    """One world, one map and `tokens` tokens placed on it. Returns the map id."""
+    cur = db.conn.cursor()
+    cur.execute("INSERT INTO worlds (name) VALUES (?)", ("Benchmark World",))
+    cur.execute("INSERT INTO maps (world_id, name, image_path) VALUES (?, ?, ?)",
+                (cur.lastrowid, "Battlefield", "battlefield.png"))
+    map_id = cur.lastrowid
+    for i in range(tokens):
+        cur.execute("INSERT INTO tokens (name, image_path, max_hp, current_hp) VALUES (?, ?, ?, ?)",
+                    (f"Token {i}", "token.png", 10, 10))
+        cur.execute("INSERT INTO map_tokens (map_id, token_id, x, y, initiative) VALUES (?, ?, ?, ?, ?)",
+                    (map_id, cur.lastrowid, i % 64, i // 64, i % 20))
+    db.conn.commit()
+    return map_id
+
+
+def load_as_dicts(db, map_id):
+    """The pre-records load path: tuples from fetchall(), then one dict per row."""
+    db.cursor.execute(MAP_TOKENS_QUERY, (map_id,))
+    tokens_on_map = []
+    for token in db.cursor.fetchall():
+        tokens_on_map.append({
+            'map_token_id': token[0],
+            'token_id': token[1],
+            'name': token[2],
+            'image_path': token[3],
+            'size': token[4],
+            'color': token[5],
+            'type': token[6],
+            'x': token[7],
+            'y': token[8],
+            'rotation': token[9],
+            'active': token[10],
+            'initiative': token[11],
+            'has_moved': token[12],
+            'current_hp': token[13],
+            'max_hp': token[14]
+        })
+    return tokens_on_map
+
+
+def load_as_records(db, map_id):
+    return db.get_map_tokens_with_history(map_id)
+
+
+def measure(load, db, map_id, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        load(db, map_id)
+        times.append((time.perf_counter() - start) * 1000.0)
+    times.sort()
+
+    # Memory still held by the loaded list, which is what the game keeps around
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tokens = load(db, map_id)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    held = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    return {
+        'tokens': len(tokens),
+        'median_ms': round(times[len(times) // 2], 3),
+        'held_kb': round(held / 1024, 1),
+    }
+
+
+def run(tokens, repeats, work_dir):
+    path = os.path.join(work_dir, "records_benchmark.db")
+    if os.path.exists(path):
+        os.remove(path)
+    db = database.Database(path)
+    try:
+        map_id = populate(db, tokens)
+        dicts = measure(load_as_dicts, db, map_id, repeats)
+        records = measure(load_as_records, db, map_id, repeats)
+    finally:
+        db.close()
+        os.remove(path)
+
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'tokens': tokens,
+            'repeats': repeats,
+        },
+        'dicts': dicts,
+        'records': records,
+        'speedup': round(dicts['median_ms'] / records['median_ms'], 2) if records['median_ms'] else None,
+        'memory_saved_kb': round(dicts['held_kb'] - records['held_kb'], 1),
+    }
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tokens", type=int, default=1000, help="Tokens on the benchmark map")
+    parser.add_argument("--repeats", type=int, default=20, help="Timed loads of each kind")
+    parser.add_argument("--work-dir", help="Directory for the temporary database")
+    parser.add_argument("-o", "--output", help="Write JSON results to this file instead of stdout")
+    args = parser.parse_args()
+
+    work_dir = os.path.abspath(args.work_dir or tempfile.gettempdir())
+    os.makedirs(work_dir, exist_ok=True)
+    report = run(args.tokens, args.repeats, work_dir)
+
+    for name in ('dicts', 'records'):
+        result = report[name]
+        print(f"{name:<10}{result['median_ms']:>10.2f} ms {result['held_kb']:>10.1f} KB", file=sys.stderr)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,315 @@
+# render_benchmark.py
+"""Headless rendering benchmark for GameApp's draw path.
+
+Runs GameApp under SDL's dummy video driver against synthetic maps and
+reports frames per second, frame-time percentiles and peak memory per
+scenario as JSON. Each scenario runs in its own process so peak memory is
+not polluted by earlier scenarios.
+
+Usage:
+    python benchmarks/render_benchmark.py                    # all scenarios, JSON to stdout
+    python benchmarks/render_benchmark.py --quick -o new.json
+    python benchmarks/render_benchmark.py --compare base.json new.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# name: (map size in pixels, tokens, location icons)
+SCENARIOS = {
+    "map1k_empty": (1024, 0, 0),
+    "map4k_empty": (4096, 0, 0),
+    "map16k_empty": (16384, 0, 0),
+    "map4k_tokens100": (4096, 100, 0),
+    "map4k_tokens1000": (4096, 1000, 0),
+    "map4k_locations1000": (4096, 0, 1000),
+    "map4k_locations5000": (4096, 0, 5000),
+    "map16k_tokens1000_locations5000": (16384, 1000, 5000),
+}
+QUICK_SCENARIOS = ["map1k_empty", "map4k_tokens100", "map4k_locations1000"]
+
+TOKEN_IMAGE_VARIANTS = 8
+REGRESSION_THRESHOLD = 0.10  # Relative p95 increase reported as a regression
+
+
+def make_map_image(path, size):
+    """Write a size x size PNG with enough structure that tiles don't compress to nothing."""
+    from PIL import Image, ImageDraw
+    pattern = Image.new("RGB", (256, 256))
+    draw = ImageDraw.Draw(pattern)
+    for i in range(0, 256, 16):
+        draw.rectangle([i, 0, i + 7, 255], fill=(40 + i // 2, 90, 60))
+        draw.line([0, i, 255, 255 - i], fill=(200, 180, 120), width=3)
+    image = pattern.resize((size, size), Image.NEAREST)
+    image.save(path, compress_level=1)
+
+
+def prepare_assets(work_dir, size):
+    """Create the map image and token images once per work directory; returns the map path."""
+    import pygame
+    maps_dir = os.path.join(work_dir, "bench_maps")
+    assets_dir = os.path.join(work_dir, "assets")
+    os.makedirs(maps_dir, exist_ok=True)
+    os.makedirs(assets_dir, exist_ok=True)
+    map_path = os.path.join(maps_dir, f"bench_{size}.png")
+    if not os.path.exists(map_path):
+        make_map_image(map_path, size)
+    for i in range(TOKEN_IMAGE_VARIANTS):
+        token_path = os.path.join(assets_dir, f"bench_token_{i}.png")
+        if not os.path.exists(token_path):
+            surface = pygame.Surface((128, 128), pygame.SRCALPHA)
+            pygame.draw.circle(surface, (60 + i * 24, 200 - i * 20, 90, 255), (64, 64), 60)
+            pygame.image.save(surface, token_path)
+    return map_path
+
+
+def synthetic_tokens(count, size, grid_size):
+    cells = max(1, size // grid_size)
+    return [{
+        'map_token_id': i,
+        'name': f"Token {i}",
+        'image_path': f"bench_token_{i % TOKEN_IMAGE_VARIANTS}.png",
+        'x': (i * 7919) % cells,
+        'y': (i * 104729 // cells) % cells,
+    } for i in range(count)]
+
+
+def synthetic_locations(count, size):
+    return [{
+        'id': i,
+        'name': f"Location {i}",
+        'x': (i * 7907) % max(1, size - 32),
+        'y': (i * 6101) % max(1, size - 32),
+    } for i in range(count)]
+
+
+def prepare_scenario(name, work_dir):
+    """Generate images and build the map's tile pyramid so the measured run starts from a warm disk cache."""
+    os.chdir(work_dir)
+    sys.path.insert(0, REPO_DIR)
+    import pygame
+    import map_tiles
+    pygame.init()
+    map_path = prepare_assets(work_dir, SCENARIOS[name][0])
+    start = time.perf_counter()
+    built = map_tiles.TilePyramid(map_path).ensure()
+    return {'pyramid_ready': built, 'prepare_seconds': time.perf_counter() - start}
+
+
+def wait_for_loader(app, timeout):
+    """Run frames until background tile/sprite loading has settled."""
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        app.process_events()
+        app.update(1 / 60)
+        app.draw()
+        if app.map_view.tile_pyramid and app.asset_loader.is_idle():
+            return True
+        time.sleep(0.005)
+    return False
+
+
+def run_scenario(name, frames, work_dir, retained=False):
+    """Benchmark one scenario in this process and return its result dict.
+
+    By default every frame is a full repaint (worst case); with retained=True
+    the app's normal dirty-region rendering decides what gets redrawn.
+    """
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    os.chdir(work_dir)  # config keeps data/ relative to the working directory
+    sys.path.insert(0, REPO_DIR)
+    import resource
+    import pygame
+    import config
+    import main
+
+    size, token_count, location_count = SCENARIOS[name]
+    pygame.init()
+    map_path = prepare_assets(work_dir, size)
+
+    app = main.GameApp()
+    app.profiler.enabled = True
+    grid_size = config.DEFAULT_GRID_SIZE
+    setup_start = time.perf_counter()
+    app.map_view.load_map_data({'image_path': map_path, 'grid_size': grid_size})
+    app.tokens_on_map = synthetic_tokens(token_count, size, grid_size)
+    app.locations_on_map = synthetic_locations(location_count, size)
+    app.ui_manager.update_token_list(app.tokens_on_map)
+    settled = wait_for_loader(app, timeout=600)
+    setup_seconds = time.perf_counter() - setup_start
+
+    # Scripted camera: a steady diagonal pan with a zoom step every second,
+    # so every frame has to re-render the map
+    view = app.map_view
+    frame_times = []
+    start = time.perf_counter()
+    for frame in range(frames):
+        frame_start = time.perf_counter()
+        if frame % 60 == 0:
+            view.zoom_by_steps(-1 if (frame // 60) % 4 < 2 else 1)
+        view.camera_x += 7 / view.zoom_level
+        view.camera_y += 5 / view.zoom_level
+        if view.camera_x >= view.map_pixel_width - view.map_area_rect.width / view.zoom_level:
+            view.camera_x = view.camera_y = 0
+        view.clamp_camera()
+        if not retained:
+            app.mark_dirty()
+            view.mark_dirty()
+        app.profiler.begin_frame()
+        events = app.process_events()
+        app.update(1 / 60)
+        app.draw(events)
+        app.profiler.end_frame()
+        frame_times.append((time.perf_counter() - frame_start) * 1000.0)
+    elapsed = time.perf_counter() - start
+
+    ordered = sorted(frame_times)
+
+    def percentile(percent):
+        return ordered[min(len(ordered) - 1, int(round(percent / 100.0 * (len(ordered) - 1))))]
+
+    return {
+        'map_size': size,
+        'tokens': token_count,
+        'locations': location_count,
+        'frames': frames,
+        'retained': retained,
+        'fps': frames / elapsed if elapsed > 0 else 0.0,
+        'frame_ms_p50': percentile(50),
+        'frame_ms_p95': percentile(95),
+        'frame_ms_p99': percentile(99),
+        'frame_ms_max': ordered[-1],
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0,
+        'setup_seconds': setup_seconds,
+        'assets_settled': settled,
+        'sections_p95_ms': {section: stats['p95'] for section, stats in app.profiler.summary().items()},
+    }
+
+
+def _run_child(name, arguments):
+    command = [sys.executable, os.path.abspath(__file__)] + arguments
+    env = dict(os.environ, SDL_VIDEODRIVER="dummy", SDL_AUDIODRIVER="dummy")
+    completed = subprocess.run(command, capture_output=True, text=True, env=env)
+    # The app prints freely; the result is the last JSON line of stdout
+    lines = [line for line in completed.stdout.splitlines() if line.startswith("{")]
+    if completed.returncode != 0 or not lines:
+        print(f"Scenario {name} failed:\n{completed.stderr[-2000:]}", file=sys.stderr)
+        return {'error': completed.stderr[-500:] or "no result"}
+    return json.loads(lines[-1])
+
+
+def run_in_subprocess(name, frames, work_dir, retained=False):
+    # Building the pyramid happens in its own process so it doesn't count towards peak memory
+    prepared = _run_child(name, ["--prepare-scenario", name, "--work-dir", work_dir])
+    if 'error' in prepared:
+        return prepared
+    arguments = ["--run-scenario", name, "--frames", str(frames), "--work-dir", work_dir]
+    if retained:
+        arguments.append("--retained")
+    result = _run_child(name, arguments)
+    if 'error' not in result:
+        result['prepare_seconds'] = prepared['prepare_seconds']
+    return result
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(base_path, new_path, threshold=REGRESSION_THRESHOLD):
+    """Print a per-scenario comparison; returns True if any p95 regressed past the threshold."""
+    with open(base_path) as f:
+        base = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    print(f"{'scenario':<34}{'fps':>16}{'p95 ms':>20}{'peak MB':>18}")
+    regressed = False
+    for name, result in new['scenarios'].items():
+        old = base['scenarios'].get(name)
+        if not old or 'error' in old or 'error' in result:
+            print(f"{name:<34}  (no comparable result)")
+            continue
+
+        def cell(key, fmt):
+            change = (result[key] - old[key]) / old[key] * 100 if old[key] else 0.0
+            return f"{result[key]:{fmt}} ({change:+.0f}%)"
+
+        flag = ""
+        if old['frame_ms_p95'] and result['frame_ms_p95'] > old['frame_ms_p95'] * (1 + threshold):
+            regressed = True
+            flag = "  REGRESSION"
+        print(f"{name:<34}{cell('fps', '.1f'):>16}{cell('frame_ms_p95', '.2f'):>20}{cell('peak_rss_mb', '.0f'):>18}{flag}")
+    return regressed
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS), help="Run only these scenarios")
+    parser.add_argument("--quick", action="store_true", help="Run a small subset of scenarios")
+    parser.add_argument("--frames", type=int, default=300, help="Measured frames per scenario")
+    parser.add_argument("--retained", action="store_true",
+                        help="Let retained rendering skip unchanged regions instead of forcing full repaints")
+    parser.add_argument("--work-dir", help="Directory for generated maps and tile caches (reused between runs)")
+    parser.add_argument("-o", "--output", help="Write JSON results to this file instead of stdout")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "NEW"), help="Compare two result files")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help="Relative p95 increase counted as a regression in --compare")
+    parser.add_argument("--run-scenario", help=argparse.SUPPRESS)
+    parser.add_argument("--prepare-scenario", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(1 if compare(args.compare[0], args.compare[1], args.threshold) else 0)
+
+    work_dir = os.path.abspath(args.work_dir or os.path.join(tempfile.gettempdir(), "world_builder_bench"))
+    os.makedirs(work_dir, exist_ok=True)
+
+    if args.prepare_scenario:
+        print(json.dumps(prepare_scenario(args.prepare_scenario, work_dir)))
+        return
+
+    if args.run_scenario:
+        result = run_scenario(args.run_scenario, args.frames, work_dir, args.retained)
+        print(json.dumps(result))
+        return
+
+    names = args.scenario or (QUICK_SCENARIOS if args.quick else list(SCENARIOS))
+    results = {}
+    for name in names:
+        print(f"Running {name}...", file=sys.stderr)
+        results[name] = run_in_subprocess(name, args.frames, work_dir, args.retained)
+
+    report = {
+        'meta': {
+            'revision': git_revision(),
+            'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S"),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'frames': args.frames,
+            'retained': args.retained,
+        },
+        'scenarios': results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+        print(f"Results written to {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -5,6 +5,11 @@ import os
 SCREEN_WIDTH = 1200
 SCREEN_HEIGHT = 800
 
+# Rendering
+RENDER_MODE = "retained"  # "retained" redraws only changed regions, "immediate" repaints every frame
+TARGET_FPS = 60
+IDLE_WAIT_MS = 500  # Longest time the main loop sleeps waiting for input when nothing changes
+
 # UI Layout dimensions
 TOP_BAR_HEIGHT = 40
 RIGHT_PANEL_WIDTH = 250
@@ -40,6 +45,20 @@ TOKENS_DIR = os.path.join(DATA_DIR, "tokens")
 NOTES_DIR = os.path.join(DATA_DIR, "notes")
 AUDIO_DIR = os.path.join(DATA_DIR, "audio")
 DB_PATH = os.path.join(DATA_DIR, "game_data.db")
+DB_JOURNAL_MODE = "WAL"  # Readers don't block on writes
+DB_SYNCHRONOUS = "NORMAL"  # fsync at checkpoints instead of every commit (safe with WAL)
+DB_WRITE_BEHIND = True  # Batch mutations into one transaction per flush
+DB_FLUSH_INTERVAL = 0.25  # Seconds queued writes may wait before being committed
+DB_INSTRUMENT = False  # Time every statement (query_stats.py) and print a summary at exit, when GameApp.shutdown closes the database
+DB_SLOW_QUERY_MS = 20.0  # Instrumented statements slower than this are logged with their query plan
+DB_QUERY_SAMPLES = 1000  # Latest latencies kept per statement for the p95
+DB_QUERY_REPORT_LIMIT = 20  # Statements listed in the summary, most total time first
+HISTORY_KEYFRAME_INTERVAL = 16  # Turns between full token-state keyframes in the position history
+TIMELINE_EVENT_WINDOW = 50  # Turns either side of the viewed turn whose timeline events are loaded
+TOKEN_POSITIONS_CACHE_MAX_RECORDS = 20000  # Token positions (one per token per turn) the timeline keeps from database reads
+SCRUB_PREFETCH_LOOKAHEAD = 0.25  # Seconds of scrub motion ahead of the slider handle to load
+SCRUB_PREFETCH_MAX_TURNS = 12  # Most turns queued ahead of the handle at once
+SCRUB_PREFETCH_SAMPLES = 6  # Recent handle positions used to estimate scrub direction and speed
 
 # Ensure directories exist
 for directory in [DATA_DIR, MAPS_DIR, TOKENS_DIR, NOTES_DIR, AUDIO_DIR]:
@@ -58,6 +77,7 @@ except:
     DEFAULT_FONT = pygame.font.SysFont(None, 24)
     SMALL_FONT = pygame.font.SysFont(None, 18)
     LARGE_FONT = pygame.font.SysFont(None, 32)
+TEXT_CACHE_MAX_ENTRIES = 1024  # Rendered text surfaces kept by text_cache
 
 # Token settings
 DEFAULT_TOKEN_SIZE = 50
@@ -72,6 +92,21 @@ TOKEN_COLORS = {
 DEFAULT_MAP_SCALE = 1.0
 MIN_MAP_SCALE = 0.25
 MAX_MAP_SCALE = 4.0
+MAP_TILE_SIZE = 512  # Pixels per side of a cached map tile
+MAP_TILES_DIR = os.path.join(MAPS_DIR, "tiles")
+ZOOM_STEPS_PER_OCTAVE = 8  # Zoom levels between each doubling of scale
+SCALED_SURFACE_CACHE_MB = 128  # Budget for cached scaled map tiles and grid overlays
+SPRITE_CACHE_MAX_ENTRIES = 512  # Scaled token sprites kept across sizes and states
+SPRITE_MTIME_CHECK_INTERVAL = 2.0  # Seconds between checks for changed token images
+SPATIAL_INDEX_CELL_SIZE = 256  # Map pixels per bucket of the token/location spatial index
+LOCATION_MARKER_SIZE = 32  # Map pixels covered by a location marker
+
+# Background asset loading
+ASSET_LOADER_WORKERS = 2
+ASSET_LOADER_STOP_TIMEOUT = 2.0  # Seconds to wait for each worker's running decode on exit
+ASSET_MAX_RESULTS_PER_FRAME = 16  # Loaded images swapped in per frame, to avoid hitches
+ASSET_PREFETCH_PRIORITY = 100  # Queue priority for off-screen images (lower loads first)
+ASSET_PLACEHOLDER_COLOR = (60, 60, 60)
 
 # Animation settings
 ANIMATION_SPEED = 2.0  # seconds for token movement
@@ -84,4 +119,6 @@ DEFAULT_VOLUME = 0.7
 # Debug settings
 DEBUG_MODE = False
 SHOW_FPS = False
+PROFILER_WINDOW = 300  # Frames kept for rolling percentiles
+PROFILER_OVERLAY_INTERVAL = 0.5  # Seconds between overlay refreshes when nothing else redraws
 LOG_LEVEL = "INFO"  # DEBUG, INFO, WARNING, ERROR
\ No newline at end of file
@@ -1,25 +1,122 @@
 import sqlite3
 import json
 import os
+import time
+import config
 from config import DB_PATH
+import migrations
+import token_history
+from map_hierarchy import MapHierarchy
+import search_index
+import query_stats
+from records import (MapTokenRecord, TokenPositionRecord, LocationRecord, TimelineEventRecord,
+                     SearchResultRecord, TIMELINE_EVENT_COLUMNS)
 
 class Database:
     """Enhanced database with support for location icons, notes, timeline, and token actions."""
     
-    def __init__(self):
-        """Initialize the database connection for this instance."""
+    def __init__(self, db_path=None, write_behind=None, instrument=None):
+        """Initialize the database connection for this instance.
+
+        In write-behind mode mutations are not committed one by one; they
+        stay in an open transaction until flush() or flush_if_due() commits
+        them together. With instrument every statement is timed (see
+        query_stats.py) and a summary is printed by close().
+        """
+        db_path = db_path or DB_PATH
+        self.write_behind = config.DB_WRITE_BEHIND if write_behind is None else write_behind
+        self.flush_interval = config.DB_FLUSH_INTERVAL
+        self._pending_writes = 0
+        self._first_pending_time = None
+        self.flush_count = 0
+        self.write_count = 0
+        self._map_trees = {}  # world_id -> MapHierarchy
+        self._world_catalog = None  # Cached get_world_catalog() result
+        self._world_maps = {}  # world_id -> cached get_world_maps() result
+        instrument = config.DB_INSTRUMENT if instrument is None else instrument
+        self.query_stats = query_stats.QueryStats() if instrument else None
         # Create the data directory if it doesn't exist
-        db_dir = os.path.dirname(DB_PATH)
-        os.makedirs(db_dir, exist_ok=True)
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
 
         # Connect to the database (creates it if it doesn't exist)
-        abs_db_path = os.path.abspath(DB_PATH)
+        abs_db_path = os.path.abspath(db_path)
         print(f"DEBUG: Connecting to database at: {abs_db_path}")
-        self.conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+        if self.query_stats is not None:
+            self.conn = sqlite3.connect(db_path, check_same_thread=False,
+                                        factory=query_stats.InstrumentedConnection)
+            self.conn.query_stats = self.query_stats
+        else:
+            self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._configure_connection()
         self.cursor = self.conn.cursor()
         self._create_tables()
-        self._check_and_migrate_schema()
+        self._migrate_schema()
     
+    def _configure_connection(self):
+        """WAL lets readers run during a write and, with synchronous=NORMAL, avoids an fsync per commit."""
+        try:
+            self.conn.execute(f"PRAGMA journal_mode = {config.DB_JOURNAL_MODE}")
+            self.conn.execute(f"PRAGMA synchronous = {config.DB_SYNCHRONOUS}")
+        except sqlite3.Error as e:
+            print(f"Database: Could not configure journaling: {e}")
+
+    def _fetch_records(self, record_type, query, params=()):
+        """Run a query on a fresh cursor whose row factory builds record_type instances."""
+        cursor = self.conn.cursor()
+        cursor.row_factory = record_type.from_row
+        return cursor.execute(query, params).fetchall()
+
+    # Write-behind batching
+    def _commit(self):
+        """Commit now, or leave the change queued for the next flush in write-behind mode."""
+        self.write_count += 1
+        if not self.write_behind:
+            self.conn.commit()
+            return
+        if self._pending_writes == 0:
+            self._first_pending_time = time.monotonic()
+        self._pending_writes += 1
+
+    def has_pending_writes(self):
+        return self._pending_writes > 0
+
+    def flush(self):
+        """Commit every queued mutation in one transaction."""
+        if self._pending_writes == 0:
+            return False
+        try:
+            self.conn.commit()
+        except sqlite3.Error as e:
+            print(f"Database Error flushing {self._pending_writes} queued writes: {e}")
+            return False
+        self._pending_writes = 0
+        self._first_pending_time = None
+        self.flush_count += 1
+        return True
+
+    def flush_if_due(self):
+        """Flush if the oldest queued mutation is older than the flush interval. Call once per frame."""
+        if self._pending_writes and time.monotonic() - self._first_pending_time >= self.flush_interval:
+            return self.flush()
+        return False
+
+    def stats(self):
+        """Counters for debugging and profiling."""
+        stats = {
+            'pending': self._pending_writes,
+            'writes': self.write_count,
+            'flushes': self.flush_count,
+        }
+        if self.query_stats is not None:
+            stats.update(self.query_stats.totals())
+        return stats
+
+    def query_report(self, limit=None):
+        """Per-statement timing summary, or None if the database is not instrumented."""
+        return self.query_stats.report(limit) if self.query_stats is not None else None
+
     def _create_tables(self):
         """Create database tables if they don't exist."""
         # Existing tables
@@ -140,21 +237,6 @@ class Database:
         )
         ''')
 
-        # Token positions history for timeline scrubbing
-        self.cursor.execute('''
-        CREATE TABLE IF NOT EXISTS token_position_history (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            map_token_id INTEGER NOT NULL,
-            turn_number INTEGER NOT NULL,
-            x INTEGER NOT NULL,
-            y INTEGER NOT NULL,
-            hp INTEGER,
-            status_effects TEXT,
-            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (map_token_id) REFERENCES map_tokens (id) ON DELETE CASCADE
-        )
-        ''')
-
         # Enhanced notes table with audio support
         self.cursor.execute('''
         CREATE TABLE IF NOT EXISTS notes (
@@ -244,7 +326,7 @@ class Database:
                 (map_id, x, y, name, location_type, sub_map_id, notes, audio_file, icon_path)
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
             ''', (map_id, x, y, name, location_type, sub_map_id, notes, audio_file, icon_path))
-            self.conn.commit()
+            self._commit()
             return self.cursor.lastrowid
         except Exception as e:
             print(f"Error adding location icon: {e}")
@@ -253,11 +335,10 @@ class Database:
     def get_location_icons(self, map_id):
         """Get all location icons for a map."""
         try:
-            self.cursor.execute('''
+            return self._fetch_records(LocationRecord, '''
                 SELECT id, x, y, name, location_type, sub_map_id, notes, audio_file, icon_path
                 FROM location_icons WHERE map_id = ?
             ''', (map_id,))
-            return self.cursor.fetchall()
         except Exception as e:
             print(f"Error getting location icons: {e}")
             return []
@@ -281,7 +362,7 @@ class Database:
             params.append(icon_id)
             
             self.cursor.execute(query, params)
-            self.conn.commit()
+            self._commit()
             return self.cursor.rowcount > 0
         except Exception as e:
             print(f"Error updating location icon: {e}")
@@ -291,7 +372,7 @@ class Database:
         """Delete a location icon."""
         try:
             self.cursor.execute("DELETE FROM location_icons WHERE id = ?", (icon_id,))
-            self.conn.commit()
+            self._commit()
             return self.cursor.rowcount > 0
         except Exception as e:
             print(f"Error deleting location icon: {e}")
@@ -310,7 +391,7 @@ class Database:
                 (world_id, map_id, turn_number, event_type, event_title, event_description, event_data)
                 VALUES (?, ?, ?, ?, ?, ?, ?)
             ''', (world_id, map_id, turn_number, event_type, event_title, event_description, event_data))
-            self.conn.commit()
+            self._commit()
             return self.cursor.lastrowid
         except Exception as e:
             print(f"Error adding timeline event: {e}")
@@ -319,7 +400,7 @@ class Database:
     def get_timeline_events(self, world_id, start_turn=None, end_turn=None, limit=None):
         """Get timeline events for a world within a turn range."""
         try:
-            query = "SELECT * FROM timeline_events WHERE world_id = ?"
+            query = f"SELECT {TIMELINE_EVENT_COLUMNS} FROM timeline_events WHERE world_id = ?"
             params = [world_id]
             
             if start_turn is not None:
@@ -336,8 +417,7 @@ class Database:
                 query += " LIMIT ?"
                 params.append(limit)
                 
-            self.cursor.execute(query, params)
-            return self.cursor.fetchall()
+            return self._fetch_records(TimelineEventRecord, query, params)
         except Exception as e:
             print(f"Error getting timeline events: {e}")
             return []
@@ -362,7 +442,7 @@ class Database:
                 INSERT INTO token_actions (map_token_id, turn_number, action_text, action_type)
                 VALUES (?, ?, ?, ?)
             ''', (map_token_id, turn_number, action_text, action_type))
-            self.conn.commit()
+            self._commit()
             return self.cursor.lastrowid
         except Exception as e:
             print(f"Error adding token action: {e}")
@@ -391,17 +471,18 @@ class Database:
             return []
 
     def save_token_position(self, map_token_id, turn_number, x, y, hp=None, status_effects=None):
-        """Save token position and state for a specific turn."""
+        """Save token position and state for a specific turn (one history delta per token per turn)."""
         try:
             if isinstance(status_effects, (list, dict)):
                 status_effects = json.dumps(status_effects)
-                
-            self.cursor.execute('''
-                INSERT OR REPLACE INTO token_position_history 
-                (map_token_id, turn_number, x, y, hp, status_effects)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (map_token_id, turn_number, x, y, hp, status_effects))
-            self.conn.commit()
+
+            self.cursor.execute("SELECT map_id FROM map_tokens WHERE id = ?", (map_token_id,))
+            row = self.cursor.fetchone()
+            if row is None:
+                print(f"Error saving token position: map token {map_token_id} not found")
+                return False
+            token_history.save_delta(self.conn, row[0], map_token_id, turn_number, x, y, hp, status_effects)
+            self._commit()
             return True
         except Exception as e:
             print(f"Error saving token position: {e}")
@@ -410,38 +491,51 @@ class Database:
     def get_token_position_at_turn(self, map_token_id, turn_number):
         """Get token position and state at a specific turn."""
         try:
-            self.cursor.execute('''
-                SELECT x, y, hp, status_effects 
-                FROM token_position_history 
-                WHERE map_token_id = ? AND turn_number <= ?
-                ORDER BY turn_number DESC LIMIT 1
-            ''', (map_token_id, turn_number))
-            return self.cursor.fetchone()
+            return token_history.token_state_at_turn(self.conn, map_token_id, turn_number)
         except Exception as e:
             print(f"Error getting token position at turn: {e}")
             return None
 
     def get_all_token_positions_at_turn(self, map_id, turn_number):
-        """Get all token positions on a map at a specific turn."""
+        """Get all token positions on a map at a specific turn.
+
+        The state is rebuilt from the nearest history keyframe, so the cost
+        does not grow with the length of the campaign.
+        """
         try:
-            self.cursor.execute('''
-                SELECT mt.id, mt.token_id, t.name, tph.x, tph.y, tph.hp, tph.status_effects,
-                       t.image_path, t.size, t.color, t.type
-                FROM map_tokens mt
-                JOIN tokens t ON mt.token_id = t.id
-                LEFT JOIN token_position_history tph ON mt.id = tph.map_token_id 
-                    AND tph.turn_number = (
-                        SELECT MAX(turn_number) 
-                        FROM token_position_history 
-                        WHERE map_token_id = mt.id AND turn_number <= ?
-                    )
-                WHERE mt.map_id = ?
-            ''', (turn_number, map_id))
-            return self.cursor.fetchall()
+            state = token_history.state_at_turn(self.conn, map_id, turn_number)
+            positions = []
+            for map_token_id, token_id, name, image_path, size, color, token_type in self._map_token_details(map_id):
+                x, y, hp, status_effects = state.get(map_token_id, (None, None, None, None))
+                positions.append(TokenPositionRecord(map_token_id, token_id, name, x, y, hp, status_effects,
+                                                     image_path, size, color, token_type))
+            return positions
         except Exception as e:
             print(f"Error getting all token positions at turn: {e}")
             return []
 
+    def get_token_position_history(self, map_id):
+        """Everything a position_index.PositionIndex needs for a map, as (tokens, deltas).
+
+        tokens are (map_token_id, token_id, name, image_path, size, color, type);
+        deltas are (map_token_id, turn_number, x, y, hp, status_effects) in turn
+        order.
+        """
+        try:
+            return self._map_token_details(map_id), token_history.map_deltas(self.conn, map_id)
+        except Exception as e:
+            print(f"Error getting token position history: {e}")
+            return [], []
+
+    def _map_token_details(self, map_id):
+        self.cursor.execute('''
+            SELECT mt.id, mt.token_id, t.name, t.image_path, t.size, t.color, t.type
+            FROM map_tokens mt
+            JOIN tokens t ON mt.token_id = t.id
+            WHERE mt.map_id = ?
+        ''', (map_id,))
+        return self.cursor.fetchall()
+
     # Game State Methods
     def save_game_state(self, world_id, current_turn, current_map_id=None, active_token_id=None, state_data=None):
         """Save the current game state."""
@@ -450,11 +544,17 @@ class Database:
                 state_data = json.dumps(state_data)
                 
             self.cursor.execute('''
-                INSERT OR REPLACE INTO game_state 
+                INSERT INTO game_state 
                 (world_id, current_turn, current_map_id, active_token_id, state_data, last_updated)
                 VALUES (?, ?, ?, ?, ?, datetime('now'))
+                ON CONFLICT (world_id) DO UPDATE SET
+                    current_turn = excluded.current_turn,
+                    current_map_id = excluded.current_map_id,
+                    active_token_id = excluded.active_token_id,
+                    state_data = excluded.state_data,
+                    last_updated = excluded.last_updated
             ''', (world_id, current_turn, current_map_id, active_token_id, state_data))
-            self.conn.commit()
+            self._commit()
             return True
         except Exception as e:
             print(f"Error saving game state: {e}")
@@ -482,7 +582,7 @@ class Database:
                 (map_id, location_icon_id, title, content, audio_file, x, y, note_type)
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?)
             ''', (map_id, location_icon_id, title, content, audio_file, x, y, note_type))
-            self.conn.commit()
+            self._commit()
             return self.cursor.lastrowid
         except Exception as e:
             print(f"Error adding note: {e}")
@@ -501,6 +601,37 @@ class Database:
             print(f"Error getting notes for location: {e}")
             return []
 
+    # Search Methods
+    def search(self, world_id, query, kinds=None, limit=50):
+        """Full-text search over a world's notes, location icons and timeline events.
+
+        query is free text: every word has to match and the last one may be
+        a prefix. kinds limits the results to some of search_index.KINDS
+        ('note', 'location', 'event'); world_id None searches every world.
+        Returns SearchResultRecords, best match first.
+        """
+        expression = search_index.match_expression(query or "")
+        if expression is None:
+            return []
+        try:
+            sql, params = search_index.search_query(world_id, kinds, limit)
+            return self._fetch_records(SearchResultRecord, sql, [expression] + params)
+        except Exception as e:
+            print(f"Error searching for {query!r}: {e}")
+            return []
+
+    def rebuild_search_index(self):
+        """Re-index everything, e.g. after rows were changed with the triggers missing."""
+        self.flush()
+        try:
+            entries = search_index.rebuild(self.conn)
+            self.conn.commit()
+            return entries
+        except Exception as e:
+            print(f"Error rebuilding search index: {e}")
+            self.conn.rollback()
+            return 0
+
     # Enhanced Map Methods
     def create_sub_map(self, parent_map_id, world_id, name, image_path, map_type="location", **kwargs):
         """Create a sub-map linked to a parent map."""
@@ -539,64 +670,27 @@ class Database:
             print(f"Error getting sub-maps: {e}")
             return []
 
+    def get_map_tree(self, world_id):
+        """Return the cached MapHierarchy for a world, loading it with one recursive query."""
+        tree = self._map_trees.get(world_id)
+        if tree is None:
+            try:
+                tree = MapHierarchy.load(self.cursor, world_id)
+            except Exception as e:
+                print(f"Error loading map hierarchy: {e}")
+                return MapHierarchy(world_id, [])
+            self._map_trees[world_id] = tree
+        return tree
+
+    def invalidate_world_caches(self):
+        """Forget cached catalogs, map lists and hierarchies after worlds or maps change."""
+        self._map_trees.clear()
+        self._world_catalog = None
+        self._world_maps.clear()
+
     def get_map_hierarchy(self, world_id):
         """Get the complete map hierarchy for a world."""
-        try:
-            # Get root maps (no parent)
-            self.cursor.execute('''
-                SELECT id, name, parent_map_id, map_type
-                FROM maps WHERE world_id = ? AND parent_map_id IS NULL
-                ORDER BY name
-            ''', (world_id,))
-            root_maps = self.cursor.fetchall()
-            
-            hierarchy = []
-            for root_map in root_maps:
-                map_tree = self._build_map_tree(root_map[0])  # root_map[0] is the id
-                hierarchy.append(map_tree)
-            
-            return hierarchy
-        except Exception as e:
-            print(f"Error getting map hierarchy: {e}")
-            return []
-
-    def _build_map_tree(self, map_id):
-        """Recursively build a map tree structure."""
-        try:
-            # Get map info
-            self.cursor.execute('''
-                SELECT id, name, parent_map_id, map_type, image_path
-                FROM maps WHERE id = ?
-            ''', (map_id,))
-            map_info = self.cursor.fetchone()
-            
-            if not map_info:
-                return None
-                
-            # Get child maps
-            self.cursor.execute('''
-                SELECT id FROM maps WHERE parent_map_id = ?
-            ''', (map_id,))
-            child_ids = [row[0] for row in self.cursor.fetchall()]
-            
-            # Build children recursively
-            children = []
-            for child_id in child_ids:
-                child_tree = self._build_map_tree(child_id)
-                if child_tree:
-                    children.append(child_tree)
-            
-            return {
-                'id': map_info[0],
-                'name': map_info[1],
-                'parent_map_id': map_info[2],
-                'map_type': map_info[3],
-                'image_path': map_info[4],
-                'children': children
-            }
-        except Exception as e:
-            print(f"Error building map tree: {e}")
-            return None
+        return self.get_map_tree(world_id).roots
 
     # Token drag and drop support
     def update_token_position(self, map_token_id, x, y, current_turn, has_moved=True):
@@ -609,10 +703,9 @@ class Database:
                 WHERE id = ?
             ''', (x, y, 1 if has_moved else 0, current_turn, map_token_id))
             
-            # Save position history
-            self.save_token_position(map_token_id, current_turn, x, y)
-            
-            self.conn.commit()
+            # Save position history; its commit covers the update too
+            if not self.save_token_position(map_token_id, current_turn, x, y):
+                self._commit()
             return True
         except Exception as e:
             print(f"Error updating token position: {e}")
@@ -626,12 +719,26 @@ class Database:
                 SET has_moved = 0, current_turn = ?
                 WHERE map_id = ?
             ''', (current_turn, map_id))
-            self.conn.commit()
+            self._commit()
             return True
         except Exception as e:
             print(f"Error resetting movement flags: {e}")
             return False
 
+    def update_token_initiative(self, map_token_id, initiative):
+        """Set the initiative of a token on a map."""
+        try:
+            self.cursor.execute('''
+                UPDATE map_tokens
+                SET initiative = ?
+                WHERE id = ?
+            ''', (initiative, map_token_id))
+            self._commit()
+            return True
+        except Exception as e:
+            print(f"Error updating token initiative: {e}")
+            return False
+
     # Enhanced token methods
     def get_map_tokens_with_history(self, map_id, turn_number=None):
         """Get tokens on a map with their historical positions if specified."""
@@ -640,7 +747,7 @@ class Database:
                 return self.get_all_token_positions_at_turn(map_id, turn_number)
             else:
                 # Get current positions
-                self.cursor.execute('''
+                return self._fetch_records(MapTokenRecord, '''
                     SELECT mt.id, mt.token_id, t.name, t.image_path, t.size, t.color, t.type,
                            mt.x, mt.y, mt.rotation, mt.active, mt.initiative, mt.has_moved,
                            t.current_hp, t.max_hp
@@ -649,170 +756,36 @@ class Database:
                     WHERE mt.map_id = ?
                     ORDER BY mt.initiative DESC
                 ''', (map_id,))
-                return self.cursor.fetchall()
         except Exception as e:
             print(f"Error getting map tokens with history: {e}")
             return []
 
-    # Migration and schema methods
-    def _check_and_migrate_schema(self):
-        """Check for known schema issues and migrate if necessary."""
-        try:
-            print("DEBUG: Checking database schema...")
-            
-            # Check if maps.world_id has NOT NULL constraint
-            self.cursor.execute("PRAGMA table_info(maps)")
-            columns_info = self.cursor.fetchall()
-            world_id_info = None
-            
-            for col in columns_info:
-                if col[1] == 'world_id':
-                    world_id_info = col
-                    break
-            
-            if world_id_info and world_id_info[3] == 1:
-                print("INFO: Detected incorrect NOT NULL constraint on maps.world_id. Attempting migration...")
-                self._migrate_maps_table_remove_world_id_not_null()
-            else:
-                print("DEBUG: Schema for maps.world_id appears correct.")
-
-            # Check for new columns and add them if missing
-            self._add_missing_columns()
-
-        except sqlite3.Error as e:
-            print(f"ERROR: Failed during schema check/migration: {e}")
-
-    def _add_missing_columns(self):
-        """Add any missing columns to existing tables."""
-        try:
-            # Check for parent_map_id in maps table
-            self.cursor.execute("PRAGMA table_info(maps)")
-            columns = [col[1] for col in self.cursor.fetchall()]
-            
-            if 'parent_map_id' not in columns:
-                print("Adding parent_map_id column to maps table...")
-                self.cursor.execute('''
-                    ALTER TABLE maps ADD COLUMN parent_map_id INTEGER
-                    REFERENCES maps (id) ON DELETE CASCADE
-                ''')
-                
-            if 'map_type' not in columns:
-                print("Adding map_type column to maps table...")
-                self.cursor.execute('''
-                    ALTER TABLE maps ADD COLUMN map_type TEXT DEFAULT 'world'
-                ''')
-                
-            # Check for has_moved in map_tokens table
-            self.cursor.execute("PRAGMA table_info(map_tokens)")
-            columns = [col[1] for col in self.cursor.fetchall()]
-            
-            if 'has_moved' not in columns:
-                print("Adding has_moved column to map_tokens table...")
-                self.cursor.execute('''
-                    ALTER TABLE map_tokens ADD COLUMN has_moved BOOLEAN DEFAULT 0
-                ''')
-                
-            if 'current_turn' not in columns:
-                print("Adding current_turn column to map_tokens table...")
-                self.cursor.execute('''
-                    ALTER TABLE map_tokens ADD COLUMN current_turn INTEGER DEFAULT 0
-                ''')
-                
-            # Check for enhanced token columns
-            self.cursor.execute("PRAGMA table_info(tokens)")
-            columns = [col[1] for col in self.cursor.fetchall()]
-            
-            if 'max_hp' not in columns:
-                print("Adding max_hp column to tokens table...")
-                self.cursor.execute('''
-                    ALTER TABLE tokens ADD COLUMN max_hp INTEGER DEFAULT 10
-                ''')
-                
-            if 'current_hp' not in columns:
-                print("Adding current_hp column to tokens table...")
-                self.cursor.execute('''
-                    ALTER TABLE tokens ADD COLUMN current_hp INTEGER DEFAULT 10
-                ''')
-                
-            if 'armor_class' not in columns:
-                print("Adding armor_class column to tokens table...")
-                self.cursor.execute('''
-                    ALTER TABLE tokens ADD COLUMN armor_class INTEGER DEFAULT 10
-                ''')
-                
-            self.conn.commit()
-            print("Schema migration completed successfully.")
-            
-        except sqlite3.Error as e:
-            print(f"Error adding missing columns: {e}")
-
-    def _migrate_maps_table_remove_world_id_not_null(self):
-        """Recreate the maps table to remove the NOT NULL constraint from world_id."""
-        try:
-            self.conn.execute("BEGIN TRANSACTION")
-            print("  - Renaming existing maps table to maps_old...")
-            self.conn.execute("ALTER TABLE maps RENAME TO maps_old")
-            
-            print("  - Creating new maps table with correct schema...")
-            self.conn.execute('''
-            CREATE TABLE maps (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                world_id INTEGER,
-                parent_map_id INTEGER,
-                name TEXT NOT NULL,
-                image_path TEXT NOT NULL,
-                grid_size INTEGER DEFAULT 50,
-                grid_enabled INTEGER DEFAULT 1,
-                width INTEGER DEFAULT 0,
-                height INTEGER DEFAULT 0,
-                grid_color TEXT DEFAULT '#FFFFFF',
-                map_scale REAL DEFAULT 1.0,
-                grid_style TEXT DEFAULT 'dashed',
-                grid_opacity REAL DEFAULT 0.7,
-                map_type TEXT DEFAULT 'world',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (world_id) REFERENCES worlds (id) ON DELETE CASCADE,
-                FOREIGN KEY (parent_map_id) REFERENCES maps (id) ON DELETE CASCADE
-            )
-            ''')
-
-            print("  - Copying data from maps_old to new maps table...")
-            cursor_old = self.conn.execute("PRAGMA table_info(maps_old)")
-            old_columns = [col[1] for col in cursor_old.fetchall()]
-            cursor_new = self.conn.execute("PRAGMA table_info(maps)")
-            new_columns = [col[1] for col in cursor_new.fetchall()]
-            
-            common_columns = [col for col in old_columns if col in new_columns]
-            select_cols_str = ", ".join(common_columns)
-            insert_cols_str = ", ".join(common_columns)
-            
-            self.conn.execute(f"INSERT INTO maps ({insert_cols_str}) SELECT {select_cols_str} FROM maps_old")
-            
-            print("  - Dropping the old maps_old table...")
-            self.conn.execute("DROP TABLE maps_old")
-            
-            self.conn.execute("COMMIT")
-            print("INFO: Maps table migration completed successfully.")
+    def compact(self):
+        """Flush, VACUUM and report the size change. Returns (bytes before, bytes after)."""
+        self.flush()
+        return migrations.compact(self.conn)
 
-        except sqlite3.Error as e:
-            print(f"ERROR: Failed to migrate maps table: {e}. Rolling back.")
-            try:
-                self.conn.execute("ROLLBACK")
-                cursor_check = self.conn.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='maps_old'")
-                if cursor_check.fetchone():
-                     self.conn.execute("ALTER TABLE maps_old RENAME TO maps")
-                     print("Attempted to restore original maps table name.")
-            except sqlite3.Error as rb_e:
-                print(f"ERROR: Failed during rollback/restore: {rb_e}")
+    # Migration and schema methods
+    def _migrate_schema(self):
+        """Bring the schema up to date using the versioned migrations in migrations.py."""
+        version = migrations.get_version(self.conn)
+        if version < migrations.LATEST_VERSION:
+            version = migrations.migrate(self.conn)
+        print(f"DEBUG: Database schema at version {version}.")
+        return version
 
     # Keep all existing methods for backward compatibility
     def close(self):
-        """Close the database connection."""
+        """Flush queued writes and close the database connection."""
         if self.conn:
+            self.flush()
+            if self.query_stats is not None:
+                print(self.query_stats.report())
             self.conn.close()
     
     def create_world(self, name, description="", active_map_id=None):
         """Create a new world with optional active map."""
+        self.flush()  # A rollback below must not discard queued writes
         try:
             self.cursor.execute("BEGIN TRANSACTION")
             
@@ -828,6 +801,7 @@ class Database:
                 print(f"Database: Assigned map ID {active_map_id} to world ID {world_id}")
             
             self.conn.commit()
+            self.invalidate_world_caches()
             return world_id
             
         except sqlite3.IntegrityError:
@@ -849,42 +823,101 @@ class Database:
             return []
     
     def get_all_worlds(self):
-        """Get all worlds with detailed information."""
+        """Get all worlds with detailed information, including their map lists, in one query."""
         try:
             self.cursor.execute("""
                 SELECT w.id, w.name, w.description, w.created_at, w.last_accessed,
-                       (SELECT id FROM maps WHERE world_id = w.id ORDER BY id LIMIT 1) as active_map_id
+                       MIN(m.id) as active_map_id,
+                       json_group_array(json_object('id', m.id, 'name', m.name, 'image_path', m.image_path))
+                           FILTER (WHERE m.id IS NOT NULL) as maps
                 FROM worlds w
+                LEFT JOIN maps m ON m.world_id = w.id
+                GROUP BY w.id
                 ORDER BY w.last_accessed DESC
             """)
-            rows = self.cursor.fetchall()
-            
             worlds = []
-            for row in rows:
-                world = {
+            for row in self.cursor.fetchall():
+                worlds.append({
                     'id': row[0],
                     'name': row[1],
                     'description': row[2],
                     'created_at': row[3],
                     'last_accessed': row[4],
-                    'active_map_id': row[5]
-                }
-                
-                self.cursor.execute("SELECT id, name, image_path FROM maps WHERE world_id = ?", (world['id'],))
-                world['maps'] = [{'id': r[0], 'name': r[1], 'image_path': r[2]} for r in self.cursor.fetchall()]
-                
-                worlds.append(world)
-            
+                    'active_map_id': row[5],
+                    'maps': json.loads(row[6]) if row[6] else []
+                })
             return worlds
         except Exception as e:
             print(f"Database Error fetching all worlds: {e}")
             return []
 
+    def get_world_catalog(self):
+        """Summaries of every world (no map lists), most recently played first.
+
+        One aggregated query, cached until a world or map changes. Each entry
+        has 'id', 'name', 'description', 'created_at', 'last_accessed',
+        'map_count' and 'active_map_id'; use get_world_maps() for the maps.
+        """
+        if self._world_catalog is not None:
+            return self._world_catalog
+        try:
+            self.cursor.execute("""
+                SELECT w.id, w.name, w.description, w.created_at, w.last_accessed,
+                       COUNT(m.id), MIN(m.id)
+                FROM worlds w
+                LEFT JOIN maps m ON m.world_id = w.id
+                GROUP BY w.id
+                ORDER BY w.last_accessed DESC, w.name
+            """)
+            self._world_catalog = [
+                {
+                    'id': r[0],
+                    'name': r[1],
+                    'description': r[2],
+                    'created_at': r[3],
+                    'last_accessed': r[4],
+                    'map_count': r[5],
+                    'active_map_id': r[6]
+                } for r in self.cursor.fetchall()
+            ]
+            return self._world_catalog
+        except Exception as e:
+            print(f"Database Error fetching world catalog: {e}")
+            return []
+
+    def get_world_maps(self, world_id):
+        """Map list of one world, cached until a world or map changes."""
+        maps = self._world_maps.get(world_id)
+        if maps is not None:
+            return maps
+        try:
+            self.cursor.execute("""
+                SELECT id, name, image_path, grid_size, grid_color, grid_enabled 
+                FROM maps 
+                WHERE world_id = ?
+            """, (world_id,))
+            maps = [
+                {
+                    'id': r[0], 
+                    'name': r[1], 
+                    'image_path': r[2],
+                    'grid_size': r[3],
+                    'grid_color': r[4],
+                    'grid_enabled': r[5]
+                } for r in self.cursor.fetchall()
+            ]
+            self._world_maps[world_id] = maps
+            return maps
+        except Exception as e:
+            print(f"Database Error fetching maps for world {world_id}: {e}")
+            return []
+
     def load_world(self, world_id):
         """Load a world and update its last_accessed timestamp."""
         try:
             self.cursor.execute("UPDATE worlds SET last_accessed = datetime('now') WHERE id = ?", (world_id,))
-            self.conn.commit()
+            self._commit()
+            self._world_catalog = None  # Ordered by last_accessed
             
             self.cursor.execute("""
                 SELECT id, name, description, created_at, last_accessed,
@@ -912,22 +945,7 @@ class Database:
                 if map_data:
                     world['active_map'] = map_data
                 
-            self.cursor.execute("""
-                SELECT id, name, image_path, grid_size, grid_color, grid_enabled 
-                FROM maps 
-                WHERE world_id = ?
-            """, (world_id,))
-            
-            world['maps'] = [
-                {
-                    'id': r[0], 
-                    'name': r[1], 
-                    'image_path': r[2],
-                    'grid_size': r[3],
-                    'grid_color': r[4],
-                    'grid_enabled': r[5]
-                } for r in self.cursor.fetchall()
-            ]
+            world['maps'] = self.get_world_maps(world_id)
             
             return world
         except Exception as e:
@@ -946,6 +964,7 @@ class Database:
 
     def delete_world(self, world_id):
         """Delete a world by ID."""
+        self.flush()  # A rollback below must not discard queued writes
         try:
             self.cursor.execute("BEGIN TRANSACTION")
             
@@ -956,6 +975,7 @@ class Database:
             print(f"Database: World ID {world_id} deleted successfully")
             
             self.conn.commit()
+            self.invalidate_world_caches()
             return True
         except Exception as e:
             print(f"Database Error deleting world {world_id}: {e}")
@@ -1035,6 +1055,7 @@ class Database:
             'map_type': map_data.get('map_type', 'world')
         }
 
+        self.flush()  # A rollback below must not discard queued writes
         try:
             if map_id:
                 update_params = {k: v for k, v in params.items() if v is not None}
@@ -1055,6 +1076,7 @@ class Database:
                 print(f"Database: Created new map ID: {map_id}")
 
             self.conn.commit()
+            self.invalidate_world_caches()
             return map_id
         except sqlite3.Error as e:
             print(f"Database Error saving/updating map: {e}")
@@ -1075,6 +1097,15 @@ class Database:
             print(f"Database Error fetching unassigned maps: {e}")
             return []
 
+    def get_all_maps(self):
+        """Get (id, name) of every map, assigned to a world or not."""
+        try:
+            self.cursor.execute("SELECT id, name FROM maps ORDER BY name")
+            return self.cursor.fetchall()
+        except Exception as e:
+            print(f"Database Error fetching maps: {e}")
+            return []
+
     # Add other existing methods as needed...
     def get_tokens(self):
         """Get all tokens."""
@@ -1095,7 +1126,7 @@ class Database:
             "INSERT INTO tokens (name, image_path, size, color, type, notes, initiative, max_hp, current_hp) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
             (name, image_path, size, color, token_type, notes, initiative, max_hp, max_hp)
         )
-        self.conn.commit()
+        self._commit()
         return self.cursor.lastrowid
 
     def get_map_tokens(self, map_id):
@@ -1108,5 +1139,5 @@ class Database:
             "INSERT INTO map_tokens (map_id, token_id, x, y, rotation, active, initiative, has_moved, current_turn) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
             (map_id, token_id, x, y, rotation, active, initiative, 0, 0)
         )
-        self.conn.commit()
+        self._commit()
         return self.cursor.lastrowid
\ No newline at end of file
@@ -0,0 +1,113 @@
+# event_cache.py
+import config
+
+
+def _subtract(start, end, ranges):
+    """Parts of start..end (inclusive) not covered by any of the sorted, disjoint ranges."""
+    missing = []
+    for range_start, range_end in ranges:
+        if range_end < start:
+            continue
+        if range_start > end:
+            break
+        if range_start > start:
+            missing.append((start, range_start - 1))
+        start = max(start, range_end + 1)
+        if start > end:
+            return missing
+    missing.append((start, end))
+    return missing
+
+
+def _merge(ranges, start, end):
+    """ranges plus start..end, still sorted and disjoint (adjacent ranges are joined)."""
+    merged = []
+    for range_start, range_end in sorted(ranges + [(start, end)]):
+        if merged and range_start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], range_end))
+        else:
+            merged.append((range_start, range_end))
+    return merged
+
+
+def window(turn):
+    """Turn range loaded around a turn being viewed."""
+    return max(0, turn - config.TIMELINE_EVENT_WINDOW), turn + config.TIMELINE_EVENT_WINDOW
+
+
+class TimelineEventCache:
+    """A world's timeline events by turn, loaded from the database one turn range at a time.
+
+    ensure() only queues loads for turns that are neither loaded nor already
+    queued, so switching maps or scrubbing back over known turns reads
+    nothing. Events logged during the session are appended straight away
+    with the Future of their insert; a later load returning the same rows
+    skips them by the id the Future resolved to. Entries are
+    TimelineEventRecords, whose event_data is only decoded when .data is read.
+    """
+
+    def __init__(self, db, world_id):
+        self.db = db
+        self.world_id = world_id
+        self.events = {}  # turn -> [TimelineEventRecord]
+        self.loaded = []  # Sorted, disjoint (start, end) turn ranges merged in
+        self.pending = []  # Ranges queued on the database worker
+        self.inserts = []  # (TimelineEventRecord, Future of its id) appended before the insert ran
+        self.loads = 0
+
+    def ensure(self, start_turn, end_turn):
+        """Make sure start_turn..end_turn is loaded or on its way; the events arrive when the main loop polls."""
+        missing = [part for start, end in _subtract(max(0, start_turn), end_turn, self.loaded)
+                   for part in _subtract(start, end, self.pending)]
+        for start, end in missing:
+            self.loads += 1
+            self.pending = _merge(self.pending, start, end)
+            self.db.submit('get_timeline_events', self.world_id, start, end,
+                           callback=lambda events, start=start, end=end: self._merge_loaded(start, end, events))
+
+    def _resolve_inserts(self):
+        """Take the ids of appended events from their finished inserts.
+
+        Jobs run in order, so every insert queued before a read has finished
+        by the time its rows are merged, even if its callback has not run yet.
+        """
+        unresolved = []
+        for event, future in self.inserts:
+            if not future.done():
+                unresolved.append((event, future))
+            elif not future.cancelled() and future.exception() is None and event.id is None:
+                event.id = future.result()
+        self.inserts = unresolved
+
+    def _merge_loaded(self, start, end, events):
+        self._resolve_inserts()
+        known = set()
+        for turn in {event.turn_number for event in events}:
+            known.update(event.id for event in self.events.get(turn, ()))
+        for event in events:
+            if event.id not in known:
+                self.events.setdefault(event.turn_number, []).append(event)
+        self.pending = [part for pending_start, pending_end in self.pending
+                        for part in _subtract(pending_start, pending_end, [(start, end)])]
+        self.loaded = _merge(self.loaded, start, end)
+
+    def append(self, turn, event, insert=None):
+        """Add an event logged during this session; insert is the Future of its new id, if not known yet."""
+        self.events.setdefault(turn, []).append(event)
+        if insert is not None and event.id is None:
+            self.inserts.append((event, insert))
+
+    def is_loaded(self, turn):
+        return not _subtract(turn, turn, self.loaded)
+
+    def events_for_turn(self, turn):
+        return self.events.get(turn, [])
+
+    def stats(self):
+        """Counters for debugging and profiling."""
+        return {
+            'turns': len(self.events),
+            'events': sum(len(events) for events in self.events.values()),
+            'ranges': len(self.loaded),
+            'loads': self.loads,
+        }
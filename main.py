@@ -21,16 +21,23 @@ except ImportError:
 
 # Local imports
 import config
-import database
 import map_creator
 import map_view
 import timeline
 import ui_manager
 import dice_roller
+import asset_loader
+import async_db
+import profiler
+from text_cache import render_text, text_cache
 
 # pygame_gui Theme
 THEME_PATH = 'theme.json'
 
+# Window and display events after which nothing on screen can be trusted
+REDRAW_EVENTS = (pygame.VIDEORESIZE, pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED, pygame.WINDOWSIZECHANGED,
+                 pygame.WINDOWRESTORED, pygame.WINDOWMAXIMIZED)
+
 class GameApp:
     def __init__(self):
         pygame.init()
@@ -51,6 +58,12 @@ class GameApp:
         pygame.display.set_caption("TTS RPG App")
         self.clock = pygame.time.Clock()
         self.running = True
+        self.shut_down = False
+        # Retained rendering: redraw everything once, then only dirty regions
+        self.full_redraw = True
+        self.dirty_rects = []
+        self.drawn_app_mode = None
+        self.gui_visible_state = {}
         self.fullscreen = False
 
         # Initialize pygame_gui Manager
@@ -63,8 +76,8 @@ class GameApp:
             print(f"WARNING: Theme file not found at '{theme_path}'. Using default theme.")
             self.gui_manager = pygame_gui.UIManager((config.SCREEN_WIDTH, config.SCREEN_HEIGHT))
 
-        # Initialize Database
-        self.db = database.Database()
+        # Initialize Database; SQLite runs on its own thread, results come back via poll()
+        self.db = async_db.AsyncDatabase()
 
         # Game State
         self.current_map_id = None
@@ -82,12 +95,25 @@ class GameApp:
         self.audio_files = {}
 
         # Core Components
+        self.profiler = profiler.FrameProfiler(enabled=config.SHOW_FPS or config.DEBUG_MODE)
+        self.profiler.show_overlay = config.SHOW_FPS
+        self.asset_loader = asset_loader.AssetLoader()
         self.timeline = timeline.Timeline(self.db)
         self.map_view = map_view.MapView(self)
         self.reset_map_creator_state()
 
         self.ui_manager = ui_manager.UIManager(self)
         self.dice_roller = dice_roller.DiceRoller()
+        self.profiler.register_stats_provider('surfaces', self.map_view.scaled_cache.stats)
+        self.profiler.register_stats_provider('sprites', self.map_view.sprite_cache.stats)
+        self.profiler.register_stats_provider('text', text_cache.stats)
+        self.profiler.register_stats_provider('db', self.db.stats)
+        self.profiler.register_stats_provider('tokens', self.timeline.token_state.stats)
+        self.timeline.token_state.on_loaded = self._on_map_tokens_loaded
+        # Moves update one spatial index entry instead of rebuilding the index
+        self.timeline.token_state.on_moved = self.map_view.token_moved
+        self.profiler.register_stats_provider('positions', self.timeline.token_positions_cache.stats)
+        self.profiler.register_stats_provider('prefetch', self.timeline.prefetcher.stats)
 
         # UI State Management
         self.world_name_to_id_map = {}
@@ -313,9 +339,16 @@ class GameApp:
         self.ui_manager._update_dice_buttons()
         self.ui_manager._update_roll_button()
 
-    def handle_map_click(self, grid_coords):
-        """Handle left-clicks on the map grid."""
+    def handle_map_click(self, grid_coords, token=None, location=None):
+        """Handle left-clicks on the map grid. token/location are what was hit, if anything."""
         print(f"GameApp: Map clicked at grid coordinates: {grid_coords}")
+        if token is not None:
+            self.selected_token_instance_id = self.map_view.token_key(token)
+            print(f"GameApp: Selected token {token.get('name', self.selected_token_instance_id)}")
+        elif location is not None:
+            print(f"GameApp: Clicked location {location.get('name')}")
+        else:
+            self.selected_token_instance_id = None
 
     def reset_map_creator_state(self):
         """Reset the map creator state to default values."""
@@ -396,12 +429,12 @@ class GameApp:
             except pygame.error as e:
                 print(f"Error scaling/drawing preview image: {e}")
                 font = config.DEFAULT_FONT
-                err_surf = font.render("Error displaying image", True, (255,0,0))
+                err_surf = render_text(font, "Error displaying image", (255,0,0))
                 preview_surface.blit(err_surf, (10,10))
 
         else:
             font = config.DEFAULT_FONT
-            text_surf = font.render("Click 'Load Image' to start", True, config.UI_TEXT_COLOR)
+            text_surf = render_text(font, "Click 'Load Image' to start", config.UI_TEXT_COLOR)
             text_rect = text_surf.get_rect(center=preview_surface.get_rect().center)
             preview_surface.blit(text_surf, text_rect)
 
@@ -448,26 +481,141 @@ class GameApp:
                 pygame.draw.line(target_surface, grid_color, (draw_x1, draw_y_clipped), (draw_x2, draw_y_clipped))
             current_y += display_grid_size
 
-    def draw(self):
+    def mark_dirty(self, rect=None):
+        """Queue a screen area for repaint; without a rect the whole screen (mode and layout changes)."""
+        if rect is None:
+            self.full_redraw = True
+        else:
+            self.dirty_rects.append(pygame.Rect(rect))
+
+    def get_gui_dirty_rects(self, events=()):
+        """Screen rects of pygame_gui sprites that appeared, moved, changed or disappeared."""
+        rects = []
+        current = {}
+        for blit_data in self.gui_manager.get_sprite_group().visible:
+            image, rect = blit_data[0], blit_data[1]
+            # Only the area actually covered by the sprite's image gets painted
+            current[id(image)] = pygame.Rect(pygame.Rect(rect).topleft, image.get_size())
+        for image_id, rect in current.items():
+            if self.gui_visible_state.get(image_id) != rect:
+                rects.append(rect)
+        for image_id, rect in self.gui_visible_state.items():
+            if image_id not in current:
+                rects.append(rect)
+        self.gui_visible_state = current
+
+        # Hover effects and text cursors redraw in place without swapping surfaces
+        positions = [event.pos for event in events if event.type == pygame.MOUSEMOTION]
+        positions += [(x - dx, y - dy) for event in events if event.type == pygame.MOUSEMOTION
+                      for (x, y), (dx, dy) in [(event.pos, event.rel)]]
+        for rect in current.values():
+            if any(rect.collidepoint(pos) for pos in positions):
+                rects.append(rect)
+        for element in self.gui_manager.get_focus_set() or ():
+            rects.append(element.rect.copy())
+        return [rect for rect in rects if rect.width > 0 and rect.height > 0]
+
+    def gui_needs_animation(self):
+        """True while a focused text entry is blinking its cursor."""
+        return any(isinstance(element, (elements.UITextEntryLine, elements.UITextEntryBox))
+                   for element in self.gui_manager.get_focus_set() or ())
+
+    def is_idle(self):
+        """True when nothing will change until the next input event."""
+        if config.RENDER_MODE != "retained":
+            return False
+        if (self.full_redraw or self.dirty_rects or self.pending_ui_action or self.asset_loader.has_results()
+                or self.db.has_results()):
+            return False
+        if self.app_mode == "GAME" and self.map_view.is_animating():
+            return False
+        return not self.gui_needs_animation()
+
+    def draw(self, events=()):
         """Draws everything based on the current app_mode."""
+        if config.RENDER_MODE != "retained":
+            self.draw_full()
+            with self.profiler.section('present'):
+                pygame.display.flip()
+            return
+
+        screen_rect = self.screen.get_rect()
+        dirty_rects = self.dirty_rects + self.ui_manager.get_dirty_rects() + self.get_gui_dirty_rects(events)
+        self.dirty_rects = []
+        if self.app_mode != self.drawn_app_mode:
+            # A different mode lays out the whole screen differently
+            self.drawn_app_mode = self.app_mode
+            self.full_redraw = True
+        if self.app_mode == "GAME":
+            dirty_rects += self.map_view.get_dirty_rects(self.tokens_on_map, self.notes_on_map,
+                                                         self.locations_on_map, self.selected_token_instance_id)
+        if self.profiler.show_overlay and (dirty_rects or self.profiler.overlay_due()):
+            dirty_rects.append(self.profiler.overlay_rect(self.profiler_overlay_pos()))
+        if self.full_redraw:
+            dirty_rects = [screen_rect]
+            self.full_redraw = False
+        dirty_rects = [rect.clip(screen_rect) for rect in dirty_rects]
+        dirty_rects = [rect for rect in dirty_rects if rect.width > 0 and rect.height > 0]
+        if not dirty_rects:
+            return
+
+        # Repaint every layer, but only inside the changed area
+        self.screen.set_clip(dirty_rects[0].unionall(dirty_rects[1:]))
+        self.draw_full()
+        self.screen.set_clip(None)
+        with self.profiler.section('present'):
+            pygame.display.update(dirty_rects)
+
+    def profiler_overlay_pos(self):
+        return (config.MAP_AREA_LEFT + 10, config.MAP_AREA_TOP + 10)
+
+    def toggle_profiler_overlay(self):
+        """F3: show or hide frame timings, profiling only while visible unless DEBUG_MODE."""
+        self.profiler.show_overlay = not self.profiler.show_overlay
+        self.profiler.enabled = self.profiler.show_overlay or config.DEBUG_MODE or self.profiler.recording
+        self.mark_dirty(self.profiler.overlay_rect(self.profiler_overlay_pos()))
+
+    def toggle_profiler_csv(self):
+        """F4: start or stop dumping per-frame section times to a CSV file."""
+        if self.profiler.recording:
+            self.profiler.stop_csv()
+            self.profiler.enabled = self.profiler.show_overlay or config.DEBUG_MODE
+        elif self.profiler.start_csv():
+            self.profiler.enabled = True
+
+    def draw_full(self):
+        """Paint all layers onto the screen surface."""
         self.screen.fill(config.BG_COLOR)
 
         if self.app_mode == "GAME":
-            self.map_view.draw(self.screen, self.tokens_on_map, self.notes_on_map, self.locations_on_map, self.selected_token_instance_id)
-            self.ui_manager.draw(self.screen)
+            with self.profiler.section('map'):
+                self.map_view.draw(self.screen, self.tokens_on_map, self.notes_on_map, self.locations_on_map, self.selected_token_instance_id)
+            with self.profiler.section('ui'):
+                self.ui_manager.draw(self.screen)
 
         elif self.app_mode == "MAP_CREATOR":
-            self.ui_manager.draw(self.screen)
-            self.draw_map_creator_preview()
+            with self.profiler.section('ui'):
+                self.ui_manager.draw(self.screen)
+            with self.profiler.section('map'):
+                self.draw_map_creator_preview()
 
         # Draw pygame_gui elements
-        self.gui_manager.draw_ui(self.screen)
+        with self.profiler.section('gui'):
+            self.gui_manager.draw_ui(self.screen)
 
-        pygame.display.flip()
+        self.profiler.draw_overlay(self.screen, self.profiler_overlay_pos(), self.clock.get_fps())
 
     def load_initial_state(self):
+        # Warm the world catalog cache so the Load World picker opens without a query
+        self.db.submit('get_world_catalog')
         print("App started. Select File > Create World or File > Load World.")
 
+    def _on_map_tokens_loaded(self, map_id):
+        """TokenStateStore.on_loaded: the shared token list has been filled."""
+        print(f"Loaded {len(self.timeline.token_state.tokens)} tokens for map ID {map_id}")
+        self.map_view.items_changed()
+        self.ui_manager.update_token_list(self.timeline.token_state.tokens)
+
     def update(self, time_delta):
         """Update game state and UI."""
         if self.pending_ui_action:
@@ -484,6 +632,12 @@ class GameApp:
 
         self.gui_manager.update(time_delta)
 
+        # Swap in images decoded by the background loader
+        self.asset_loader.poll()
+
+        # Run callbacks for finished database queries; they mark what they change
+        self.db.poll()
+
         if self.app_mode == "GAME":
             self.map_view.update(time_delta)
             self.timeline.update(time_delta)
@@ -491,28 +645,97 @@ class GameApp:
     def run(self):
         """Main game loop."""
         while self.running:
-            time_delta = self.clock.tick(60) / 1000.0
+            waited_events = []
+            if self.is_idle():
+                # Nothing to animate: sleep until input arrives instead of spinning
+                event = pygame.event.wait(config.IDLE_WAIT_MS)
+                if event.type != pygame.NOEVENT:
+                    waited_events.append(event)
+                self.clock.tick() # Don't count the wait as frame time
+            time_delta = self.clock.tick(config.TARGET_FPS) / 1000.0
 
             try:
-                self.process_events()
-                self.update(time_delta)
-                self.draw()
+                self.profiler.begin_frame()
+                with self.profiler.section('events'):
+                    events = self.process_events(waited_events)
+                with self.profiler.section('update'):
+                    self.update(time_delta)
+                with self.profiler.section('draw'):
+                    self.draw(events)
+                self.profiler.end_frame()
             except Exception as e:
                 print(f"Error in main game loop: {e}")
                 import traceback
                 traceback.print_exc()
 
-        self.cleanup()
+    def shutdown(self):
+        """Release everything before exiting; safe to call more than once.
+
+        Closing the database waits for queued jobs and commits pending
+        write-behind writes, which would be lost with the daemon worker.
+        """
+        if self.shut_down:
+            return
+        self.shut_down = True
+        print("Cleaning up resources...")
 
-    def process_events(self):
-        """Process all events."""
-        for event in pygame.event.get():
+        # Stop any playing audio
+        if self.audio_enabled:
+            self.stop_audio()
+            try:
+                pygame.mixer.quit()
+                print("Audio mixer closed")
+            except:
+                pass
+
+        # Close an F4 recording so its buffered rows are written
+        self.profiler.stop_csv()
+
+        # Let running decodes finish instead of killing daemon workers mid-file
+        self.asset_loader.stop()
+
+        # Flushes write-behind writes and prints the query statistics, if instrumented
+        print("Closing database connection...")
+        self.db.close()
+
+        if hasattr(self, 'map_creator_process') and self.map_creator_process and self.map_creator_process.poll() is None:
+            print("Terminating map creator process...")
+            self.map_creator_process.terminate()
+            try:
+                self.map_creator_process.wait(timeout=2)
+                print("Map creator process terminated.")
+            except subprocess.TimeoutExpired:
+                print("Map creator process did not terminate quickly, killing...")
+                self.map_creator_process.kill()
+
+        print("Exiting Pygame.")
+        pygame.quit()
+
+    def process_events(self, pending_events=()):
+        """Process all events. Returns the events handled this frame."""
+        events = list(pending_events) + pygame.event.get()
+        for event in events:
             if event.type == pygame.QUIT:
                 print("Quit event detected.")
                 self.running = False
-                return
+                return events
+
+            # Input marks only what it changes: UIManager, MapView and pygame_gui report their
+            # own areas, and loaded assets and query results mark theirs when handled
+            if event.type in REDRAW_EVENTS:
+                self.mark_dirty()
+            elif self.app_mode == "MAP_CREATOR" and event.type in (pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP,
+                                                                   pygame.MOUSEWHEEL, pygame.KEYDOWN,
+                                                                   pygame.MOUSEMOTION):
+                # The creator preview is drawn straight from map_creator_state
+                if event.type != pygame.MOUSEMOTION or any(event.buttons):
+                    self.mark_dirty(self.map_view.map_area_rect)
             
             if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_F3:
+                    self.toggle_profiler_overlay()
+                elif event.key == pygame.K_F4:
+                    self.toggle_profiler_csv()
                 if event.key == pygame.K_ESCAPE:
                     if self.app_mode == "GAME":
                         print("ESC key pressed, showing menu.")
@@ -612,6 +835,8 @@ class GameApp:
             if self.app_mode == "GAME" and not event_consumed:
                 self.map_view.handle_event(event)
 
+        return events
+
     def start_world_creation(self):
         """Starts the world creation process with a name entry dialog."""
         self.pending_world_creation_data = {
@@ -668,143 +893,112 @@ class GameApp:
             object_id='#cancel_create_world_button'
         )
 
-def create_map_selection_window(self):
-    """Creates the UI window for selecting an initial map for a new world."""
-    print("DEBUG: Creating map selection window...")
-    
-    # Get UNASSIGNED maps only for world creation
-    try:
-        # First check total maps
-        all_maps = self.db.get_all_maps()
-        print(f"DEBUG: Found {len(all_maps)} total maps in database")
-        
-        # Then get unassigned maps
-        unassigned_maps = self.db.get_unassigned_maps()
+    def create_map_selection_window(self):
+        """Creates the UI window for selecting an initial map for a new world, once the maps have been read."""
+        print("DEBUG: Creating map selection window...")
+        # Get UNASSIGNED maps only for world creation
+        self.db.submit('get_unassigned_maps', callback=self._on_unassigned_maps)
+
+    def _on_unassigned_maps(self, unassigned_maps):
         print(f"DEBUG: Found {len(unassigned_maps)} unassigned maps")
+        if unassigned_maps:
+            self._show_map_selection_window(unassigned_maps)
+        else:
+            # If no unassigned maps, show all maps as options
+            self.db.submit('get_all_maps', callback=self._show_map_selection_window)
+
+    def _show_map_selection_window(self, maps_to_show):
+        try:
+            self.map_name_to_id_map = {name: map_id for map_id, name in maps_to_show}
+            map_list_items = [m[1] for m in maps_to_show]  # Just the names
         
-        # If no unassigned maps, show all maps as options
-        maps_to_show = unassigned_maps if unassigned_maps else all_maps
-        
-        self.map_name_to_id_map = {name: map_id for map_id, name in maps_to_show}
-        map_list_items = [m[1] for m in maps_to_show]  # Just the names
-        
-        print(f"DEBUG: Showing {len(map_list_items)} maps: {map_list_items}")
+            print(f"DEBUG: Showing {len(map_list_items)} maps: {map_list_items}")
         
-    except Exception as e:
-        print(f"ERROR: Could not load maps from database: {e}")
-        import traceback
-        traceback.print_exc()
-        self.show_message_box("Error", f"Could not load maps: {str(e)}", ['OK'])
-        return
+        except Exception as e:
+            print(f"ERROR: Could not load maps from database: {e}")
+            import traceback
+            traceback.print_exc()
+            self.show_message_box("Error", f"Could not load maps: {str(e)}", ['OK'])
+            return
 
-    window_width = 350
-    # Show message if no maps available
-    if not map_list_items:
-        window_height = 200
-        message_text = "No maps available. You can:\n1. Skip this step and create maps later\n2. Use Tools > Create Map first"
-    else:
-        window_height = min(len(map_list_items) * 35 + 120, 400)
-        message_text = "Select a map to be the starting map for this world:"
+        window_width = 350
+        # Show message if no maps available
+        if not map_list_items:
+            window_height = 200
+            message_text = "No maps available. You can:\n1. Skip this step and create maps later\n2. Use Tools > Create Map first"
+        else:
+            window_height = min(len(map_list_items) * 35 + 120, 400)
+            message_text = "Select a map to be the starting map for this world:"
         
-    window_x = (config.SCREEN_WIDTH - window_width) // 2
-    window_y = (config.SCREEN_HEIGHT - window_height) // 2
-    window_rect = pygame.Rect(window_x, window_y, window_width, window_height)
-
-    try:
-        map_selection_window = elements.UIWindow(
-            rect=window_rect,
-            manager=self.gui_manager,
-            window_display_title="Create World - Step 2: Select Initial Map",
-            object_id='#create_world_map_window'
-        )
-        print("DEBUG: Map selection window created successfully")
-
-        # Instruction text
-        elements.UILabel(
-            relative_rect=pygame.Rect(10, 10, window_width - 20, 30),
-            text=message_text,
-            manager=self.gui_manager,
-            container=map_selection_window
-        )
+        window_x = (config.SCREEN_WIDTH - window_width) // 2
+        window_y = (config.SCREEN_HEIGHT - window_height) // 2
+        window_rect = pygame.Rect(window_x, window_y, window_width, window_height)
 
-        if map_list_items:
-            # Selection List for Maps
-            self.map_selection_list = elements.UISelectionList(
-                relative_rect=pygame.Rect(10, 45, window_width - 20, window_height - 125),
-                item_list=map_list_items,
+        try:
+            map_selection_window = elements.UIWindow(
+                rect=window_rect,
                 manager=self.gui_manager,
-                container=map_selection_window,
-                object_id='#map_selection_list_for_creation',
-                allow_double_clicks=False
+                window_display_title="Create World - Step 2: Select Initial Map",
+                object_id='#create_world_map_window'
             )
-            print("DEBUG: Map selection list created with items")
-            button_text = 'Confirm Map'
-        else:
-            # No maps available - show instruction
+            print("DEBUG: Map selection window created successfully")
+
+            # Instruction text
             elements.UILabel(
-                relative_rect=pygame.Rect(10, 45, window_width - 20, window_height - 125),
-                text="Create maps using Tools > Create Map, then try creating a world again.",
+                relative_rect=pygame.Rect(10, 10, window_width - 20, 30),
+                text=message_text,
                 manager=self.gui_manager,
                 container=map_selection_window
             )
-            button_text = 'Skip (No Map)'
 
-        # Confirm Map Button
-        elements.UIButton(
-            relative_rect=pygame.Rect(window_width - 220, window_height - 65, 100, 30),
-            text=button_text,
-            manager=self.gui_manager,
-            container=map_selection_window,
-            object_id='#confirm_map_for_world_button'
-        )
+            if map_list_items:
+                # Selection List for Maps
+                self.map_selection_list = elements.UISelectionList(
+                    relative_rect=pygame.Rect(10, 45, window_width - 20, window_height - 125),
+                    item_list=map_list_items,
+                    manager=self.gui_manager,
+                    container=map_selection_window,
+                    object_id='#map_selection_list_for_creation',
+                    allow_double_clicks=False
+                )
+                print("DEBUG: Map selection list created with items")
+                button_text = 'Confirm Map'
+            else:
+                # No maps available - show instruction
+                elements.UILabel(
+                    relative_rect=pygame.Rect(10, 45, window_width - 20, window_height - 125),
+                    text="Create maps using Tools > Create Map, then try creating a world again.",
+                    manager=self.gui_manager,
+                    container=map_selection_window
+                )
+                button_text = 'Skip (No Map)'
+
+            # Confirm Map Button
+            elements.UIButton(
+                relative_rect=pygame.Rect(window_width - 220, window_height - 65, 100, 30),
+                text=button_text,
+                manager=self.gui_manager,
+                container=map_selection_window,
+                object_id='#confirm_map_for_world_button'
+            )
         
-        # Cancel Button
-        elements.UIButton(
-            relative_rect=pygame.Rect(window_width - 110, window_height - 65, 100, 30),
-            text='Cancel',
-            manager=self.gui_manager,
-            container=map_selection_window,
-            object_id='#cancel_create_world_button'
-        )
+            # Cancel Button
+            elements.UIButton(
+                relative_rect=pygame.Rect(window_width - 110, window_height - 65, 100, 30),
+                text='Cancel',
+                manager=self.gui_manager,
+                container=map_selection_window,
+                object_id='#cancel_create_world_button'
+            )
         
-        print("DEBUG: Map selection window setup complete")
+            print("DEBUG: Map selection window setup complete")
         
-    except Exception as e:
-        print(f"ERROR: Could not create map selection window UI: {e}")
-        import traceback
-        traceback.print_exc()
-        self.show_message_box("Error", f"UI Error: {str(e)}", ['OK'])
+        except Exception as e:
+            print(f"ERROR: Could not create map selection window UI: {e}")
+            import traceback
+            traceback.print_exc()
+            self.show_message_box("Error", f"UI Error: {str(e)}", ['OK'])
 
-# Also add this debug function to check database state
-def debug_database_contents(self):
-    """Debug function to check what's in the database."""
-    print("\n=== DATABASE DEBUG INFO ===")
-    
-    try:
-        # Check worlds
-        worlds = self.db.get_all_worlds()
-        print(f"Worlds in database: {len(worlds)}")
-        for world in worlds:
-            print(f"  World: ID={world['id']}, Name='{world['name']}'")
-        
-        # Check all maps
-        all_maps = self.db.get_all_maps()
-        print(f"Total maps in database: {len(all_maps)}")
-        for map_data in all_maps:
-            print(f"  Map: ID={map_data[0]}, Name='{map_data[1]}', Path='{map_data[2]}'")
-            
-        # Check unassigned maps
-        unassigned = self.db.get_unassigned_maps()
-        print(f"Unassigned maps: {len(unassigned)}")
-        for map_data in unassigned:
-            print(f"  Unassigned: ID={map_data[0]}, Name='{map_data[1]}'")
-            
-    except Exception as e:
-        print(f"ERROR checking database: {e}")
-        import traceback
-        traceback.print_exc()
-    
-    print("=== END DATABASE DEBUG ===\n")
     def debug_ui_elements(self):
         """Debug method to list all current UI elements."""
         print("DEBUG: Current UI elements:")
@@ -953,41 +1147,10 @@ def debug_database_contents(self):
             if world_id:
                 print(f"World created successfully with ID: {world_id}")
                 
-                # Load the newly created world
-                world_data = self.db.load_world(world_id)
-                if world_data:
-                    self.current_world_id = world_id
-                    print(f"Loading world: {world_data['name']}")
-                    
-                    # Set up timeline for this world
-                    self.timeline.set_world(world_id)
-                    
-                    # If there's an active map, load it
-                    if 'active_map' in world_data and world_data['active_map']:
-                        print(f"Loading active map: {world_data['active_map']['name']}")
-                        self.current_map_id = world_data['active_map']['id']
-                        self.map_view.load_map_data(world_data['active_map'])
-                        
-                        # Set up timeline for this map too
-                        self.timeline.set_map(self.current_map_id)
-                        
-                        # Load tokens and locations on this map
-                        self.load_map_tokens()
-                        self.load_map_locations()
-                    else:
-                        print("No active map found for this world")
-                        self.current_map_id = None
-                    
-                    # Update UI to reflect loaded world
-                    pygame.display.set_caption(f"TTS RPG App - {world_data['name']}")
-                    self.show_message_box("Success", f"World '{self.pending_world_creation_data['world_name']}' created and loaded successfully!", ['OK'])
-                    
-                    # Hide main menu if it was open
-                    if self.app_mode == "MENU":
-                        self.hide_main_menu()
-                        
-                else:
-                    self.show_message_box("Warning", f"World created but could not be loaded. Try loading it manually.", ['OK'])
+                # Load the newly created world once the worker has read it
+                world_name = self.pending_world_creation_data['world_name']
+                self.db.submit('load_world', world_id,
+                               callback=lambda world_data: self._on_created_world_loaded(world_id, world_name, world_data))
             else:
                 # Database error
                 self.show_message_box("Error", "Failed to create world due to a database error.", ['OK'])
@@ -1016,33 +1179,12 @@ def debug_database_contents(self):
             return
             
         try:
-            # Get tokens from database
-            token_data = self.db.get_map_tokens_with_history(self.current_map_id)
-            
-            # Convert database format to our internal format
-            self.tokens_on_map = []
-            for token in token_data:
-                if len(token) >= 13:  # Ensure we have all the data we expect
-                    token_dict = {
-                        'map_token_id': token[0],
-                        'token_id': token[1],
-                        'name': token[2],
-                        'image_path': token[3],
-                        'size': token[4],
-                        'color': token[5],
-                        'type': token[6],
-                        'x': token[7],
-                        'y': token[8],
-                        'rotation': token[9],
-                        'active': token[10],
-                        'initiative': token[11],
-                        'has_moved': token[12],
-                        'current_hp': token[13] if len(token) > 13 else 10,
-                        'max_hp': token[14] if len(token) > 14 else 10
-                    }
-                    self.tokens_on_map.append(token_dict)
-            
-            print(f"Loaded {len(self.tokens_on_map)} tokens for map ID {self.current_map_id}")
+            # The timeline's token state store loads these in set_map; share its list,
+            # which it fills in place when the load arrives
+            if self.timeline.token_state.map_id != self.current_map_id:
+                self.timeline.token_state.load(self.current_map_id)
+            self.tokens_on_map = self.timeline.token_state.tokens
+            self.map_view.items_changed()
             
             # Update UI token list
             self.ui_manager.update_token_list(self.tokens_on_map)
@@ -1052,40 +1194,30 @@ def debug_database_contents(self):
             self.tokens_on_map = []
 
     def load_map_locations(self):
-        """Load location icons for the current map."""
+        """Load location icons for the current map in the background."""
         if not self.current_map_id:
             self.locations_on_map = []
             return
             
-        try:
-            locations = self.db.get_location_icons(self.current_map_id)
-            self.locations_on_map = []
-            
-            for loc in locations:
-                location_dict = {
-                    'id': loc[0],
-                    'x': loc[1],
-                    'y': loc[2],
-                    'name': loc[3],
-                    'type': loc[4],
-                    'sub_map_id': loc[5],
-                    'notes': loc[6],
-                    'audio_file': loc[7],
-                    'icon_path': loc[8]
-                }
-                self.locations_on_map.append(location_dict)
-            
-            print(f"Loaded {len(self.locations_on_map)} locations for map")
-            
-        except Exception as e:
-            print(f"Error loading map locations: {e}")
-            self.locations_on_map = []
+        map_id = self.current_map_id
+        self.db.submit('get_location_icons', map_id,
+                       callback=lambda locations: self._on_map_locations(map_id, locations))
+
+    def _on_map_locations(self, map_id, locations):
+        if map_id != self.current_map_id:
+            return  # The user moved on to another map
+        self.locations_on_map = locations
+        self.map_view.items_changed()
+        print(f"Loaded {len(self.locations_on_map)} locations for map")
 
     def show_world_selection(self):
-        """Shows a window for selecting a world to load."""
-        worlds = self.db.get_worlds_simple()
-        self.world_name_to_id_map = {name: world_id for world_id, name in worlds}
-        world_names = [w[1] for w in worlds]
+        """Shows a window for selecting a world to load, once the world catalog has been fetched."""
+        self.db.submit('get_world_catalog', callback=self._show_world_selection_window)
+
+    def _show_world_selection_window(self, worlds):
+        # Map lists are only loaded for the world that gets picked (Database.load_world)
+        self.world_name_to_id_map = {world['name']: world['id'] for world in worlds}
+        world_names = [world['name'] for world in worlds]
         
         if not world_names:
             self.show_message_box("No Worlds", "No worlds available to load. Create a world first.", ['OK'])
@@ -1133,11 +1265,20 @@ def debug_database_contents(self):
         )
 
     def load_world(self, world_id):
-        """Load a world by ID and its associated maps."""
+        """Load a world by ID and its associated maps; the world is entered when the worker has read it."""
+        print(f"Loading world ID: {world_id}")
+        self.db.submit('load_world', world_id, callback=lambda world_data: self._on_world_loaded(world_id, world_data))
+        return True
+
+    def _on_created_world_loaded(self, world_id, world_name, world_data):
+        if not world_data:
+            self.show_message_box("Warning", f"World created but could not be loaded. Try loading it manually.", ['OK'])
+            return
+        if self._on_world_loaded(world_id, world_data):
+            self.show_message_box("Success", f"World '{world_name}' created and loaded successfully!", ['OK'])
+
+    def _on_world_loaded(self, world_id, world_data):
         try:
-            print(f"Loading world ID: {world_id}")
-            world_data = self.db.load_world(world_id)
-            
             if not world_data:
                 print(f"ERROR: Could not load world ID {world_id}")
                 self.show_message_box("Error", f"Failed to load world (ID: {world_id})", ['OK'])
@@ -1170,6 +1311,8 @@ def debug_database_contents(self):
             
             if self.app_mode == "MENU":
                 self.hide_main_menu()
+            # A different world changes the whole layout
+            self.mark_dirty()
             
             return True
             
@@ -1211,16 +1354,6 @@ def debug_database_contents(self):
             print(f"Unexpected error playing audio: {e}")
             return False
     
-    def stop_audio(self):
-        """Stop currently playing audio."""
-        if self.audio_enabled and self.current_audio:
-            try:
-                self.current_audio.stop()
-                print("Audio stopped")
-            except:
-                pass
-        self.current_audio = None
-
     def create_location_with_notes(self, x, y, map_id):
         """Create a location icon with notes and optional audio."""
         if not map_id:
@@ -1396,23 +1529,6 @@ def debug_database_contents(self):
             self.app_mode = "GAME"
             print("Returned to game mode.")
 
-    def show_message_box(self, title, message, buttons=None):
-        """Show a message box to the user."""
-        try:
-            message_rect = pygame.Rect(0, 0, 350, 150)
-            message_rect.center = (config.SCREEN_WIDTH // 2, config.SCREEN_HEIGHT // 2)
-            
-            windows.UIMessageWindow(
-                rect=message_rect,
-                html_message=message,
-                manager=self.gui_manager,
-                window_title=title
-            )
-            return True
-        except Exception as e:
-            print(f"ERROR creating message box: {e}")
-            return False
-
     def show_error_message(self, error_text):
         """Show an error message dialog to the user."""
         try:
@@ -1456,34 +1572,6 @@ def debug_database_contents(self):
                 pass
             self.current_audio = None
 
-    def cleanup(self):
-        """Clean up resources before exiting."""
-        print("Cleaning up resources...")
-        # Stop any playing audio
-        if hasattr(self, 'audio_enabled') and self.audio_enabled:
-            self.stop_audio()
-            try:
-                pygame.mixer.quit()
-                print("Audio mixer closed")
-            except:
-                pass
-        print("Closing database connection...")
-        if hasattr(self, 'db') and self.db:
-            self.db.close()
-        # Terminate any subprocesses
-        if hasattr(self, 'map_creator_process') and self.map_creator_process:
-            if self.map_creator_process.poll() is None:
-                print("Terminating map creator process...")
-                self.map_creator_process.terminate()
-                try:
-                    self.map_creator_process.wait(timeout=2)
-                    print("Map creator process terminated.")
-                except subprocess.TimeoutExpired:
-                    print("Map creator process did not terminate quickly, killing...")
-                    self.map_creator_process.kill()
-        print("Exiting Pygame.")
-        pygame.quit()
-
     def debug_database_contents(self):
         """Debug function to check what's in the database."""
         print("\n=== DATABASE DEBUG INFO ===")
@@ -1564,39 +1652,14 @@ def debug_database_contents(self):
 
         if hasattr(self, 'gui_manager') and self.gui_manager:
             self.gui_manager.set_window_resolution(current_size)
+        self.mark_dirty()
 
         print(f"Fullscreen: {self.fullscreen}")
 
-    def cleanup(self):
-        """Clean up resources before exiting."""
-        print("Cleaning up resources...")
-        
-        # Stop any playing audio
-        if self.audio_enabled:
-            self.stop_audio()
-            try:
-                pygame.mixer.quit()
-                print("Audio mixer closed")
-            except:
-                pass
-        
-        print("Closing database connection...")
-        self.db.close()
-        
-        if hasattr(self, 'map_creator_process') and self.map_creator_process and self.map_creator_process.poll() is None:
-            print("Terminating map creator process...")
-            self.map_creator_process.terminate()
-            try:
-                self.map_creator_process.wait(timeout=2)
-                print("Map creator process terminated.")
-            except subprocess.TimeoutExpired:
-                print("Map creator process did not terminate quickly, killing...")
-                self.map_creator_process.kill()
-        
-        print("Exiting Pygame.")
-        pygame.quit()
-
 
 if __name__ == '__main__':
     app = GameApp()
-    app.run()
\ No newline at end of file
+    try:
+        app.run()
+    finally:
+        app.shutdown()
\ No newline at end of file
@@ -0,0 +1,73 @@
+# map_hierarchy.py
+
+# One query for the whole tree; rows come out parents-first (by depth)
+HIERARCHY_QUERY = '''
+    WITH RECURSIVE tree (id, name, parent_map_id, map_type, image_path, depth) AS (
+        SELECT id, name, parent_map_id, map_type, image_path, 0
+        FROM maps WHERE world_id = ? AND parent_map_id IS NULL
+        UNION ALL
+        SELECT m.id, m.name, m.parent_map_id, m.map_type, m.image_path, tree.depth + 1
+        FROM maps m JOIN tree ON m.parent_map_id = tree.id
+    )
+    SELECT id, name, parent_map_id, map_type, image_path, depth
+    FROM tree ORDER BY depth, CASE WHEN depth = 0 THEN name END, id
+'''
+
+
+class MapHierarchy:
+    """Read-only tree of a world's maps with constant-time parent, children and path lookups.
+
+    Nodes are the same dicts get_map_hierarchy has always returned ('id',
+    'name', 'parent_map_id', 'map_type', 'image_path', 'children'). Build it
+    with load(); the Database caches one per world and drops it when maps
+    change, so holders of an old instance keep a consistent snapshot.
+    """
+
+    def __init__(self, world_id, rows):
+        self.world_id = world_id
+        self.roots = []
+        self._nodes = {}  # map_id -> node dict
+        self._paths = {}  # map_id -> tuple of nodes from the root down to the map
+        for map_id, name, parent_map_id, map_type, image_path, depth in rows:
+            node = {
+                'id': map_id,
+                'name': name,
+                'parent_map_id': parent_map_id,
+                'map_type': map_type,
+                'image_path': image_path,
+                'children': []
+            }
+            self._nodes[map_id] = node
+            parent = self._nodes.get(parent_map_id) if depth > 0 else None
+            if parent is None:
+                self.roots.append(node)
+                self._paths[map_id] = (node,)
+            else:
+                parent['children'].append(node)
+                self._paths[map_id] = self._paths[parent_map_id] + (node,)
+
+    @classmethod
+    def load(cls, cursor, world_id):
+        cursor.execute(HIERARCHY_QUERY, (world_id,))
+        return cls(world_id, cursor.fetchall())
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def __contains__(self, map_id):
+        return map_id in self._nodes
+
+    def get(self, map_id):
+        return self._nodes.get(map_id)
+
+    def parent(self, map_id):
+        node = self._nodes.get(map_id)
+        return self._nodes.get(node['parent_map_id']) if node else None
+
+    def children(self, map_id):
+        node = self._nodes.get(map_id)
+        return node['children'] if node else []
+
+    def path(self, map_id):
+        """Nodes from the root down to map_id (inclusive), or () if the map is not in this world."""
+        return self._paths.get(map_id, ())
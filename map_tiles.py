@@ -0,0 +1,319 @@
+# map_tiles.py
+import os
+import json
+import hashlib
+import math
+import shutil
+from collections import OrderedDict
+import pygame
+import config
+
+# Pillow is used to cut tiles without creating a full-size pygame surface
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+PYRAMID_VERSION = 1
+MANIFEST_NAME = "pyramid.json"
+
+
+class TilePyramid:
+    """Level-of-detail tile pyramid for one map image, cached on disk.
+
+    Level 0 is the full resolution image cut into square tiles, every following
+    level is half the size of the previous one, down to a single tile. The
+    pyramid is built once per source image and reused on later loads; only the
+    tiles that are actually drawn are decoded and kept in memory.
+    """
+
+    def __init__(self, image_path, tile_size=None, cache_dir=None, max_cached_tiles=32, loader=None):
+        self.source_path = os.path.abspath(image_path)
+        self.tile_size = tile_size or config.MAP_TILE_SIZE
+        self.cache_dir = os.path.join(cache_dir or config.MAP_TILES_DIR, self._cache_key())
+        self.max_cached_tiles = max_cached_tiles
+        self.width = 0
+        self.height = 0
+        self.levels = []  # [{'scale', 'width', 'height', 'cols', 'rows'}, ...]
+        self._tiles = OrderedDict()  # (level, col, row) -> Surface, in LRU order
+        self.loader = loader  # Optional AssetLoader; tiles are then decoded in the background
+        self.on_tile_loaded = None  # Called on the main thread when a background tile arrives
+
+    def _cache_key(self):
+        """Key the cache on the source path, size and modification time."""
+        try:
+            stat = os.stat(self.source_path)
+            fingerprint = f"{self.source_path}|{stat.st_size}|{int(stat.st_mtime)}|{self.tile_size}"
+        except OSError:
+            fingerprint = f"{self.source_path}|{self.tile_size}"
+        digest = hashlib.sha1(fingerprint.encode("utf-8")).hexdigest()[:16]
+        base = os.path.splitext(os.path.basename(self.source_path))[0]
+        return f"{base}_{digest}"
+
+    @property
+    def manifest_path(self):
+        return os.path.join(self.cache_dir, MANIFEST_NAME)
+
+    def is_built(self):
+        """Check whether a complete pyramid for this image exists on disk."""
+        try:
+            with open(self.manifest_path, "r") as f:
+                manifest = json.load(f)
+            return manifest.get("version") == PYRAMID_VERSION
+        except (OSError, ValueError):
+            return False
+
+    def ensure(self):
+        """Build the pyramid if needed and load its manifest. Returns True on success."""
+        if not self.is_built():
+            if not self.build():
+                return False
+        return self.load_manifest()
+
+    def load_manifest(self):
+        """Read level dimensions from the cached manifest."""
+        try:
+            with open(self.manifest_path, "r") as f:
+                manifest = json.load(f)
+            self.width = manifest["width"]
+            self.height = manifest["height"]
+            self.levels = manifest["levels"]
+            return True
+        except (OSError, ValueError, KeyError) as e:
+            print(f"TilePyramid: Could not read manifest {self.manifest_path}: {e}")
+            return False
+
+    def build(self):
+        """Cut the source image into tiles for every level and write the manifest."""
+        print(f"TilePyramid: Building tiles for {self.source_path} in {self.cache_dir}")
+        # Write into a scratch directory so an interrupted build is never picked up
+        build_dir = self.cache_dir + ".building"
+        shutil.rmtree(build_dir, ignore_errors=True)
+        os.makedirs(build_dir, exist_ok=True)
+        try:
+            if PIL_AVAILABLE:
+                levels = self._build_with_pil(build_dir)
+            else:
+                levels = self._build_with_pygame(build_dir)
+        except (OSError, ValueError, pygame.error, MemoryError) as e:
+            print(f"TilePyramid: Failed to build tiles for {self.source_path}: {e}")
+            shutil.rmtree(build_dir, ignore_errors=True)
+            return False
+
+        manifest = {
+            "version": PYRAMID_VERSION,
+            "source": self.source_path,
+            "tile_size": self.tile_size,
+            "width": levels[0]["width"],
+            "height": levels[0]["height"],
+            "levels": levels,
+        }
+        with open(os.path.join(build_dir, MANIFEST_NAME), "w") as f:
+            json.dump(manifest, f, indent=2)
+
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        os.replace(build_dir, self.cache_dir)
+        print(f"TilePyramid: Built {len(levels)} levels for {os.path.basename(self.source_path)}")
+        return True
+
+    def _build_with_pil(self, build_dir):
+        """Build all levels with Pillow, halving the image between levels."""
+        max_pixels = Image.MAX_IMAGE_PIXELS
+        Image.MAX_IMAGE_PIXELS = None  # Local map files, large images are expected
+        try:
+            image = Image.open(self.source_path)
+            if image.mode not in ("RGB", "RGBA"):
+                image = image.convert("RGBA")
+            levels = []
+            level = 0
+            while True:
+                width, height = image.size
+                levels.append(self._level_info(level, width, height))
+                for col, row, box in self._tile_boxes(width, height):
+                    tile = image.crop(box)
+                    tile.save(self._tile_file(build_dir, level, col, row), compress_level=1)
+                if width <= self.tile_size and height <= self.tile_size:
+                    break
+                image = image.resize((max(1, width // 2), max(1, height // 2)), Image.BILINEAR)
+                level += 1
+            return levels
+        finally:
+            Image.MAX_IMAGE_PIXELS = max_pixels
+
+    def _build_with_pygame(self, build_dir):
+        """Fallback build path when Pillow is not installed."""
+        image = pygame.image.load(self.source_path)
+        levels = []
+        level = 0
+        while True:
+            width, height = image.get_size()
+            levels.append(self._level_info(level, width, height))
+            for col, row, box in self._tile_boxes(width, height):
+                rect = pygame.Rect(box[0], box[1], box[2] - box[0], box[3] - box[1])
+                pygame.image.save(image.subsurface(rect), self._tile_file(build_dir, level, col, row))
+            if width <= self.tile_size and height <= self.tile_size:
+                break
+            image = pygame.transform.smoothscale(image, (max(1, width // 2), max(1, height // 2)))
+            level += 1
+        return levels
+
+    def _level_info(self, level, width, height):
+        return {
+            "scale": 1.0 / (2 ** level),
+            "width": width,
+            "height": height,
+            "cols": (width + self.tile_size - 1) // self.tile_size,
+            "rows": (height + self.tile_size - 1) // self.tile_size,
+        }
+
+    def _tile_boxes(self, width, height):
+        """Yield (col, row, (left, top, right, bottom)) for every tile of a level."""
+        for row in range((height + self.tile_size - 1) // self.tile_size):
+            for col in range((width + self.tile_size - 1) // self.tile_size):
+                left = col * self.tile_size
+                top = row * self.tile_size
+                yield col, row, (left, top, min(left + self.tile_size, width), min(top + self.tile_size, height))
+
+    def _tile_file(self, directory, level, col, row):
+        level_dir = os.path.join(directory, f"L{level}")
+        os.makedirs(level_dir, exist_ok=True)
+        return os.path.join(level_dir, f"{col}_{row}.png")
+
+    def tile_path(self, level, col, row):
+        """Path of a cached tile file."""
+        return os.path.join(self.cache_dir, f"L{level}", f"{col}_{row}.png")
+
+    def get_tile(self, level, col, row, priority=0):
+        """Return the decoded tile surface, loading it from disk if needed.
+
+        With a loader the decode is queued and None is returned until it is done.
+        """
+        key = (level, col, row)
+        tile = self._tiles.get(key)
+        if tile is not None:
+            self._tiles.move_to_end(key)
+            return tile
+        if self.loader is not None:
+            self.loader.request_image(('map_tile', self.cache_dir) + key, self.tile_path(level, col, row),
+                                      self._on_tile_loaded, priority)
+            return None
+        try:
+            tile = pygame.image.load(self.tile_path(level, col, row)).convert_alpha()
+        except (pygame.error, FileNotFoundError) as e:
+            print(f"TilePyramid: Failed to load tile {key}: {e}")
+            return None
+        self._store_tile(key, tile)
+        return tile
+
+    def _store_tile(self, key, tile):
+        self._tiles[key] = tile
+        while len(self._tiles) > self.max_cached_tiles:
+            self._tiles.popitem(last=False)
+
+    def _on_tile_loaded(self, key, tile):
+        if tile is None:
+            return
+        self._store_tile(key[2:], tile)
+        if self.on_tile_loaded is not None:
+            self.on_tile_loaded()
+
+    def _placeholder_tile(self, level, col, row, size):
+        """Stand-in for a tile still loading, cut from the nearest coarser tile in memory."""
+        for up in range(1, len(self.levels) - level):
+            parent = self._tiles.get((level + up, col >> up, row >> up))
+            if parent is None:
+                continue
+            part = max(1, self.tile_size >> up)
+            area = pygame.Rect((col % (1 << up)) * part, (row % (1 << up)) * part, part, part)
+            area = area.clip(parent.get_rect())
+            if area.width > 0 and area.height > 0:
+                return pygame.transform.scale(parent.subsurface(area), size)
+        return None
+
+    def preload_overview(self):
+        """Queue the single-tile top level first so every view has a stand-in early."""
+        if self.levels:
+            self.get_tile(len(self.levels) - 1, 0, 0, priority=-1)
+
+    def visible_tiles(self, level, rect):
+        """Yield (col, row, tile_rect) for tiles of a level intersecting rect (level pixels)."""
+        info = self.levels[level]
+        first_col = max(0, rect.left // self.tile_size)
+        first_row = max(0, rect.top // self.tile_size)
+        last_col = min(info["cols"] - 1, (rect.right - 1) // self.tile_size)
+        last_row = min(info["rows"] - 1, (rect.bottom - 1) // self.tile_size)
+        for row in range(first_row, last_row + 1):
+            for col in range(first_col, last_col + 1):
+                tile_rect = pygame.Rect(col * self.tile_size, row * self.tile_size, self.tile_size, self.tile_size)
+                yield col, row, tile_rect
+
+    def level_for_zoom(self, zoom):
+        """Pick the smallest level that still has at least `zoom` resolution."""
+        level = 0
+        while level + 1 < len(self.levels) and self.levels[level + 1]["scale"] >= zoom:
+            level += 1
+        return level
+
+    def draw(self, surface, camera_x, camera_y, zoom=1.0, scaled_cache=None):
+        """Blit the tiles covering the camera view onto surface at the given zoom.
+
+        camera_x/camera_y are the map pixel coordinates of the surface's top-left
+        corner. Tiles that need rescaling are kept in scaled_cache (a SurfaceCache)
+        so an unchanged zoom level never rescales the same tile twice.
+        """
+        if not self.levels:
+            return
+        level = self.level_for_zoom(zoom)
+        scale = self.levels[level]["scale"]
+        factor = zoom / scale
+        view_width, view_height = surface.get_size()
+
+        # Camera view expressed in level pixels
+        source_rect = pygame.Rect(
+            int(camera_x * scale), int(camera_y * scale),
+            int(math.ceil(view_width / factor)) + 1, int(math.ceil(view_height / factor)) + 1
+        )
+        origin_x = round(camera_x * zoom)
+        origin_y = round(camera_y * zoom)
+
+        # Tiles nearest the middle of the view load first
+        center_col = (source_rect.centerx) / self.tile_size
+        center_row = (source_rect.centery) / self.tile_size
+
+        for col, row, tile_rect in self.visible_tiles(level, source_rect):
+            priority = abs(col + 0.5 - center_col) + abs(row + 0.5 - center_row)
+            tile = self.get_tile(level, col, row, priority)
+            # Derive both edges from the grid so neighbouring tiles never leave seams
+            x0 = round(tile_rect.left * factor)
+            y0 = round(tile_rect.top * factor)
+            if tile is None:
+                # Still loading: draw a coarser stand-in or a flat placeholder
+                info = self.levels[level]
+                width = min(self.tile_size, info["width"] - tile_rect.left)
+                height = min(self.tile_size, info["height"] - tile_rect.top)
+                x1 = round((tile_rect.left + width) * factor)
+                y1 = round((tile_rect.top + height) * factor)
+                size = (max(1, x1 - x0), max(1, y1 - y0))
+                stand_in = self._placeholder_tile(level, col, row, size)
+                if stand_in is not None:
+                    surface.blit(stand_in, (x0 - origin_x, y0 - origin_y))
+                else:
+                    surface.fill(config.ASSET_PLACEHOLDER_COLOR, (x0 - origin_x, y0 - origin_y, size[0], size[1]))
+                continue
+            if factor != 1.0:
+                x1 = round((tile_rect.left + tile.get_width()) * factor)
+                y1 = round((tile_rect.top + tile.get_height()) * factor)
+                size = (max(1, x1 - x0), max(1, y1 - y0))
+                key = ('map_tile', self.cache_dir, level, col, row, round(factor, 4))
+                source_tile = tile
+                if scaled_cache is not None:
+                    tile = scaled_cache.get_or_create(
+                        key, lambda: pygame.transform.smoothscale(source_tile, size))
+                else:
+                    tile = pygame.transform.smoothscale(source_tile, size)
+            surface.blit(tile, (x0 - origin_x, y0 - origin_y))
+
+    def clear_memory(self):
+        """Drop all decoded tiles (the disk cache is kept)."""
+        self._tiles.clear()
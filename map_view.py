@@ -1,7 +1,15 @@
 # map_view.py
 import pygame
 import os
+import math
 import config # For colors, potentially grid size default
+import map_tiles
+import profiler
+from surface_cache import SurfaceCache
+from sprite_cache import SpriteCache
+from spatial_index import SpatialHash
+from text_cache import render_text
+from records import Record
 
 class MapView:
     def __init__(self, app_ref):
@@ -9,11 +17,13 @@ class MapView:
         self.camera_x = 0
         self.camera_y = 0
         self.camera_speed = 300 # Pixels per second
-        self.scroll_speed = 50 # Pixels per scroll wheel tick
+        self.scroll_speed = 50 # Pixels per scroll wheel tick (with Shift held)
         self.grid_size = 50
-        self.grid_color = (128, 128, 128)
-        self.grid_opacity = 128
-        self.map_surface = None # Holds the original loaded map image
+        self.grid_color = pygame.Color(config.GRID_LINE_COLOR)
+        self.grid_opacity = config.GRID_OPACITY # Alpha, 0-255
+        self.grid_style = 'solid' # 'solid', 'dashed' or 'dotted'
+        self.grid_enabled = True
+        self.tile_pyramid = None # Tiled level-of-detail pyramid of the loaded map image
         self.map_pixel_width = 0 # Actual pixel dimensions of the map image
         self.map_pixel_height = 0
 
@@ -27,11 +37,22 @@ class MapView:
         )
         # Surface for drawing the visible portion of the map
         self.view_surface = pygame.Surface(self.map_area_rect.size)
-
-        # Cache loaded token images {image_path: surface}
-        self.token_image_cache = {}
-        # Cache loaded death images
-        self.death_image_cache = {}
+        # Keep enough decoded tiles for two full viewports; a level covers at most
+        # twice the view size before the next smaller level is picked
+        tiles_x = self.map_area_rect.width * 2 // config.MAP_TILE_SIZE + 2
+        tiles_y = self.map_area_rect.height * 2 // config.MAP_TILE_SIZE + 2
+        self.max_cached_tiles = tiles_x * tiles_y * 2
+        # Scaled map tiles and grid overlays per quantized zoom level
+        self.scaled_cache = SurfaceCache(config.SCALED_SURFACE_CACHE_MB * 1024 * 1024)
+
+        # Background decoding of map tiles and token images, if the app provides a loader
+        self.asset_loader = getattr(app_ref, 'asset_loader', None)
+        # Per-frame timings are reported to the app's profiler when there is one
+        self.profiler = getattr(app_ref, 'profiler', None) or profiler.FrameProfiler(enabled=False)
+        self.pending_pyramid = None # Pyramid being built in the background
+
+        # Token images scaled to their on-screen size, keyed by (path, size, dead state)
+        self.sprite_cache = SpriteCache(loader=self.asset_loader, on_loaded=self.mark_dirty)
 
         # Panning state
         self.is_panning_mouse = False # For middle mouse button panning
@@ -41,8 +62,24 @@ class MapView:
         self.is_panning_left = False
         self.is_panning_right = False
 
-        # Zoom is now fixed at 1.0
-        self.zoom_level = 1.0
+        # Zoom is quantized to ZOOM_STEPS_PER_OCTAVE steps per doubling so scaled
+        # surfaces can be cached per step
+        self.zoom_step, self.zoom_level = self.quantize_zoom(config.DEFAULT_MAP_SCALE)
+
+        # Retained rendering: view_surface is only re-rendered when the view changed
+        self.dirty = True
+        self.dirty_view_rects = []  # Parts of view_surface to re-render when the rest is unchanged
+        self.last_drawn_state = None
+
+        # Spatial indexes of tokens and locations in map pixels, for culling and hit-testing
+        self.token_index = SpatialHash()
+        self.location_index = SpatialHash()
+        self.indexed_tokens = None
+        self.indexed_tokens_state = None
+        self.indexed_locations_state = None
+        # Bumped by items_changed() when token, note or location lists are loaded or edited;
+        # moves update the index entry directly (token_moved) instead
+        self.items_version = 0
 
 
     def handle_event(self, event):
@@ -77,8 +114,12 @@ class MapView:
                 elif event.button == 1: # Left click (example: select token)
                     map_coords = self.screen_to_map_coords(event.pos)
                     grid_coords = self.map_to_grid_coords(map_coords)
+                    # Hit-test through the spatial indexes; the topmost token wins
+                    tokens = self.tokens_at(map_coords)
+                    locations = self.locations_at(map_coords)
                     # Pass click to app to handle selection/movement logic
-                    self.app.handle_map_click(grid_coords) # Assuming GameApp has this method
+                    self.app.handle_map_click(grid_coords, tokens[-1] if tokens else None,
+                                              locations[-1] if locations else None)
                     print(f"Map left-click at screen {event.pos} -> map {map_coords} -> grid {grid_coords}")
                 elif event.button == 3: # Right click (example: context menu)
                     map_coords = self.screen_to_map_coords(event.pos)
@@ -97,28 +138,31 @@ class MapView:
                 dx = event.pos[0] - self.last_mouse_pos[0]
                 dy = event.pos[1] - self.last_mouse_pos[1]
                 # Adjust camera based on mouse movement (inverse)
-                self.camera_x -= dx # / self.zoom_level (Zoom is 1.0)
-                self.camera_y -= dy # / self.zoom_level (Zoom is 1.0)
+                self.camera_x -= dx / self.zoom_level
+                self.camera_y -= dy / self.zoom_level
                 self.last_mouse_pos = event.pos
                 # Clamp camera after mouse panning
                 self.clamp_camera()
 
         elif event.type == pygame.MOUSEWHEEL:
-             if self.map_area_rect.collidepoint(pygame.mouse.get_pos()): # Only scroll if mouse is over map
-                # Scroll vertically with mouse wheel
-                scroll_amount = event.y * self.scroll_speed
-                self.camera_y -= scroll_amount # Adjust camera_y (inverse direction typical for scrolling)
-                print(f"Scroll event: y={event.y}, new camera_y={self.camera_y}")
-                self.clamp_camera() # Re-clamp after scroll adjustment
+             mouse_pos = pygame.mouse.get_pos()
+             if self.map_area_rect.collidepoint(mouse_pos): # Only zoom/scroll if mouse is over map
+                if pygame.key.get_mods() & pygame.KMOD_SHIFT:
+                    # Shift + wheel scrolls vertically
+                    scroll_amount = event.y * self.scroll_speed / self.zoom_level
+                    self.camera_y -= scroll_amount # Adjust camera_y (inverse direction typical for scrolling)
+                    self.clamp_camera() # Re-clamp after scroll adjustment
+                else:
+                    # Zoom around the point under the cursor, one quantized step per wheel tick
+                    self.zoom_by_steps(event.y, mouse_pos)
 
     def clamp_camera(self):
         """Prevent the camera from panning beyond the map boundaries."""
-        if not self.map_surface: return # No map loaded
+        if not self.tile_pyramid: return # No map loaded
 
         # Calculate the dimensions of the view in map pixels
-        # Zoom is fixed at 1.0
-        view_width_map = self.map_area_rect.width
-        view_height_map = self.map_area_rect.height
+        view_width_map = self.map_area_rect.width / self.zoom_level
+        view_height_map = self.map_area_rect.height / self.zoom_level
 
         # Calculate max camera coordinates
         max_camera_x = max(0, self.map_pixel_width - view_width_map)
@@ -128,14 +172,43 @@ class MapView:
         self.camera_x = max(0, min(self.camera_x, max_camera_x))
         self.camera_y = max(0, min(self.camera_y, max_camera_y))
 
+    def quantize_zoom(self, zoom):
+        """Snap a zoom factor to the nearest cacheable step within the configured range."""
+        steps = config.ZOOM_STEPS_PER_OCTAVE
+        zoom = max(config.MIN_MAP_SCALE, min(config.MAX_MAP_SCALE, zoom))
+        step = int(round(math.log2(zoom) * steps))
+        min_step = int(math.ceil(math.log2(config.MIN_MAP_SCALE) * steps - 1e-9))
+        max_step = int(math.floor(math.log2(config.MAX_MAP_SCALE) * steps + 1e-9))
+        step = max(min_step, min(step, max_step))
+        return step, 2 ** (step / steps)
+
+    def set_zoom(self, zoom, anchor_pos=None):
+        """Set the zoom level, keeping the map point under anchor_pos (screen coords) fixed."""
+        if anchor_pos is None:
+            anchor_pos = self.map_area_rect.center
+        anchor_map = self.screen_to_map_float(anchor_pos)
+
+        self.zoom_step, self.zoom_level = self.quantize_zoom(zoom)
+
+        # Move the camera so the anchor stays under the cursor
+        self.camera_x = anchor_map[0] - (anchor_pos[0] - self.map_area_rect.left) / self.zoom_level
+        self.camera_y = anchor_map[1] - (anchor_pos[1] - self.map_area_rect.top) / self.zoom_level
+        self.clamp_camera()
+
+    def zoom_by_steps(self, steps, anchor_pos=None):
+        """Zoom in (positive) or out (negative) by whole quantized steps."""
+        new_step = self.zoom_step + steps
+        self.set_zoom(2 ** (new_step / config.ZOOM_STEPS_PER_OCTAVE), anchor_pos)
+
     def update(self, time_delta):
         """Update camera position based on panning flags."""
-        if not self.map_surface:
+        if not self.tile_pyramid:
             return # Don't pan if no map
 
         delta_x = 0
         delta_y = 0
-        speed = self.camera_speed # Panning speed no longer adjusts with zoom
+        # Pan at a constant on-screen speed regardless of zoom
+        speed = self.camera_speed / self.zoom_level
 
         if self.is_panning_up:
             delta_y -= speed * time_delta
@@ -155,15 +228,45 @@ class MapView:
         """Returns the screen rectangle where the map is drawn."""
         return self.map_area_rect
 
+    def set_grid_appearance(self, map_data):
+        """Read grid color, opacity, style and visibility from map settings."""
+        self.grid_enabled = bool(map_data.get('grid_enabled', True))
+        try:
+            self.grid_color = pygame.Color(map_data.get('grid_color') or config.GRID_LINE_COLOR)
+        except (ValueError, TypeError):
+            print(f"MapView: Invalid grid color {map_data.get('grid_color')!r}, using default")
+            self.grid_color = pygame.Color(config.GRID_LINE_COLOR)
+
+        # Maps store opacity as 0.0-1.0, older data may hold an alpha value
+        opacity = map_data.get('grid_opacity')
+        if opacity is None:
+            self.grid_opacity = config.GRID_OPACITY
+        elif opacity <= 1:
+            self.grid_opacity = int(round(opacity * 255))
+        else:
+            self.grid_opacity = int(opacity)
+        self.grid_opacity = max(0, min(255, self.grid_opacity))
+
+        style = map_data.get('grid_style') or 'solid'
+        self.grid_style = style if style in ('solid', 'dashed', 'dotted') else 'solid'
+        self.mark_dirty()
+
     def load_map_data(self, map_data):
         """Update view settings and load the map image when a map is loaded."""
         self.grid_size = map_data.get('grid_size', 50)
+        self.sprite_cache.set_grid_size(self.grid_size)
+        self.set_grid_appearance(map_data)
         self.map_pixel_width = map_data.get('map_width_pixels', self.map_area_rect.width) # Default to view size if not set
         self.map_pixel_height = map_data.get('map_height_pixels', self.map_area_rect.height)
 
         # --- Load the map image ---
+        # Only the tile pyramid manifest is read here; tiles are decoded on demand in draw()
         image_path = map_data.get('image_path')
         loaded = False
+        if self.tile_pyramid:
+            self.tile_pyramid.clear_memory()
+        self.tile_pyramid = None
+        self.pending_pyramid = None
         if image_path:
             print(f"MapView: Attempting to load image from path: {image_path}")
             # Check common image path scenarios (copied from main.py's original logic)
@@ -176,38 +279,75 @@ class MapView:
                 abs_path = os.path.abspath(path) # Ensure path is absolute for checking
                 print(f"MapView: Trying absolute path: {abs_path}")
                 if os.path.exists(abs_path):
-                    try:
-                        print(f"MapView: Found existing file at: {abs_path}")
-                        self.map_surface = pygame.image.load(abs_path).convert_alpha()
-                        print(f"MapView: Map image loaded successfully. Size: {self.map_surface.get_size()}")
-                        # Update map dimensions based on loaded image
-                        self.map_pixel_width = self.map_surface.get_width()
-                        self.map_pixel_height = self.map_surface.get_height()
+                    print(f"MapView: Found existing file at: {abs_path}")
+                    pyramid = map_tiles.TilePyramid(abs_path, max_cached_tiles=self.max_cached_tiles,
+                                                    loader=self.asset_loader)
+                    pyramid.on_tile_loaded = self.mark_dirty
+                    if self.asset_loader is not None and not pyramid.is_built():
+                        # First time this image is opened: cut the tiles without blocking the window
+                        print(f"MapView: Building map tiles in the background for {abs_path}")
+                        self.pending_pyramid = pyramid
+                        self.asset_loader.submit(('pyramid', pyramid.cache_dir), pyramid.build,
+                                                 lambda key, ok, pyramid=pyramid: self._on_pyramid_built(pyramid, ok),
+                                                 priority=-2)
+                        loaded = True
+                        break
+                    if pyramid.ensure():
+                        self._use_pyramid(pyramid)
                         loaded = True
                         break
-                    except pygame.error as e:
-                        print(f"MapView: Failed to load image at {abs_path}: {e}")
+                    print(f"MapView: Failed to prepare map tiles for {abs_path}")
 
         if not loaded:
             print("MapView ERROR: Could not load map image.")
-            self.map_surface = None # Ensure it's None if loading failed
+            self.tile_pyramid = None # Ensure it's None if loading failed
             self.map_pixel_width = 0
             self.map_pixel_height = 0
         # --- END: Load the map image ---
 
+        # Scaled surfaces belong to the previous map
+        self.scaled_cache.clear()
+        self.mark_dirty()
+
         # Reset camera and clamp on map load
         self.camera_x = 0
         self.camera_y = 0
-        # self.zoom_level = 1.0 # Zoom is always 1.0 now
+        self.zoom_step, self.zoom_level = self.quantize_zoom(map_data.get('map_scale') or config.DEFAULT_MAP_SCALE)
         self.clamp_camera() # Clamp initially
 
+    def _use_pyramid(self, pyramid):
+        """Make a ready pyramid the current map image."""
+        self.tile_pyramid = pyramid
+        print(f"MapView: Map tiles ready. Size: {(pyramid.width, pyramid.height)}")
+        # Update map dimensions based on the source image
+        self.map_pixel_width = pyramid.width
+        self.map_pixel_height = pyramid.height
+        pyramid.preload_overview()
+        self.clamp_camera()
+        self.mark_dirty()
+
+    def _on_pyramid_built(self, pyramid, ok):
+        """Called on the main thread when a background pyramid build finishes."""
+        if pyramid is not self.pending_pyramid:
+            return # Another map was loaded in the meantime
+        self.pending_pyramid = None
+        if ok and pyramid.load_manifest():
+            self._use_pyramid(pyramid)
+        else:
+            print("MapView ERROR: Could not load map image.")
+            self.mark_dirty()
+
+    def screen_to_map_float(self, screen_pos):
+        """Convert screen coordinates to unrounded map pixel coordinates."""
+        map_x = (screen_pos[0] - self.map_area_rect.left) / self.zoom_level + self.camera_x
+        map_y = (screen_pos[1] - self.map_area_rect.top) / self.zoom_level + self.camera_y
+        return map_x, map_y
+
     def screen_to_map_coords(self, screen_pos):
         """Convert screen coordinates (within map_area_rect) to map pixel coordinates."""
         # Account for camera pan and zoom, and the map area's offset on screen
-        # Zoom is fixed at 1.0
-        map_x = (screen_pos[0] - self.map_area_rect.left) + self.camera_x
-        map_y = (screen_pos[1] - self.map_area_rect.top) + self.camera_y
-        return int(map_x), int(map_y)
+        map_x, map_y = self.screen_to_map_float(screen_pos)
+        return int(math.floor(map_x)), int(math.floor(map_y))
 
     def map_to_grid_coords(self, map_x, map_y=None):
         """Convert map pixel coordinates to grid coordinates.
@@ -230,59 +370,196 @@ class MapView:
     def map_to_screen_coords(self, map_pos):
          """Convert map pixel coordinates to screen coordinates."""
          # Account for camera pan and zoom, and map area offset
-         # Zoom is fixed at 1.0
-         screen_x = (map_pos[0] - self.camera_x) + self.map_area_rect.left
-         screen_y = (map_pos[1] - self.camera_y) + self.map_area_rect.top
-         return int(screen_x), int(screen_y)
-
-    def _load_image(self, image_path, cache):
-        """Loads an image, caches it, handles errors."""
-        if not image_path or not isinstance(image_path, str):
-             return None
-        if image_path in cache:
-            return cache[image_path]
-        try:
-            # Assume paths are relative to an assets directory
-            full_path = os.path.join("assets", image_path) # Adjust structure if needed
-            if os.path.exists(full_path):
-                image = pygame.image.load(full_path).convert_alpha()
-                cache[image_path] = image
-                return image
-            else:
-                print(f"Warning: Image file not found: {full_path}")
-                cache[image_path] = None # Cache the miss
-                return None
-        except pygame.error as e:
-            print(f"Error loading image {image_path}: {e}")
-            cache[image_path] = None # Cache the error
+         screen_x = (map_pos[0] - self.camera_x) * self.zoom_level + self.map_area_rect.left
+         screen_y = (map_pos[1] - self.camera_y) * self.zoom_level + self.map_area_rect.top
+         return int(round(screen_x)), int(round(screen_y))
+
+    def mark_dirty(self):
+        """Force the view to be re-rendered on the next draw."""
+        self.dirty = True
+
+    def mark_map_rect_dirty(self, map_rect):
+        """Re-render only the part of the view showing map_rect (x, y, width, height in map pixels)."""
+        x, y, width, height = map_rect
+        # One pixel of slack for rounding of the token positions
+        view_rect = pygame.Rect(int(math.floor((x - self.camera_x) * self.zoom_level)) - 1,
+                                int(math.floor((y - self.camera_y) * self.zoom_level)) - 1,
+                                int(math.ceil(width * self.zoom_level)) + 3,
+                                int(math.ceil(height * self.zoom_level)) + 3)
+        view_rect = view_rect.clip(self.view_surface.get_rect())
+        if view_rect.width > 0 and view_rect.height > 0:
+            self.dirty_view_rects.append(view_rect)
+
+    def is_animating(self):
+        """True while the camera is moving and the view must be redrawn every frame."""
+        return (self.is_panning_mouse or self.is_panning_up or self.is_panning_down
+                or self.is_panning_left or self.is_panning_right)
+
+    def items_changed(self):
+        """Call after tokens, notes or locations were loaded, added, removed or restyled."""
+        self.items_version += 1
+        self.mark_dirty()
+
+    def _items_key(self, items):
+        """Identifies a list; replacing it with another list counts as a change, editing it needs items_changed()."""
+        return id(items), len(items)
+
+    def token_key(self, token):
+        """Stable identifier of a token dict or record."""
+        key = token.get('instance_id', token.get('map_token_id'))
+        return key if key is not None else id(token)
+
+    def token_map_rect(self, token):
+        """Rect covered by a token in map pixels, or None if it has no position."""
+        grid_x = token.get('x')
+        grid_y = token.get('y')
+        if grid_x is None or grid_y is None:
             return None
+        return (grid_x * self.grid_size, grid_y * self.grid_size, self.grid_size, self.grid_size)
 
+    def location_map_rect(self, location):
+        """Rect covered by a location marker in map pixels (x, y is its top-left corner)."""
+        if location.get('x') is None or location.get('y') is None:
+            return None
+        size = config.LOCATION_MARKER_SIZE
+        return (location['x'], location['y'], size, size)
+
+    def sync_spatial_indexes(self, tokens, locations):
+        """Rebuild the indexes if the token or location lists changed since they were indexed."""
+        tokens_state = (self.grid_size, self.items_version, self._items_key(tokens))
+        if tokens_state != self.indexed_tokens_state:
+            self.token_index.clear()
+            for token in tokens:
+                rect = self.token_map_rect(token) if isinstance(token, (dict, Record)) else None
+                if rect:
+                    self.token_index.insert(self.token_key(token), rect, token)
+                    # Off-screen images load after the visible ones
+                    self.sprite_cache.prefetch(token.get('image_path'))
+            self.indexed_tokens_state = tokens_state
+        self.indexed_tokens = tokens
+
+        locations_state = (self.items_version, self._items_key(locations))
+        if locations_state != self.indexed_locations_state:
+            self.location_index.clear()
+            for location in locations:
+                rect = self.location_map_rect(location) if isinstance(location, (dict, Record)) else None
+                if rect:
+                    self.location_index.insert(location.get('id', id(location)), rect, location)
+            self.indexed_locations_state = locations_state
+
+    def move_token(self, token, grid_x, grid_y):
+        """Move a token dict or record and update its index entry without a full rebuild."""
+        token['x'] = grid_x
+        token['y'] = grid_y
+        self.token_moved(token)
+
+    def token_moved(self, token):
+        """Update the index entry of a token whose x and y were changed in place (TokenStateStore.on_moved)."""
+        if self.indexed_tokens is None:
+            self.mark_dirty()
+            return
+        key = self.token_key(token)
+        old_rect = self.token_index.rect(key)
+        rect = self.token_map_rect(token)
+        if rect:
+            self.token_index.update(key, rect, token)
+        else:
+            self.token_index.remove(key)
+        # Only the cells the token left and entered need re-rendering
+        for changed in (old_rect, rect):
+            if changed:
+                self.mark_map_rect_dirty(changed)
+
+    def visible_map_rect(self, margin=0):
+        """Camera view in map pixels, optionally grown by margin map pixels on every side."""
+        width = self.map_area_rect.width / self.zoom_level
+        height = self.map_area_rect.height / self.zoom_level
+        return (self.camera_x - margin, self.camera_y - margin, width + 2 * margin, height + 2 * margin)
+
+    def tokens_at(self, map_pos):
+        """Tokens under a map pixel position, topmost last."""
+        return self.token_index.query_point(map_pos[0], map_pos[1])
+
+    def tokens_in_rect(self, map_rect):
+        """Tokens overlapping a rect (x, y, width, height) in map pixels, in list order."""
+        return self.token_index.query_rect(map_rect)
+
+    def tokens_in_radius(self, map_pos, radius):
+        return self.token_index.query_radius(map_pos[0], map_pos[1], radius)
+
+    def locations_at(self, map_pos):
+        """Location markers whose circle contains a map pixel position."""
+        radius = config.LOCATION_MARKER_SIZE / 2
+        hits = []
+        for location in self.location_index.query_point(map_pos[0], map_pos[1]):
+            dx = map_pos[0] - (location['x'] + radius)
+            dy = map_pos[1] - (location['y'] + radius)
+            if dx * dx + dy * dy <= radius * radius:
+                hits.append(location)
+        return hits
+
+    def view_state(self, tokens, notes, locations, selected_token_instance_id):
+        """Everything that affects the rendered view, used to detect changes."""
+        return (
+            id(self.tile_pyramid), self.camera_x, self.camera_y, self.zoom_step,
+            self.grid_size, self.grid_enabled, tuple(self.grid_color), self.grid_opacity, self.grid_style,
+            selected_token_instance_id, self.items_version,
+            self._items_key(tokens), self._items_key(notes), self._items_key(locations),
+        )
+
+    def get_dirty_rects(self, tokens, notes, locations, selected_token_instance_id):
+        """Screen rects that need redrawing since the last draw."""
+        if self.dirty or self.view_state(tokens, notes, locations, selected_token_instance_id) != self.last_drawn_state:
+            return [self.map_area_rect.copy()]
+        return [rect.move(self.map_area_rect.topleft) for rect in self.dirty_view_rects]
 
     def draw(self, screen, tokens, notes, locations, selected_token_instance_id):
         """Draw the map view with all elements, handling pan and zoom."""
+        state = self.view_state(tokens, notes, locations, selected_token_instance_id)
+        if not self.dirty and state == self.last_drawn_state:
+            # Reuse the last rendered view, re-rendering only areas where tokens moved
+            for rect in self.dirty_view_rects:
+                self.view_surface.set_clip(rect)
+                self.render_view(tokens, notes, locations, selected_token_instance_id)
+            self.view_surface.set_clip(None)
+            self.dirty_view_rects = []
+            screen.blit(self.view_surface, self.map_area_rect.topleft)
+            return
+        self.dirty = False
+        self.dirty_view_rects = []
+        self.last_drawn_state = state
+        self.sync_spatial_indexes(tokens, locations)
+        self.render_view(tokens, notes, locations, selected_token_instance_id)
+
+        # Finally, blit the completed view_surface onto the main screen
+        screen.blit(self.view_surface, self.map_area_rect.topleft)
+
+    def render_view(self, tokens, notes, locations, selected_token_instance_id):
+        """Render map, grid, tokens and locations onto view_surface, within its clip rect."""
         # Fill the view surface with a background color (e.g., black)
         self.view_surface.fill((0, 0, 0))
 
         # Draw map image if loaded
-        if self.map_surface:
-            # 1. Calculate the source rectangle (portion of the map image to draw)
-            # Zoom is fixed at 1.0
-            source_rect = pygame.Rect(self.camera_x, self.camera_y,
-                                      self.map_area_rect.width, self.map_area_rect.height)
-
-            # Ensure source rect doesn't exceed map image bounds
-            source_rect = source_rect.clip(self.map_surface.get_rect())
-
-            if source_rect.width > 0 and source_rect.height > 0:
-                 # 2. Blit the correct portion of the map image directly (no scaling needed as zoom=1)
-                 self.view_surface.blit(self.map_surface.subsurface(source_rect), (0, 0))
+        if self.tile_pyramid:
+            # Blit only the tiles that intersect the camera rect, scaled for the zoom level
+            with self.profiler.section('map.tiles'):
+                self.tile_pyramid.draw(self.view_surface, self.camera_x, self.camera_y,
+                                       self.zoom_level, self.scaled_cache)
+        elif self.pending_pyramid:
+            # Map tiles are still being built
+            self.view_surface.fill(config.ASSET_PLACEHOLDER_COLOR)
+            if config.DEFAULT_FONT:
+                text = render_text(config.DEFAULT_FONT, "Loading map...", config.UI_TEXT_COLOR)
+                self.view_surface.blit(text, text.get_rect(center=self.view_surface.get_rect().center))
 
 
         # Draw grid onto the view_surface
-        self.draw_grid(self.view_surface)
+        with self.profiler.section('map.grid'):
+            self.draw_grid(self.view_surface)
 
         # Draw tokens onto the view_surface
-        self.draw_tokens(self.view_surface, tokens, selected_token_instance_id)
+        with self.profiler.section('map.tokens'):
+            self.draw_tokens(self.view_surface, tokens, selected_token_instance_id)
 
         # Draw notes onto the view_surface (similar to tokens)
         self.draw_notes(self.view_surface, notes)
@@ -290,70 +567,92 @@ class MapView:
         # Draw locations onto the view_surface (similar to tokens)
         self.draw_locations(self.view_surface, locations)
 
-        # Finally, blit the completed view_surface onto the main screen
-        screen.blit(self.view_surface, self.map_area_rect.topleft)
-
+    def map_view_rect(self):
+        """Rect covered by the map image in view_surface coordinates."""
+        left = round(-self.camera_x * self.zoom_level)
+        top = round(-self.camera_y * self.zoom_level)
+        return pygame.Rect(left, top,
+                           round(self.map_pixel_width * self.zoom_level),
+                           round(self.map_pixel_height * self.zoom_level))
+
+    def _grid_segments(self, cell, length):
+        """(start, end) pixel spans along a grid line; the pattern repeats every cell."""
+        if self.grid_style == 'dashed':
+            # Two dashes per cell, the first one starting on the intersection
+            pattern = [(0.0, 0.25), (0.5, 0.75)]
+        elif self.grid_style == 'dotted':
+            dots = max(1, int(cell // 6))
+            pattern = [(k / dots, k / dots + 1.0 / cell) for k in range(dots)]
+        else:
+            return [(0, length)]
+        segments = []
+        for i in range(int(length / cell) + 1):
+            for start, end in pattern:
+                x0 = int(round((i + start) * cell))
+                x1 = max(x0 + 1, int(round((i + end) * cell)))
+                if x0 < length:
+                    segments.append((x0, min(x1, length)))
+        return segments
+
+    def _build_grid_overlay(self, cell, view_width, view_height):
+        """Render grid lines for one zoom level onto a surface one cell larger than the view."""
+        width = view_width + int(math.ceil(cell)) + 1
+        height = view_height + int(math.ceil(cell)) + 1
+        overlay = pygame.Surface((width, height), pygame.SRCALPHA)
+        overlay.fill((0, 0, 0, 0))
+        color = (self.grid_color[0], self.grid_color[1], self.grid_color[2], self.grid_opacity)
+
+        # One styled line of each direction, stamped at every grid position
+        vertical = pygame.Surface((1, height), pygame.SRCALPHA)
+        vertical.fill((0, 0, 0, 0))
+        for y0, y1 in self._grid_segments(cell, height):
+            vertical.fill(color, (0, y0, 1, y1 - y0))
+        horizontal = pygame.Surface((width, 1), pygame.SRCALPHA)
+        horizontal.fill((0, 0, 0, 0))
+        for x0, x1 in self._grid_segments(cell, width):
+            horizontal.fill(color, (x0, 0, x1 - x0, 1))
+
+        # BLEND_RGBA_MAX keeps intersections at the same opacity as the lines
+        for i in range(int(width / cell) + 2):
+            overlay.blit(vertical, (int(round(i * cell)), 0), special_flags=pygame.BLEND_RGBA_MAX)
+        for i in range(int(height / cell) + 2):
+            overlay.blit(horizontal, (0, int(round(i * cell))), special_flags=pygame.BLEND_RGBA_MAX)
+        return overlay
 
     def draw_grid(self, surface):
         """Draws the grid lines on the target surface, considering camera and zoom."""
-        if not self.map_surface or self.grid_size <= 0:
+        if not self.tile_pyramid or self.grid_size <= 0 or not self.grid_enabled or self.grid_opacity <= 0:
             return
 
-        view_width, view_height = surface.get_size()
-        # grid_size_zoomed = self.grid_size # Zoom is 1.0
-
-        # Calculate the map coordinates of the top-left corner of the view
-        map_start_x = self.camera_x
-        map_start_y = self.camera_y
-
-        # Calculate the map coordinates of the bottom-right corner of the view
-        map_end_x = map_start_x + view_width # Zoom is 1.0
-        map_end_y = map_start_y + view_height # Zoom is 1.0
-
-        # Determine the first grid lines within the view
-        start_grid_x = int(map_start_x // self.grid_size)
-        start_grid_y = int(map_start_y // self.grid_size)
-
-        # Determine the last grid lines to draw
-        end_grid_x = int(map_end_x // self.grid_size) + 1
-        end_grid_y = int(map_end_y // self.grid_size) + 1
-
-        grid_color_with_alpha = (*self.grid_color, self.grid_opacity)
-
-        # Draw vertical lines
-        for grid_x in range(start_grid_x, end_grid_x + 1):
-            map_x = grid_x * self.grid_size
-            # Convert map x-coordinate to view x-coordinate
-            view_x = map_x - self.camera_x # Zoom is 1.0
-
-            if 0 <= view_x <= view_width: # Only draw if potentially visible
-                 # Draw line directly on the surface (view_surface)
-                 start_pos = (int(view_x), 0)
-                 end_pos = (int(view_x), view_height)
-                 pygame.draw.line(surface, grid_color_with_alpha, start_pos, end_pos, 1)
+        cell = self.grid_size * self.zoom_level
+        if cell < 2: # Grid would be a solid fill at this zoom
+            return
 
+        view_width, view_height = surface.get_size()
+        key = ('grid', self.grid_size, self.zoom_step, tuple(self.grid_color), self.grid_opacity,
+               self.grid_style, view_width, view_height)
+        overlay = self.scaled_cache.get_or_create(
+            key, lambda: self._build_grid_overlay(cell, view_width, view_height))
 
-        # Draw horizontal lines
-        for grid_y in range(start_grid_y, end_grid_y + 1):
-            map_y = grid_y * self.grid_size
-            # Convert map y-coordinate to view y-coordinate
-            view_y = map_y - self.camera_y # Zoom is 1.0
+        # Shift the pre-rendered overlay by the camera offset within one grid cell
+        offset_x = -((self.camera_x * self.zoom_level) % cell)
+        offset_y = -((self.camera_y * self.zoom_level) % cell)
 
-            if 0 <= view_y <= view_height: # Only draw if potentially visible
-                 # Draw line directly on the surface (view_surface)
-                 start_pos = (0, int(view_y))
-                 end_pos = (view_width, int(view_y))
-                 pygame.draw.line(surface, grid_color_with_alpha, start_pos, end_pos, 1)
+        # Only draw the grid over the map image itself
+        previous_clip = surface.get_clip()
+        surface.set_clip(self.map_view_rect().clip(previous_clip))
+        surface.blit(overlay, (int(round(offset_x)), int(round(offset_y))))
+        surface.set_clip(previous_clip)
 
 
     def draw_tokens(self, surface, tokens, selected_token_instance_id):
         """Draw tokens onto the target surface, adjusting for camera and zoom."""
         if self.grid_size <= 0: return # Avoid division by zero
 
-        token_size_pixels = self.grid_size # Scale token size with zoom is removed
-        # if token_size_pixels <= 0: return # Grid size check above covers this
+        token_size_pixels = max(1, int(round(self.grid_size * self.zoom_level)))
 
-        for token_data in tokens:
+        # Only tokens overlapping the camera view, in list order
+        for token_data in self.tokens_in_rect(self.visible_map_rect()):
             # Example token data structure (adapt as needed):
             # {'instance_id': '...', 'token_id': '...', 'map_id': '...',
             #  'x': grid_x, 'y': grid_y, 'image_path': '...', 'death_image_path': '...'}
@@ -362,48 +661,33 @@ class MapView:
             grid_y = token_data.get('y')
             image_path = token_data.get('image_path')
             death_image_path = token_data.get('death_image_path') # Optional
-            instance_id = token_data.get('instance_id')
             is_dead = token_data.get('is_dead', False) # Assuming you track this
 
-            if grid_x is None or grid_y is None: continue # Skip if position is invalid
-
-            # Determine which image to use
-            current_image_path = death_image_path if is_dead else image_path
-            if not current_image_path: continue # Skip if no image path
-
-            # Load image (use appropriate cache)
-            cache = self.death_image_cache if is_dead else self.token_image_cache
-            token_image = self._load_image(current_image_path, cache)
-            if not token_image: continue # Skip if image loading failed
-
-            # Scale the token image
-            try:
-                scaled_token_image = pygame.transform.smoothscale(token_image, (token_size_pixels, token_size_pixels))
-            except ValueError: # May happen if token_size_pixels is zero or negative
-                continue
-
             # Calculate map pixel coordinates (top-left corner of the grid cell)
             map_x = grid_x * self.grid_size
             map_y = grid_y * self.grid_size
 
             # Convert map coordinates to view coordinates (relative to the view_surface)
-            view_x = map_x - self.camera_x # Zoom is 1.0
-            view_y = map_y - self.camera_y # Zoom is 1.0
+            view_x = int(round((map_x - self.camera_x) * self.zoom_level))
+            view_y = int(round((map_y - self.camera_y) * self.zoom_level))
 
-            # --- Draw Token ---
-            # Check if the token is at least partially visible within the view surface
-            token_rect_view = pygame.Rect(view_x, view_y, token_size_pixels, token_size_pixels)
-            view_rect = surface.get_rect()
+            # Determine which image to use
+            current_image_path = death_image_path if is_dead else image_path
+            if not current_image_path: continue # Skip if no image path
+
+            # Pre-scaled sprite, only rebuilt when the size or source file changes
+            scaled_token_image = self.sprite_cache.get(current_image_path, token_size_pixels, is_dead)
+            if not scaled_token_image: continue # Skip if image loading failed
 
-            if view_rect.colliderect(token_rect_view):
-                 surface.blit(scaled_token_image, (view_x, view_y))
+            # --- Draw Token ---
+            surface.blit(scaled_token_image, (view_x, view_y))
 
-                 # --- Highlight Selected Token ---
-                 if instance_id == selected_token_instance_id:
-                     highlight_color = (255, 255, 0, 150) # Yellow semi-transparent
-                     # Draw border slightly inside the token bounds
-                     border_rect = pygame.Rect(view_x + 1, view_y + 1, token_size_pixels - 2, token_size_pixels - 2)
-                     pygame.draw.rect(surface, highlight_color, border_rect, 3) # 3px thick border
+            # --- Highlight Selected Token ---
+            if selected_token_instance_id is not None and self.token_key(token_data) == selected_token_instance_id:
+                highlight_color = (255, 255, 0, 150) # Yellow semi-transparent
+                # Draw border slightly inside the token bounds
+                border_rect = pygame.Rect(view_x + 1, view_y + 1, token_size_pixels - 2, token_size_pixels - 2)
+                pygame.draw.rect(surface, highlight_color, border_rect, 3) # 3px thick border
 
 
     def draw_notes(self, surface, notes):
@@ -412,6 +696,14 @@ class MapView:
         pass
 
     def draw_locations(self, surface, locations):
-        """Placeholder for drawing locations."""
-        # TODO: Implement drawing locations, maybe as markers or area highlights
-        pass
\ No newline at end of file
+        """Draw location markers inside the camera view."""
+        radius = max(2, int(round(config.LOCATION_MARKER_SIZE / 2 * self.zoom_level)))
+        for location in self.location_index.query_rect(self.visible_map_rect()):
+            center_x = location['x'] + config.LOCATION_MARKER_SIZE / 2
+            center_y = location['y'] + config.LOCATION_MARKER_SIZE / 2
+            center = (int(round((center_x - self.camera_x) * self.zoom_level)),
+                      int(round((center_y - self.camera_y) * self.zoom_level)))
+            # Locations linking to a sub-map stand out from plain markers
+            color = (100, 150, 255) if location.get('sub_map_id') else (60, 100, 180)
+            pygame.draw.circle(surface, color, center, radius)
+            pygame.draw.circle(surface, (255, 255, 255), center, radius, 2)
\ No newline at end of file
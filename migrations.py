@@ -0,0 +1,227 @@
+# migrations.py
+"""Versioned schema migrations for the game database.
+
+The schema version is stored in SQLite's PRAGMA user_version. Each migration
+runs once, in order, inside its own transaction together with the version
+bump, so a failed migration leaves the database at the previous version.
+Add new migrations to the end of MIGRATIONS; never renumber existing ones.
+A migration that deletes rows returns how many, and the database is
+compacted afterwards only if any were.
+"""
+import sqlite3
+import token_history
+import search_index
+
+
+def _columns(conn, table):
+    return [col[1] for col in conn.execute(f"PRAGMA table_info({table})").fetchall()]
+
+
+def _table_exists(conn, table):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone() is not None
+
+
+def _rebuild_maps_table(conn):
+    """Recreate the maps table to remove the NOT NULL constraint from world_id."""
+    print("  - Renaming existing maps table to maps_old...")
+    # Without legacy_alter_table SQLite would repoint other tables' foreign keys at maps_old
+    conn.execute("PRAGMA legacy_alter_table = ON")
+    conn.execute("ALTER TABLE maps RENAME TO maps_old")
+    conn.execute("PRAGMA legacy_alter_table = OFF")
+
+    print("  - Creating new maps table with correct schema...")
+    conn.execute('''
+    CREATE TABLE maps (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        world_id INTEGER,
+        parent_map_id INTEGER,
+        name TEXT NOT NULL,
+        image_path TEXT NOT NULL,
+        grid_size INTEGER DEFAULT 50,
+        grid_enabled INTEGER DEFAULT 1,
+        width INTEGER DEFAULT 0,
+        height INTEGER DEFAULT 0,
+        grid_color TEXT DEFAULT '#FFFFFF',
+        map_scale REAL DEFAULT 1.0,
+        grid_style TEXT DEFAULT 'dashed',
+        grid_opacity REAL DEFAULT 0.7,
+        map_type TEXT DEFAULT 'world',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (world_id) REFERENCES worlds (id) ON DELETE CASCADE,
+        FOREIGN KEY (parent_map_id) REFERENCES maps (id) ON DELETE CASCADE
+    )
+    ''')
+
+    print("  - Copying data from maps_old to new maps table...")
+    new_columns = _columns(conn, "maps")
+    common_columns = ", ".join(col for col in _columns(conn, "maps_old") if col in new_columns)
+    conn.execute(f"INSERT INTO maps ({common_columns}) SELECT {common_columns} FROM maps_old")
+
+    print("  - Dropping the old maps_old table...")
+    conn.execute("DROP TABLE maps_old")
+
+
+def _migration_1_legacy_columns(conn):
+    """Bring databases created before versioning up to the current table layout."""
+    for col in conn.execute("PRAGMA table_info(maps)").fetchall():
+        if col[1] == 'world_id' and col[3] == 1:
+            print("INFO: Detected incorrect NOT NULL constraint on maps.world_id. Migrating...")
+            _rebuild_maps_table(conn)
+            break
+
+    missing = [
+        ("maps", "parent_map_id", "INTEGER REFERENCES maps (id) ON DELETE CASCADE"),
+        ("maps", "map_type", "TEXT DEFAULT 'world'"),
+        ("map_tokens", "has_moved", "BOOLEAN DEFAULT 0"),
+        ("map_tokens", "current_turn", "INTEGER DEFAULT 0"),
+        ("tokens", "max_hp", "INTEGER DEFAULT 10"),
+        ("tokens", "current_hp", "INTEGER DEFAULT 10"),
+        ("tokens", "armor_class", "INTEGER DEFAULT 10"),
+    ]
+    for table, column, definition in missing:
+        if column not in _columns(conn, table):
+            print(f"Adding {column} column to {table} table...")
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+
+def _migration_2_timeline_indexes(conn):
+    """Indexes for the timeline scrubbing and per-map token queries."""
+    if _table_exists(conn, "token_position_history"):
+        # Only databases from before migration 3 have the legacy history table
+        conn.execute('''
+            CREATE INDEX IF NOT EXISTS idx_token_position_history_token_turn
+            ON token_position_history (map_token_id, turn_number)
+        ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_token_actions_token_turn
+        ON token_actions (map_token_id, turn_number)
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_timeline_events_world_turn
+        ON timeline_events (world_id, turn_number)
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_map_tokens_map
+        ON map_tokens (map_id)
+    ''')
+    conn.execute("ANALYZE")
+
+
+def _migration_3_token_history_keyframes(conn):
+    """Move token_position_history into keyframe + delta storage and drop it."""
+    token_history.create_tables(conn)
+    if not _table_exists(conn, "token_position_history"):
+        return 0
+    # The old table had no unique key, so keep only the last save per token and turn
+    conn.execute('''
+        INSERT OR REPLACE INTO token_history_deltas
+        (map_id, map_token_id, turn_number, x, y, hp, status_effects)
+        SELECT mt.map_id, tph.map_token_id, tph.turn_number, tph.x, tph.y, tph.hp, tph.status_effects
+        FROM token_position_history tph
+        JOIN map_tokens mt ON mt.id = tph.map_token_id
+        ORDER BY tph.id
+    ''')
+    moved = conn.execute("SELECT changes()").fetchone()[0]
+    removed = conn.execute("SELECT COUNT(*) FROM token_position_history").fetchone()[0]
+    conn.execute("DROP TABLE token_position_history")
+    keyframes = token_history.rebuild_keyframes(conn)
+    print(f"  - Moved {moved} history rows, wrote {keyframes} keyframes")
+    return removed
+
+
+def _migration_4_unique_game_state(conn):
+    """Deduplicate game_state and give it a unique key per world."""
+    # Keep the newest row of each world; the oldest is what get_game_state used to return
+    conn.execute('''
+        DELETE FROM game_state
+        WHERE id NOT IN (SELECT MAX(id) FROM game_state GROUP BY world_id)
+    ''')
+    states = conn.execute("SELECT changes()").fetchone()[0]
+    print(f"  - Removed {states} duplicate game_state rows")
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_game_state_world ON game_state (world_id)")
+    return states
+
+
+def _migration_5_map_tree_indexes(conn):
+    """Indexes for walking the map hierarchy and listing a world's maps."""
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_maps_parent ON maps (parent_map_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_maps_world ON maps (world_id)")
+
+
+def _migration_6_search_index(conn):
+    """Full-text index over notes, location icons and timeline events, kept current by triggers."""
+    search_index.create_tables(conn)
+    entries = search_index.rebuild(conn)
+    print(f"  - Indexed {entries} notes, locations and events for search")
+
+# (version, description, function); versions must be consecutive
+MIGRATIONS = [
+    (1, "legacy columns and maps.world_id constraint", _migration_1_legacy_columns),
+    (2, "timeline and map token indexes", _migration_2_timeline_indexes),
+    (3, "keyframe + delta token history", _migration_3_token_history_keyframes),
+    (4, "unique game state", _migration_4_unique_game_state),
+    (5, "map hierarchy indexes", _migration_5_map_tree_indexes),
+    (6, "full-text search index", _migration_6_search_index),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def get_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def database_size(conn):
+    """Bytes used by the database file, excluding free pages."""
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+    free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    return (page_count - free_pages) * page_size, page_count * page_size
+
+
+def compact(conn):
+    """VACUUM the database and report how much it shrank. Returns (bytes before, bytes after)."""
+    if conn.in_transaction:
+        conn.commit()
+    before = database_size(conn)[1]
+    try:
+        conn.execute("VACUUM")
+    except sqlite3.Error as e:
+        print(f"ERROR: VACUUM failed: {e}")
+        return before, before
+    after = database_size(conn)[1]
+    saved = before - after
+    percent = saved / before * 100 if before else 0.0
+    print(f"INFO: Database compacted from {before / 1024:.0f} KB to {after / 1024:.0f} KB "
+          f"({saved / 1024:.0f} KB, {percent:.1f}% smaller)")
+    return before, after
+
+
+def migrate(conn, target_version=None):
+    """Apply every migration newer than the database's user_version. Returns the final version."""
+    target_version = LATEST_VERSION if target_version is None else target_version
+    version = get_version(conn)
+    removed = 0
+    if conn.in_transaction:
+        conn.commit()  # Migrations need their own transactions
+    for migration_version, description, func in MIGRATIONS:
+        if migration_version <= version or migration_version > target_version:
+            continue
+        print(f"DEBUG: Applying migration {migration_version}: {description}")
+        try:
+            conn.execute("BEGIN")
+            migration_removed = func(conn)
+            conn.execute(f"PRAGMA user_version = {int(migration_version)}")
+            conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            print(f"ERROR: Migration {migration_version} failed: {e}. Rolling back.")
+            try:
+                conn.execute("ROLLBACK")
+            except sqlite3.Error as rb_e:
+                print(f"ERROR: Failed during rollback: {rb_e}")
+            break
+        version = migration_version
+        removed += migration_removed or 0
+    if removed:
+        compact(conn)
+    return version
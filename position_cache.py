@@ -0,0 +1,111 @@
+# position_cache.py
+from collections import OrderedDict
+from records import TokenPositionRecord
+import config
+
+
+class PositionCache:
+    """LRU of token positions at past turns, keyed by (map_id, turn) and bounded by the records it holds.
+
+    A saved move only changes the turns from the one it was saved in
+    onwards, and only for that token: update_token() patches exactly those
+    entries instead of dropping the cache. Loads that were started before a
+    change pass the generation they saw to put(), which ignores them if the
+    cache changed meanwhile.
+    """
+
+    def __init__(self, max_records=None):
+        self.max_records = max_records or config.TOKEN_POSITIONS_CACHE_MAX_RECORDS
+        self.records = 0
+        self.generation = 0
+        self._entries = OrderedDict()  # (map_id, turn) -> [TokenPositionRecord]
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _cost(positions):
+        return max(1, len(positions))
+
+    def get(self, map_id, turn):
+        """Cached positions, or None."""
+        positions = self._entries.get((map_id, turn))
+        if positions is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end((map_id, turn))
+        self.hits += 1
+        return positions
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def put(self, map_id, turn, positions, generation=None):
+        """Store positions; ignored if they were loaded before the generation changed."""
+        if generation is not None and generation != self.generation:
+            return False
+        self._remove((map_id, turn))
+        self._entries[(map_id, turn)] = positions
+        self.records += self._cost(positions)
+        while self.records > self.max_records and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            self.records -= self._cost(evicted)
+            self.evictions += 1
+        return True
+
+    def _remove(self, key):
+        positions = self._entries.pop(key, None)
+        if positions is not None:
+            self.records -= self._cost(positions)
+
+    def update_token(self, map_id, from_turn, map_token_id, x, y, hp=None, status_effects=None):
+        """Apply a token save at from_turn to the cached turns it affects.
+
+        Saves happen at the newest turn, so it holds for every cached turn
+        from from_turn on. Entries without the token (placed after they were
+        loaded) are dropped instead.
+        """
+        self.generation += 1
+        for key in [key for key in self._entries if key[0] == map_id and key[1] >= from_turn]:
+            positions = self._entries[key]
+            for i, record in enumerate(positions):
+                if record.map_token_id == map_token_id:
+                    # A new list, since callers may still hold the old one
+                    positions = list(positions)
+                    positions[i] = TokenPositionRecord(map_token_id, record.token_id, record.name, x, y, hp,
+                                                       status_effects, record.image_path, record.size,
+                                                       record.color, record.type)
+                    self._entries[key] = positions
+                    break
+            else:
+                self._remove(key)
+            self.invalidations += 1
+
+    def invalidate(self, map_id=None, from_turn=0):
+        """Drop the entries of one map (or all maps) from from_turn on."""
+        self.generation += 1
+        for key in [key for key in self._entries
+                    if (map_id is None or key[0] == map_id) and key[1] >= from_turn]:
+            self._remove(key)
+            self.invalidations += 1
+
+    def clear(self):
+        self.invalidate()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        """Counters for debugging and profiling."""
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'records': self.records,
+            'max_records': self.max_records,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 2) if lookups else 0.0,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+        }
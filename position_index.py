@@ -0,0 +1,117 @@
+# position_index.py
+"""In-memory, per-map index of token position history for timeline scrubbing.
+
+Each map token gets a TokenTrack: its turn numbers in ascending order with
+parallel x, y, hp and status columns. The state of a token at any turn is
+one bisect away, so scrubbing never touches SQLite once the index is
+loaded. Moves made during play are appended to the end of their track.
+"""
+from array import array
+from bisect import bisect_right
+from records import TokenPositionRecord
+
+
+class TokenTrack:
+    """Position history of one map token, one entry per turn it was saved in."""
+
+    __slots__ = ('turns', 'xs', 'ys', 'hps', 'statuses')
+
+    def __init__(self):
+        self.turns = array('l')
+        self.xs = array('l')
+        self.ys = array('l')
+        self.hps = []  # May hold None, so not an array
+        self.statuses = []
+
+    def __len__(self):
+        return len(self.turns)
+
+    def at(self, turn_number):
+        """(x, y, hp, status_effects) as of the end of turn_number, or None before the first save."""
+        i = bisect_right(self.turns, turn_number) - 1
+        if i < 0:
+            return None
+        return self.xs[i], self.ys[i], self.hps[i], self.statuses[i]
+
+    def record(self, turn_number, x, y, hp=None, status_effects=None):
+        """Save the state for a turn, replacing an earlier save in the same turn."""
+        if not self.turns or turn_number > self.turns[-1]:
+            # Normal play: always the newest turn
+            self.turns.append(turn_number)
+            self.xs.append(x)
+            self.ys.append(y)
+            self.hps.append(hp)
+            self.statuses.append(status_effects)
+            return
+        i = bisect_right(self.turns, turn_number) - 1
+        if i >= 0 and self.turns[i] == turn_number:
+            self.xs[i], self.ys[i], self.hps[i], self.statuses[i] = x, y, hp, status_effects
+            return
+        i += 1
+        self.turns.insert(i, turn_number)
+        self.xs.insert(i, x)
+        self.ys.insert(i, y)
+        self.hps.insert(i, hp)
+        self.statuses.insert(i, status_effects)
+
+
+class PositionIndex:
+    """Token positions of one map at every turn, answered from memory.
+
+    Built from Database.get_token_position_history(); mirrors the history
+    table, so positions_at_turn() returns the same TokenPositionRecords as
+    Database.get_all_token_positions_at_turn().
+    """
+
+    def __init__(self, map_id, tokens, deltas):
+        self.map_id = map_id
+        self.tokens = {}  # map_token_id -> (token_id, name, image_path, size, color, type)
+        self.tracks = {}  # map_token_id -> TokenTrack
+        for map_token_id, token_id, name, image_path, size, color, token_type in tokens:
+            self.tokens[map_token_id] = (token_id, name, image_path, size, color, token_type)
+            self.tracks[map_token_id] = TokenTrack()
+        # Deltas arrive in turn order, so the columns can be appended to directly
+        tracks = self.tracks
+        for map_token_id, turn_number, x, y, hp, status_effects in deltas:
+            track = tracks.get(map_token_id)
+            if track is not None:
+                track.turns.append(turn_number)
+                track.xs.append(x)
+                track.ys.append(y)
+                track.hps.append(hp)
+                track.statuses.append(status_effects)
+
+    def __len__(self):
+        return len(self.tokens)
+
+    def __contains__(self, map_token_id):
+        return map_token_id in self.tokens
+
+    def position_at_turn(self, map_token_id, turn_number):
+        """(x, y, hp, status_effects) of one token, or None."""
+        track = self.tracks.get(map_token_id)
+        return track.at(turn_number) if track is not None else None
+
+    def positions_at_turn(self, turn_number):
+        """TokenPositionRecords for every token on the map; x and y are None before a token's first save."""
+        positions = []
+        for map_token_id, (token_id, name, image_path, size, color, token_type) in self.tokens.items():
+            state = self.tracks[map_token_id].at(turn_number)
+            x, y, hp, status_effects = state if state is not None else (None, None, None, None)
+            positions.append(TokenPositionRecord(map_token_id, token_id, name, x, y, hp, status_effects,
+                                                 image_path, size, color, token_type))
+        return positions
+
+    def record(self, map_token_id, turn_number, x, y, hp=None, status_effects=None):
+        """Mirror a save_token_position(). False if the token is not in the index (it needs reloading)."""
+        track = self.tracks.get(map_token_id)
+        if track is None:
+            return False
+        track.record(turn_number, x, y, hp, status_effects)
+        return True
+
+    def stats(self):
+        return {
+            'tokens': len(self.tokens),
+            'entries': sum(len(track) for track in self.tracks.values()),
+        }
@@ -0,0 +1,168 @@
+# profiler.py
+import csv
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+import pygame
+import config
+from text_cache import render_text
+
+
+class FrameProfiler:
+    """Times named sections of every frame and keeps rolling per-section statistics.
+
+    Sections are timed with `with profiler.section("name"):`; nested or
+    repeated sections within one frame add up. end_frame() stores the frame's
+    totals, optionally appends them to a CSV file, and starts a new frame.
+    """
+
+    def __init__(self, enabled=True, window=None):
+        self.enabled = enabled
+        self.window = window or config.PROFILER_WINDOW
+        self.samples = {}  # section -> deque of per-frame milliseconds
+        self.frame_times = {}  # section -> milliseconds in the current frame
+        self.section_order = []  # Sections in first-seen order, for display
+        self.frame_number = 0
+        self.frame_start = None
+        self.show_overlay = False
+        self.last_overlay_time = 0
+        self.stats_providers = {}  # name -> callable returning a dict of counters
+        self._csv_file = None
+        self._csv_writer = None
+
+    @contextmanager
+    def section(self, name):
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000.0
+            self.frame_times[name] = self.frame_times.get(name, 0.0) + elapsed
+
+    def begin_frame(self):
+        if self.enabled:
+            self.frame_times = {}
+            self.frame_start = time.perf_counter()
+
+    def end_frame(self):
+        """Record the current frame's section times."""
+        if not self.enabled or self.frame_start is None:
+            return
+        self.frame_times['frame'] = (time.perf_counter() - self.frame_start) * 1000.0
+        self.frame_number += 1
+        for name, elapsed in self.frame_times.items():
+            if name not in self.samples:
+                self.samples[name] = deque(maxlen=self.window)
+                self.section_order.append(name)
+            self.samples[name].append(elapsed)
+        if self._csv_writer is not None:
+            for name, elapsed in self.frame_times.items():
+                self._csv_writer.writerow([self.frame_number, name, f"{elapsed:.3f}"])
+        self.frame_start = None
+
+    def percentile(self, name, percent):
+        values = sorted(self.samples.get(name, ()))
+        if not values:
+            return 0.0
+        index = min(len(values) - 1, int(round(percent / 100.0 * (len(values) - 1))))
+        return values[index]
+
+    def summary(self):
+        """{section: {'p50', 'p95', 'p99', 'max', 'frames'}} over the rolling window."""
+        result = {}
+        for name in self.section_order:
+            values = self.samples[name]
+            result[name] = {
+                'p50': self.percentile(name, 50),
+                'p95': self.percentile(name, 95),
+                'p99': self.percentile(name, 99),
+                'max': max(values) if values else 0.0,
+                'frames': len(values),
+            }
+        return result
+
+    def register_stats_provider(self, name, provider):
+        """Add a callable returning a dict of counters to the overlay and report()."""
+        self.stats_providers[name] = provider
+
+    def provider_stats(self):
+        stats = {}
+        for name, provider in self.stats_providers.items():
+            try:
+                stats[name] = provider()
+            except Exception as e:
+                stats[name] = {'error': str(e)}
+        return stats
+
+    def report(self):
+        """Printable multi-line summary."""
+        lines = [f"{'section':<16}{'p50':>8}{'p95':>8}{'p99':>8}{'max':>8}  (ms)"]
+        for name, stats in self.summary().items():
+            lines.append(f"{name:<16}{stats['p50']:>8.2f}{stats['p95']:>8.2f}{stats['p99']:>8.2f}{stats['max']:>8.2f}")
+        for name, stats in self.provider_stats().items():
+            lines.append(f"{name}: " + ", ".join(f"{key}={value}" for key, value in stats.items()))
+        return "\n".join(lines)
+
+    # --- CSV dump ---
+    def start_csv(self, path=None):
+        """Append every following frame's section times to a CSV file (frame, section, ms)."""
+        self.stop_csv()
+        if path is None:
+            path = os.path.join(config.DATA_DIR, time.strftime("profile_%Y%m%d_%H%M%S.csv"))
+        try:
+            self._csv_file = open(path, "w", newline="")
+        except OSError as e:
+            print(f"Profiler: Could not open {path}: {e}")
+            return None
+        self._csv_writer = csv.writer(self._csv_file)
+        self._csv_writer.writerow(["frame", "section", "ms"])
+        print(f"Profiler: Writing frame times to {path}")
+        return path
+
+    def stop_csv(self):
+        if self._csv_file is not None:
+            self._csv_file.close()
+            print("Profiler: CSV closed")
+        self._csv_file = None
+        self._csv_writer = None
+
+    @property
+    def recording(self):
+        return self._csv_writer is not None
+
+    # --- Overlay ---
+    def overlay_due(self):
+        """True if the overlay should be repainted even though nothing else changed."""
+        return self.show_overlay and time.monotonic() - self.last_overlay_time >= config.PROFILER_OVERLAY_INTERVAL
+
+    def overlay_rect(self, position=(10, 10)):
+        lines = len(self.section_order) + len(self.stats_providers) + 1
+        return pygame.Rect(position[0], position[1], 440, lines * 16 + 8)
+
+    def draw_overlay(self, surface, position=(10, 10), fps=None):
+        """Draw rolling percentiles in a translucent box; fps is the measured frame rate, if known."""
+        if not self.show_overlay or not config.SMALL_FONT:
+            return
+        self.last_overlay_time = time.monotonic()
+        rect = self.overlay_rect(position)
+        background = pygame.Surface(rect.size, pygame.SRCALPHA)
+        background.fill((0, 0, 0, 180))
+        surface.blit(background, rect.topleft)
+
+        fps_text = f"{fps:.0f}" if fps else "-"
+        lines = [f"{'section':<14}{'p50':>7}{'p95':>7}{'p99':>7}   fps {fps_text}"]
+        for name, stats in self.summary().items():
+            lines.append(f"{name:<14}{stats['p50']:>7.2f}{stats['p95']:>7.2f}{stats['p99']:>7.2f}")
+        for name, stats in self.provider_stats().items():
+            lines.append(f"{name}: " + " ".join(f"{key}={value}" for key, value in stats.items()))
+        if self.recording:
+            lines[0] += "  REC"
+        y = rect.top + 4
+        for line in lines:
+            text = render_text(config.SMALL_FONT, line, config.UI_TEXT_COLOR)
+            surface.blit(text, (rect.left + 6, y))
+            y += 16
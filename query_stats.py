@@ -0,0 +1,233 @@
+# query_stats.py
+"""Optional per-statement instrumentation for the game database.
+
+Database(instrument=True) opens its connection as an InstrumentedConnection.
+Its cursors time every statement from execute() until its last row has been
+read (SQLite produces SELECT rows lazily, so timing execute() alone would
+miss most of the work) and report count, latency and rows to a QueryStats.
+Statements slower than DB_SLOW_QUERY_MS are logged with their
+EXPLAIN QUERY PLAN.
+"""
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+import config
+
+_WHITESPACE = re.compile(r"\s+")
+_EXPLAINABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE")
+
+
+def normalize(sql):
+    """One-line form of a statement, used as its key."""
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+class StatementStats:
+    """Counters for one distinct statement."""
+
+    __slots__ = ('count', 'total_ms', 'max_ms', 'rows', 'samples')
+
+    def __init__(self, sample_size):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        self.samples = deque(maxlen=sample_size)  # Latest latencies, for the p95
+
+    def add(self, elapsed_ms, rows):
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self.rows += rows
+        self.samples.append(elapsed_ms)
+
+    def percentile(self, percent):
+        values = sorted(self.samples)
+        if not values:
+            return 0.0
+        index = min(len(values) - 1, int(round(percent / 100.0 * (len(values) - 1))))
+        return values[index]
+
+
+class QueryStats:
+    """Collects StatementStats for every statement run on an InstrumentedConnection.
+
+    Statements are recorded on the database thread while the profiler reads
+    totals() on the main thread, so the counters are guarded by a lock.
+    """
+
+    def __init__(self, slow_ms=None, sample_size=None):
+        self.slow_ms = config.DB_SLOW_QUERY_MS if slow_ms is None else slow_ms
+        self.sample_size = sample_size or config.DB_QUERY_SAMPLES
+        self.statements = {}  # normalized sql -> StatementStats
+        self.slow_count = 0
+        self._plans = {}  # normalized sql -> plan lines, logged once per statement
+        self._lock = threading.Lock()
+
+    def record(self, connection, sql, parameters, elapsed_ms, rows):
+        key = normalize(sql)
+        slow = self.slow_ms is not None and elapsed_ms >= self.slow_ms
+        with self._lock:
+            stats = self.statements.get(key)
+            if stats is None:
+                stats = self.statements[key] = StatementStats(self.sample_size)
+            stats.add(elapsed_ms, rows)
+            if slow:
+                self.slow_count += 1
+        if slow:
+            self._log_slow(connection, key, sql, parameters, elapsed_ms, rows)
+
+    def _log_slow(self, connection, key, sql, parameters, elapsed_ms, rows):
+        print(f"WARNING: Slow query ({elapsed_ms:.1f} ms, {rows} rows): {key}")
+        if key in self._plans:
+            return
+        plan = []
+        if key.split(" ", 1)[0].upper() in _EXPLAINABLE and parameters is not None:
+            try:
+                # A plain cursor, so the EXPLAIN is not itself recorded
+                cursor = sqlite3.Cursor(connection)
+                plan = [row[3] for row in cursor.execute("EXPLAIN QUERY PLAN " + sql, parameters)]
+            except sqlite3.Error as e:
+                plan = [f"(no plan: {e})"]
+        self._plans[key] = plan
+        for line in plan:
+            print(f"  plan: {line}")
+
+    def totals(self):
+        """Session totals for Database.stats()."""
+        with self._lock:
+            return {
+                'queries': sum(stats.count for stats in self.statements.values()),
+                'query_ms': round(sum(stats.total_ms for stats in self.statements.values()), 1),
+                'slow': self.slow_count,
+            }
+
+    def summary(self, limit=None):
+        """Per-statement dicts, most total time first."""
+        with self._lock:
+            return self._summary(limit)
+
+    def _summary(self, limit):
+        ranked = sorted(self.statements.items(), key=lambda item: item[1].total_ms, reverse=True)
+        return [{
+            'sql': sql,
+            'count': stats.count,
+            'total_ms': round(stats.total_ms, 3),
+            'mean_ms': round(stats.total_ms / stats.count, 3),
+            'p95_ms': round(stats.percentile(95), 3),
+            'max_ms': round(stats.max_ms, 3),
+            'rows': stats.rows,
+        } for sql, stats in ranked[:limit]]
+
+    def report(self, limit=None):
+        """Printable multi-line summary."""
+        limit = config.DB_QUERY_REPORT_LIMIT if limit is None else limit
+        totals = self.totals()
+        lines = [f"Query summary: {totals['queries']} statements, {totals['query_ms']:.1f} ms total, "
+                 f"{totals['slow']} slow",
+                 f"{'count':>7}{'total':>10}{'mean':>8}{'p95':>8}{'max':>8}{'rows':>8}  (ms)"]
+        for entry in self.summary(limit):
+            sql = entry['sql'] if len(entry['sql']) <= 100 else entry['sql'][:97] + "..."
+            lines.append(f"{entry['count']:>7}{entry['total_ms']:>10.1f}{entry['mean_ms']:>8.2f}"
+                         f"{entry['p95_ms']:>8.2f}{entry['max_ms']:>8.2f}{entry['rows']:>8}  {sql}")
+        return "\n".join(lines)
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor that reports each statement to its connection's QueryStats once its rows are read."""
+
+    def __init__(self, connection):
+        super().__init__(connection)
+        self._pending = None  # [sql, parameters, elapsed_ms, rows] of the statement being read
+
+    def _run(self, method, sql, parameters, explain_parameters):
+        self._finish()
+        start = time.perf_counter()
+        failed = True
+        try:
+            method(sql, parameters)
+            failed = False
+        finally:
+            self._pending = [sql, explain_parameters, (time.perf_counter() - start) * 1000.0, 0]
+            if failed or self.description is None:  # Nothing to read
+                if not failed:
+                    self._pending[3] = max(self.rowcount, 0)
+                self._finish()
+        return self
+
+    def execute(self, sql, parameters=()):
+        return self._run(super().execute, sql, parameters, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        # The parameters may be a generator, so there is nothing to EXPLAIN with
+        return self._run(super().executemany, sql, seq_of_parameters, None)
+
+    def _read(self, start, rows):
+        if self._pending is not None:
+            self._pending[2] += (time.perf_counter() - start) * 1000.0
+            self._pending[3] += rows
+
+    def _finish(self):
+        pending, self._pending = self._pending, None
+        stats = getattr(self.connection, 'query_stats', None)
+        if pending is not None and stats is not None:
+            stats.record(self.connection, *pending)
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._read(start, 0 if row is None else 1)
+        if row is None:
+            self._finish()
+        return row
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._read(start, len(rows))
+        if not rows:
+            self._finish()
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._read(start, len(rows))
+        self._finish()
+        return rows
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._read(start, 0)
+            self._finish()
+            raise
+        self._read(start, 1)
+        return row
+
+    def __del__(self):
+        # Statements whose rows were only partly read (fetchone() on a
+        # one-row query) are recorded when the cursor goes away
+        try:
+            self._finish()
+        except Exception:
+            pass
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """sqlite3 connection factory whose cursors, including those of execute(), are InstrumentedCursors."""
+
+    query_stats = None  # Set to a QueryStats after connecting
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
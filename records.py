@@ -0,0 +1,153 @@
+# records.py
+"""Slotted row records for the tables the game reads on every map load.
+
+The Database builds these straight from a cursor row factory instead of
+returning positional tuples, and the game keeps them as its scene objects
+instead of copying every row into a fresh dict. Fields follow the column
+order of the query that produces the record, so index access (token[0])
+still works; new code reads attributes (token.x), and code written against
+the old dicts can keep using keys (token['x'], token.get('instance_id')).
+"""
+import json
+from dataclasses import dataclass, field
+from typing import Optional
+
+
+class Record:
+    """Mixin for the row dataclasses: tuple- and dict-style access to their fields.
+
+    The fields are the dataclass __init__ arguments (__match_args__), in
+    column order; private cache slots are left out.
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def from_row(cls, cursor, row):
+        """sqlite3 row factory."""
+        return cls(*row)
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        return getattr(self, self.__match_args__[key])
+
+    def __setitem__(self, key, value):
+        if key not in self.__match_args__:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def __len__(self):
+        return len(self.__match_args__)
+
+    def __iter__(self):
+        return (getattr(self, name) for name in self.__match_args__)
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__match_args__}
+
+
+@dataclass(slots=True)
+class MapTokenRecord(Record):
+    """A token placed on a map, as returned by Database.get_map_tokens_with_history()."""
+
+    map_token_id: int
+    token_id: int
+    name: str
+    image_path: str
+    size: int
+    color: str
+    type: str
+    x: int
+    y: int
+    rotation: int
+    active: int
+    initiative: int
+    has_moved: int
+    current_hp: Optional[int]
+    max_hp: Optional[int]
+
+
+@dataclass(slots=True)
+class TokenPositionRecord(Record):
+    """A token's state at a past turn, as returned by Database.get_all_token_positions_at_turn()."""
+
+    map_token_id: int
+    token_id: int
+    name: str
+    x: Optional[int]
+    y: Optional[int]
+    hp: Optional[int]
+    status_effects: Optional[str]
+    image_path: str
+    size: int
+    color: str
+    type: str
+
+
+@dataclass(slots=True)
+class LocationRecord(Record):
+    """A location icon on a map, as returned by Database.get_location_icons()."""
+
+    id: int
+    x: int
+    y: int
+    name: str
+    type: str
+    sub_map_id: Optional[int]
+    notes: Optional[str]
+    audio_file: Optional[str]
+    icon_path: Optional[str]
+
+
+@dataclass(slots=True)
+class TimelineEventRecord(Record):
+    """A timeline_events row, as returned by Database.get_timeline_events()."""
+
+    id: Optional[int]
+    world_id: int
+    map_id: Optional[int]
+    turn_number: int
+    event_type: str
+    title: str
+    description: Optional[str]
+    event_data: Optional[str]
+    timestamp: Optional[str]
+    # (event_data, decoded) of the last .data read; unset until then
+    _decoded: tuple = field(init=False, repr=False, compare=False)
+
+    @property
+    def data(self):
+        """event_data decoded from JSON, or None. Decoded once, and again only after event_data changes."""
+        try:
+            source, decoded = self._decoded
+            if source is self.event_data:
+                return decoded
+        except AttributeError:
+            pass
+        decoded = json.loads(self.event_data) if self.event_data else None
+        self._decoded = (self.event_data, decoded)
+        return decoded
+
+
+@dataclass(slots=True)
+class SearchResultRecord(Record):
+    """A Database.search() hit; snippet marks the matched words with [ and ]. Lower score ranks higher."""
+
+    kind: str
+    id: int
+    map_id: Optional[int]
+    title: str
+    snippet: str
+    score: float
+
+
+# Column lists matching the record fields, for the queries that produce them
+TIMELINE_EVENT_COLUMNS = ("id, world_id, map_id, turn_number, event_type, event_title, "
+                          "event_description, event_data, timestamp")
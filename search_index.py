@@ -0,0 +1,120 @@
+# search_index.py
+"""FTS5 full-text index over notes, location icons and timeline events.
+
+One search_index table holds a title and body for every searchable row; the
+triggers created here keep it in step with the source tables, so nothing in
+the Database has to remember to update it. Index rowids are the source id
+times 4 plus a per-kind code, which lets the triggers replace an entry by
+rowid instead of scanning for it. world_id and map_id are copied in at
+write time (notes and locations get them from their map) and are refreshed
+when a map moves to another world.
+"""
+
+KINDS = ('note', 'location', 'event')
+
+# kind -> (rowid code, source table, title column, body column)
+_SOURCES = {
+    'note': (1, 'notes', 'title', 'content'),
+    'location': (2, 'location_icons', 'name', 'notes'),
+    'event': (3, 'timeline_events', 'event_title', 'event_description'),
+}
+
+# SQL for a source row's map and world; `row` is NEW, OLD or the table itself
+_MAP_ID = {
+    'note': "COALESCE({row}.map_id, (SELECT map_id FROM location_icons WHERE id = {row}.location_icon_id))",
+    'location': "{row}.map_id",
+    'event': "{row}.map_id",
+}
+_WORLD_ID = {
+    'note': "(SELECT world_id FROM maps WHERE id = " + _MAP_ID['note'] + ")",
+    'location': "(SELECT world_id FROM maps WHERE id = {row}.map_id)",
+    'event': "{row}.world_id",
+}
+
+# Title matches count for more than body matches; the first four columns are not indexed
+_RANK = "bm25(search_index, 0, 0, 0, 0, 10.0, 1.0)"
+
+
+def _entry_select(kind, row):
+    """SELECT list producing one search_index row (rowid, kind, ref_id, world_id, map_id, title, body)."""
+    code, _, title, body = _SOURCES[kind]
+    return (f"{row}.id * 4 + {code}, '{kind}', {row}.id, {_WORLD_ID[kind].format(row=row)}, "
+            f"{_MAP_ID[kind].format(row=row)}, {row}.{title}, COALESCE({row}.{body}, '')")
+
+
+def create_tables(conn):
+    conn.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5 (
+            kind UNINDEXED,
+            ref_id UNINDEXED,
+            world_id UNINDEXED,
+            map_id UNINDEXED,
+            title,
+            body,
+            tokenize = 'porter unicode61'
+        )
+    ''')
+    for kind, (code, table, _, _) in _SOURCES.items():
+        insert = f"INSERT INTO search_index (rowid, kind, ref_id, world_id, map_id, title, body) " \
+                 f"SELECT {_entry_select(kind, 'NEW')};"
+        delete = f"DELETE FROM search_index WHERE rowid = OLD.id * 4 + {code};"
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {table}_search_insert "
+                     f"AFTER INSERT ON {table} BEGIN {insert} END")
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {table}_search_update "
+                     f"AFTER UPDATE ON {table} BEGIN {delete} {insert} END")
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {table}_search_delete "
+                     f"AFTER DELETE ON {table} BEGIN {delete} END")
+    # Notes and locations belong to whichever world their map is in
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS maps_search_world
+        AFTER UPDATE OF world_id ON maps WHEN OLD.world_id IS NOT NEW.world_id BEGIN
+            UPDATE search_index SET world_id = NEW.world_id
+            WHERE map_id = NEW.id AND kind IN ('note', 'location');
+        END
+    ''')
+
+
+def rebuild(conn):
+    """Re-index every note, location and event. Returns the number of entries."""
+    conn.execute("DELETE FROM search_index")
+    for kind, (_, table, _, _) in _SOURCES.items():
+        conn.execute(f"INSERT INTO search_index (rowid, kind, ref_id, world_id, map_id, title, body) "
+                     f"SELECT {_entry_select(kind, table)} FROM {table}")
+    conn.execute("INSERT INTO search_index (search_index) VALUES ('optimize')")
+    return conn.execute("SELECT COUNT(*) FROM search_index").fetchone()[0]
+
+
+def match_expression(text):
+    """Turn free text typed by a user into an FTS5 query.
+
+    Every word must match (in any order) and the last one is a prefix, so
+    results show up while the word is still being typed. FTS5 operators in
+    the text are treated as plain words.
+    """
+    words = [word.replace('"', '') for word in text.split()]
+    words = [word for word in words if word]
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return " ".join(terms)
+
+
+def search_query(world_id, kinds, limit):
+    """(sql, extra params after the match expression) for Database.search()."""
+    sql = f'''
+        SELECT kind, ref_id, map_id, title,
+               snippet(search_index, -1, '[', ']', '...', 12), {_RANK} AS score
+        FROM search_index
+        WHERE search_index MATCH ?
+    '''
+    params = []
+    if world_id is not None:
+        sql += " AND world_id = ?"
+        params.append(world_id)
+    if kinds:
+        sql += f" AND kind IN ({', '.join('?' for _ in kinds)})"
+        params.extend(kinds)
+    sql += " ORDER BY score LIMIT ?"
+    params.append(limit)
+    return sql, params
@@ -0,0 +1,117 @@
+# spatial_index.py
+import math
+import config
+
+
+class SpatialHash:
+    """Uniform grid index of axis-aligned rects (in map pixels) for fast culling and hit-testing.
+
+    Every entry is stored in each cell its rect overlaps. Queries only look at
+    the cells touching the query area, and results come back in insertion
+    order so callers keep the same draw and stacking order as their lists.
+    """
+
+    def __init__(self, cell_size=None):
+        self.cell_size = cell_size or config.SPATIAL_INDEX_CELL_SIZE
+        self._cells = {}  # (cell_x, cell_y) -> set of keys
+        self._entries = {}  # key -> (x, y, width, height, item, order)
+        self._next_order = 0
+
+    def _cell_range(self, x, y, width, height):
+        size = self.cell_size
+        first_x = int(math.floor(x / size))
+        first_y = int(math.floor(y / size))
+        last_x = int(math.floor((x + max(width, 1) - 1) / size))
+        last_y = int(math.floor((y + max(height, 1) - 1) / size))
+        for cell_y in range(first_y, last_y + 1):
+            for cell_x in range(first_x, last_x + 1):
+                yield cell_x, cell_y
+
+    def insert(self, key, rect, item=None):
+        """Add or replace an entry. rect is (x, y, width, height) in map pixels."""
+        order = None
+        if key in self._entries:
+            order = self._entries[key][5]
+            self.remove(key)
+        if order is None:
+            order = self._next_order
+            self._next_order += 1
+        x, y, width, height = rect
+        self._entries[key] = (x, y, width, height, item if item is not None else key, order)
+        for cell in self._cell_range(x, y, width, height):
+            self._cells.setdefault(cell, set()).add(key)
+
+    def update(self, key, rect, item=None):
+        """Move an entry, keeping its original order."""
+        self.insert(key, rect, item)
+
+    def remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for cell in self._cell_range(*entry[:4]):
+            keys = self._cells.get(cell)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._cells[cell]
+
+    def clear(self):
+        self._cells.clear()
+        self._entries.clear()
+        self._next_order = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def rect(self, key):
+        """(x, y, width, height) of an entry, or None."""
+        entry = self._entries.get(key)
+        return entry[:4] if entry is not None else None
+
+    def _candidates(self, x, y, width, height):
+        keys = set()
+        for cell in self._cell_range(x, y, width, height):
+            found = self._cells.get(cell)
+            if found:
+                keys.update(found)
+        return keys
+
+    def _sorted_items(self, keys):
+        entries = sorted((self._entries[key] for key in keys), key=lambda entry: entry[5])
+        return [entry[4] for entry in entries]
+
+    def query_rect(self, rect):
+        """Items whose rect intersects rect (x, y, width, height)."""
+        x, y, width, height = rect
+        hits = []
+        for key in self._candidates(x, y, width, height):
+            ex, ey, ew, eh = self._entries[key][:4]
+            if ex < x + width and x < ex + ew and ey < y + height and y < ey + eh:
+                hits.append(key)
+        return self._sorted_items(hits)
+
+    def query_point(self, x, y):
+        """Items whose rect contains the point, in insertion order (topmost last)."""
+        hits = []
+        for key in self._candidates(x, y, 1, 1):
+            ex, ey, ew, eh = self._entries[key][:4]
+            if ex <= x < ex + ew and ey <= y < ey + eh:
+                hits.append(key)
+        return self._sorted_items(hits)
+
+    def query_radius(self, x, y, radius):
+        """Items whose rect comes within radius of the point."""
+        hits = []
+        radius_sq = radius * radius
+        for key in self._candidates(x - radius, y - radius, 2 * radius + 1, 2 * radius + 1):
+            ex, ey, ew, eh = self._entries[key][:4]
+            # Distance from the point to the closest point of the rect
+            dx = max(ex - x, 0, x - (ex + ew))
+            dy = max(ey - y, 0, y - (ey + eh))
+            if dx * dx + dy * dy <= radius_sq:
+                hits.append(key)
+        return self._sorted_items(hits)
@@ -0,0 +1,153 @@
+# sprite_cache.py
+import os
+import time
+from collections import OrderedDict
+import pygame
+import config
+
+
+class SpriteCache:
+    """Pre-scaled token sprites keyed by (image path, pixel size, dead state).
+
+    Source images are loaded once and each scaled variant is built once, so
+    drawing a token is a dictionary lookup plus a blit. Entries are dropped
+    when the grid size changes or when a source file is modified on disk.
+    """
+
+    def __init__(self, assets_dir="assets", max_entries=None, mtime_check_interval=None, loader=None, on_loaded=None):
+        self.assets_dir = assets_dir
+        self.loader = loader  # Optional AssetLoader; images are then decoded in the background
+        self.on_loaded = on_loaded  # Called on the main thread when a background load finishes
+        self._placeholders = {}  # size -> surface shown while an image is loading
+        self.max_entries = max_entries or config.SPRITE_CACHE_MAX_ENTRIES
+        self.mtime_check_interval = (config.SPRITE_MTIME_CHECK_INTERVAL
+                                     if mtime_check_interval is None else mtime_check_interval)
+        self.grid_size = None
+        self._sources = {}  # image_path -> (surface or None, mtime)
+        self._last_checked = {}  # image_path -> time of last mtime check
+        self._sprites = OrderedDict()  # (image_path, size, is_dead) -> surface, in LRU order
+        self.hits = 0
+        self.misses = 0
+
+    def set_grid_size(self, grid_size):
+        """Drop all scaled sprites if the grid size changed."""
+        if grid_size != self.grid_size:
+            self.grid_size = grid_size
+            self._sprites.clear()
+
+    def _full_path(self, image_path):
+        # Assume paths are relative to an assets directory
+        return os.path.join(self.assets_dir, image_path)
+
+    def _mtime(self, full_path):
+        try:
+            return os.path.getmtime(full_path)
+        except OSError:
+            return None
+
+    def _check_source(self, image_path):
+        """Invalidate an image if its file changed; checked at most once per interval."""
+        now = time.monotonic()
+        if now - self._last_checked.get(image_path, 0) < self.mtime_check_interval:
+            return
+        self._last_checked[image_path] = now
+        cached = self._sources.get(image_path)
+        if cached is not None and self._mtime(self._full_path(image_path)) != cached[1]:
+            self.invalidate(image_path)
+
+    def load_source(self, image_path, priority=0):
+        """Load an unscaled image, caching misses and errors too.
+
+        With a loader the decode is queued and None is returned until it is done.
+        """
+        if not image_path or not isinstance(image_path, str):
+            return None
+        self._check_source(image_path)
+        cached = self._sources.get(image_path)
+        if cached is not None:
+            return cached[0]
+        full_path = self._full_path(image_path)
+        mtime = self._mtime(full_path)
+        image = None
+        if mtime is None:
+            print(f"Warning: Image file not found: {full_path}")
+        elif self.loader is not None:
+            self.loader.request_image(('sprite', image_path), full_path, self._on_source_loaded, priority)
+            return None
+        else:
+            try:
+                image = pygame.image.load(full_path).convert_alpha()
+            except pygame.error as e:
+                print(f"Error loading image {image_path}: {e}")
+        self._sources[image_path] = (image, mtime)
+        return image
+
+    def _on_source_loaded(self, key, image):
+        image_path = key[1]
+        self._sources[image_path] = (image, self._mtime(self._full_path(image_path)))
+        if self.on_loaded is not None:
+            self.on_loaded()
+
+    def is_loading(self, image_path):
+        return self.loader is not None and self.loader.is_pending(('sprite', image_path))
+
+    def prefetch(self, image_path, priority=None):
+        """Start loading an image that is not on screen yet."""
+        if image_path and image_path not in self._sources:
+            self.load_source(image_path, config.ASSET_PREFETCH_PRIORITY if priority is None else priority)
+
+    def placeholder(self, size):
+        """Neutral square drawn in place of a token whose image is still loading."""
+        surface = self._placeholders.get(size)
+        if surface is None:
+            surface = pygame.Surface((size, size), pygame.SRCALPHA)
+            pygame.draw.rect(surface, config.ASSET_PLACEHOLDER_COLOR, surface.get_rect(),
+                             border_radius=max(1, size // 6))
+            self._placeholders[size] = surface
+        return surface
+
+    def get(self, image_path, size, is_dead=False, priority=0):
+        """Return the sprite for image_path scaled to size x size pixels, or None.
+
+        While the image is loading in the background a placeholder is returned.
+        """
+        if not image_path:
+            return None
+        self._check_source(image_path)
+        key = (image_path, size, bool(is_dead))
+        sprite = self._sprites.get(key)
+        if sprite is not None:
+            self._sprites.move_to_end(key)
+            self.hits += 1
+            return sprite
+
+        self.misses += 1
+        image = self.load_source(image_path, priority)
+        if image is None:
+            return self.placeholder(size) if self.is_loading(image_path) else None
+        sprite = pygame.transform.smoothscale(image, (size, size))
+        self._sprites[key] = sprite
+        while len(self._sprites) > self.max_entries:
+            self._sprites.popitem(last=False)
+        return sprite
+
+    def invalidate(self, image_path):
+        """Forget the source and every scaled variant of one image."""
+        self._sources.pop(image_path, None)
+        for key in [k for k in self._sprites if k[0] == image_path]:
+            del self._sprites[key]
+
+    def clear(self):
+        self._placeholders.clear()
+        self._sources.clear()
+        self._last_checked.clear()
+        self._sprites.clear()
+
+    def stats(self):
+        """Counters for debugging and profiling."""
+        return {
+            'sprites': len(self._sprites),
+            'sources': len(self._sources),
+            'hits': self.hits,
+            'misses': self.misses,
+        }
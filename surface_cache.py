@@ -0,0 +1,75 @@
+# surface_cache.py
+from collections import OrderedDict
+
+
+class SurfaceCache:
+    """LRU cache of pygame surfaces bounded by an approximate pixel memory budget."""
+
+    def __init__(self, budget_bytes):
+        self.budget_bytes = budget_bytes
+        self.used_bytes = 0
+        self._entries = OrderedDict()  # key -> (surface, size_in_bytes)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def surface_bytes(surface):
+        """Approximate memory used by a surface's pixels."""
+        width, height = surface.get_size()
+        return width * height * surface.get_bytesize()
+
+    def get(self, key):
+        """Return the cached surface for key, or None."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key, surface):
+        """Store a surface, evicting the least recently used ones over budget."""
+        if key in self._entries:
+            self.used_bytes -= self._entries.pop(key)[1]
+        size = self.surface_bytes(surface)
+        self._entries[key] = (surface, size)
+        self.used_bytes += size
+        while self.used_bytes > self.budget_bytes and len(self._entries) > 1:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self.used_bytes -= evicted_size
+            self.evictions += 1
+        return surface
+
+    def get_or_create(self, key, factory):
+        """Return the cached surface for key, building it with factory() on a miss."""
+        surface = self.get(key)
+        if surface is None:
+            surface = factory()
+            if surface is not None:
+                self.put(key, surface)
+        return surface
+
+    def discard(self, predicate):
+        """Remove every entry whose key matches predicate(key)."""
+        for key in [k for k in self._entries if predicate(k)]:
+            self.used_bytes -= self._entries.pop(key)[1]
+
+    def clear(self):
+        self._entries.clear()
+        self.used_bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        """Counters for debugging and profiling."""
+        return {
+            'entries': len(self._entries),
+            'bytes': self.used_bytes,
+            'budget_bytes': self.budget_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
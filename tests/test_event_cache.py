@@ -0,0 +1,80 @@
+# test_event_cache.py
+from concurrent.futures import Future
+
+from event_cache import TimelineEventCache, _merge, _subtract
+from records import TimelineEventRecord
+
+
+def test_subtract():
+    assert _subtract(0, 10, []) == [(0, 10)]
+    assert _subtract(0, 10, [(0, 10)]) == []
+    assert _subtract(0, 10, [(3, 5)]) == [(0, 2), (6, 10)]
+    assert _subtract(0, 10, [(0, 2), (8, 20)]) == [(3, 7)]
+    assert _subtract(5, 6, [(0, 2), (8, 9)]) == [(5, 6)]
+    assert _subtract(0, 10, [(2, 3), (5, 6)]) == [(0, 1), (4, 4), (7, 10)]
+
+
+def test_merge():
+    assert _merge([], 3, 5) == [(3, 5)]
+    assert _merge([(0, 2)], 3, 5) == [(0, 5)]  # Adjacent ranges are joined
+    assert _merge([(0, 2), (8, 9)], 4, 5) == [(0, 2), (4, 5), (8, 9)]
+    assert _merge([(0, 2), (8, 9)], 1, 8) == [(0, 9)]
+    assert _merge([(0, 10)], 3, 4) == [(0, 10)]
+
+
+def event(event_id, turn):
+    return TimelineEventRecord(event_id, 1, 1, turn, 'custom', f'event {event_id}', '', None, None)
+
+
+class FakeDb:
+    """Queues submit() jobs and runs them, with their callbacks, when run() is called."""
+
+    def __init__(self, events):
+        self.rows = events
+        self.jobs = []
+
+    def submit(self, method, *args, callback=None):
+        future = Future()
+        self.jobs.append((future, method, args, callback))
+        return future
+
+    def get_timeline_events(self, world_id, start, end):
+        return [row for row in self.rows if start <= row.turn_number <= end]
+
+    def run(self):
+        jobs, self.jobs = self.jobs, []
+        for future, method, args, callback in jobs:
+            future.set_result(getattr(self, method)(*args))
+            if callback is not None:
+                callback(future.result())
+
+
+def test_ensure_queues_only_missing_turns():
+    db = FakeDb([])
+    cache = TimelineEventCache(db, 1)
+    cache.ensure(0, 5)
+    cache.ensure(3, 8)  # 0-5 is already queued
+    assert [job[2] for job in db.jobs] == [(1, 0, 5), (1, 6, 8)]
+    db.run()
+    assert cache.loaded == [(0, 8)] and cache.pending == []
+    cache.ensure(2, 7)
+    assert db.jobs == []
+
+
+def test_merge_skips_local_inserts_by_future():
+    db = FakeDb([event(1, 0), event(2, 3)])
+    cache = TimelineEventCache(db, 1)
+
+    local = event(None, 3)
+    insert = Future()
+    cache.append(3, local, insert)
+    cache.ensure(0, 5)
+    # The insert ran before the read, but its own callback has not been polled yet
+    insert.set_result(2)
+    db.run()
+
+    assert local.id == 2
+    assert [e.id for e in cache.events_for_turn(3)] == [2]
+    assert [e.id for e in cache.events_for_turn(0)] == [1]
+    assert cache.loaded == [(0, 5)]
+    assert cache.inserts == []
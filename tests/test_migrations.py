@@ -0,0 +1,143 @@
+# test_migrations.py
+import sqlite3
+
+import migrations
+from database import Database
+
+# The tables migrations 1-4 touch, as databases from before versioning have them
+BASELINE_SCHEMA = '''
+CREATE TABLE worlds (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL UNIQUE,
+    description TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    last_accessed TIMESTAMP
+);
+CREATE TABLE maps (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    world_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    image_path TEXT NOT NULL,
+    grid_size INTEGER DEFAULT 50,
+    grid_enabled INTEGER DEFAULT 1,
+    width INTEGER DEFAULT 0,
+    height INTEGER DEFAULT 0,
+    grid_color TEXT DEFAULT '#FFFFFF',
+    map_scale REAL DEFAULT 1.0,
+    grid_style TEXT DEFAULT 'dashed',
+    grid_opacity REAL DEFAULT 0.7,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (world_id) REFERENCES worlds (id) ON DELETE CASCADE
+);
+CREATE TABLE tokens (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    image_path TEXT NOT NULL,
+    size INTEGER DEFAULT 1,
+    color TEXT DEFAULT "255,0,0",
+    type TEXT DEFAULT "character",
+    notes TEXT,
+    initiative INTEGER DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE map_tokens (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    map_id INTEGER NOT NULL,
+    token_id INTEGER NOT NULL,
+    x INTEGER NOT NULL,
+    y INTEGER NOT NULL,
+    rotation INTEGER DEFAULT 0,
+    active BOOLEAN DEFAULT 1,
+    initiative INTEGER DEFAULT 0,
+    FOREIGN KEY (map_id) REFERENCES maps (id) ON DELETE CASCADE,
+    FOREIGN KEY (token_id) REFERENCES tokens (id) ON DELETE CASCADE
+);
+CREATE TABLE token_position_history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    map_token_id INTEGER NOT NULL,
+    turn_number INTEGER NOT NULL,
+    x INTEGER NOT NULL,
+    y INTEGER NOT NULL,
+    hp INTEGER,
+    status_effects TEXT,
+    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (map_token_id) REFERENCES map_tokens (id) ON DELETE CASCADE
+);
+CREATE TABLE game_state (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    world_id INTEGER NOT NULL,
+    current_turn INTEGER DEFAULT 0,
+    current_map_id INTEGER,
+    active_token_id INTEGER,
+    state_data TEXT,
+    last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (world_id) REFERENCES worlds (id) ON DELETE CASCADE,
+    FOREIGN KEY (current_map_id) REFERENCES maps (id) ON DELETE SET NULL
+);
+'''
+
+
+def make_baseline_db(path):
+    conn = sqlite3.connect(path)
+    conn.executescript(BASELINE_SCHEMA)
+    conn.execute("INSERT INTO worlds (id, name) VALUES (1, 'World')")
+    conn.execute("INSERT INTO maps (id, world_id, name, image_path) VALUES (1, 1, 'Map', 'map.png')")
+    conn.execute("INSERT INTO tokens (id, name, image_path) VALUES (1, 'Fighter', 'a.png'), (2, 'Wizard', 'b.png')")
+    conn.execute("INSERT INTO map_tokens (id, map_id, token_id, x, y) VALUES (1, 1, 1, 0, 0), (2, 1, 2, 5, 5)")
+    # Saved several times in the same turn; the last save of each turn counts
+    conn.executemany(
+        "INSERT INTO token_position_history (map_token_id, turn_number, x, y, hp) VALUES (?, ?, ?, ?, ?)", [
+            (1, 0, 0, 0, 10),
+            (1, 1, 1, 0, 10),
+            (1, 1, 2, 0, 9),
+            (2, 0, 5, 5, 8),
+            (2, 20, 6, 5, 8),
+            (2, 20, 7, 5, 7),
+            (1, 30, 3, 3, 4),
+        ])
+    # Saving the game state used to add a row each time
+    conn.executemany("INSERT INTO game_state (world_id, current_turn, current_map_id) VALUES (?, ?, ?)",
+                     [(1, 3, 1), (1, 12, 1), (1, 31, 1)])
+    conn.commit()
+    conn.close()
+
+
+def positions(db, turn):
+    return {record.map_token_id: (record.x, record.y, record.hp)
+            for record in db.get_all_token_positions_at_turn(1, turn)}
+
+
+def test_migrate_baseline_database(tmp_path):
+    path = str(tmp_path / "baseline.db")
+    make_baseline_db(path)
+
+    db = Database(path, write_behind=False, instrument=False)
+    try:
+        assert migrations.get_version(db.conn) == migrations.LATEST_VERSION
+        assert db.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'token_position_history'").fetchone() is None
+
+        assert positions(db, 0) == {1: (0, 0, 10), 2: (5, 5, 8)}
+        assert positions(db, 1) == {1: (2, 0, 9), 2: (5, 5, 8)}
+        assert positions(db, 25) == {1: (2, 0, 9), 2: (7, 5, 7)}
+        assert positions(db, 40) == {1: (3, 3, 4), 2: (7, 5, 7)}
+
+        # The newest of the duplicate rows survives
+        assert db.get_game_state(1)[:2] == (31, 1)
+        assert db.conn.execute("SELECT COUNT(*) FROM game_state").fetchone()[0] == 1
+    finally:
+        db.close()
+
+
+def test_reads_do_not_write_keyframes(tmp_path):
+    path = str(tmp_path / "baseline.db")
+    make_baseline_db(path)
+    db = Database(path, write_behind=False, instrument=False)
+    try:
+        db.conn.execute("DELETE FROM token_history_keyframes")
+        db.conn.commit()
+        changes = db.conn.total_changes
+        assert positions(db, 40) == {1: (3, 3, 4), 2: (7, 5, 7)}
+        assert db.conn.total_changes == changes
+    finally:
+        db.close()
@@ -0,0 +1,66 @@
+# test_position_cache.py
+from position_cache import PositionCache
+from records import TokenPositionRecord
+
+
+def record(map_token_id, x, y):
+    return TokenPositionRecord(map_token_id, map_token_id * 10, f'token {map_token_id}', x, y, None, None,
+                               None, 1, None, 'player')
+
+
+def test_lru_eviction_by_records():
+    cache = PositionCache(max_records=4)
+    cache.put(1, 1, [record(1, 0, 0), record(2, 0, 0)])
+    cache.put(1, 2, [record(1, 0, 0)])
+    assert cache.get(1, 1) is not None  # Turn 1 is now the most recently used
+    cache.put(1, 3, [record(1, 0, 0), record(2, 0, 0)])  # 5 records: turn 2 has to go
+    assert (1, 2) not in cache
+    assert (1, 1) in cache and (1, 3) in cache
+    assert cache.records == 4
+    assert cache.evictions == 1
+
+    cache.put(1, 4, [record(n, 0, 0) for n in range(6)])  # Too big, but the newest entry is kept
+    assert len(cache) == 1 and (1, 4) in cache
+    assert cache.records == 6
+
+
+def test_empty_entries_count_towards_the_limit():
+    cache = PositionCache(max_records=2)
+    for turn in range(3):
+        cache.put(1, turn, [])
+    assert len(cache) == 2
+    assert (1, 0) not in cache
+
+
+def test_update_token_patches_later_turns():
+    cache = PositionCache(max_records=100)
+    old = [record(1, 0, 0), record(2, 5, 5)]
+    for turn in (3, 5, 7):
+        cache.put(1, turn, old)
+    cache.put(2, 7, old)  # Another map
+    cache.put(1, 6, [record(2, 5, 5)])  # Loaded before token 1 was placed
+
+    cache.update_token(1, 5, 1, 50, 60, hp=3)
+    assert cache.get(1, 3) is old
+    moved, other = cache.get(1, 5)
+    assert (moved.x, moved.y, moved.hp, moved.name) == (50, 60, 3, 'token 1')
+    assert other is old[1]
+    assert (cache.get(1, 7)[0].x, cache.get(1, 7)[0].y) == (50, 60)
+    assert (old[0].x, old[0].y) == (0, 0)  # Lists handed out earlier are left alone
+    assert (1, 6) not in cache
+    assert cache.get(2, 7) is old
+    assert cache.records == 8
+
+
+def test_generation_rejects_stale_loads():
+    cache = PositionCache(max_records=100)
+    generation = cache.generation
+    cache.update_token(1, 0, 1, 50, 60)
+    assert not cache.put(1, 4, [record(1, 0, 0)], generation)
+    assert (1, 4) not in cache
+    assert cache.put(1, 4, [record(1, 50, 60)], cache.generation)
+
+    generation = cache.generation
+    cache.invalidate(1, from_turn=5)
+    assert not cache.put(1, 6, [], generation)
+    assert (1, 4) in cache
@@ -0,0 +1,53 @@
+# test_position_index.py
+from position_index import PositionIndex, TokenTrack
+
+TOKENS = [
+    (1, 10, 'Fighter', 'fighter.png', 1, None, 'player'),
+    (2, 20, 'Goblin', 'goblin.png', 1, None, 'enemy'),
+]
+# Token 1 saved at turns 3, 5 and 9; token 2 only at turn 5
+DELTAS = [
+    (1, 3, 100, 100, 12, None),
+    (1, 5, 150, 100, 12, None),
+    (2, 5, 400, 300, 7, 'poisoned'),
+    (1, 9, 150, 200, 8, None),
+]
+
+
+def test_at_turn_boundaries():
+    index = PositionIndex(1, TOKENS, DELTAS)
+    assert index.position_at_turn(1, 2) is None  # Before the first save
+    assert index.position_at_turn(1, 3) == (100, 100, 12, None)
+    assert index.position_at_turn(1, 4) == (100, 100, 12, None)
+    assert index.position_at_turn(1, 5) == (150, 100, 12, None)
+    assert index.position_at_turn(1, 8) == (150, 100, 12, None)
+    assert index.position_at_turn(1, 9) == (150, 200, 8, None)
+    assert index.position_at_turn(1, 1000) == (150, 200, 8, None)  # After the last save
+    assert index.position_at_turn(3, 5) is None  # Not on the map
+
+
+def test_positions_at_turn():
+    index = PositionIndex(1, TOKENS, DELTAS)
+    fighter, goblin = index.positions_at_turn(4)
+    assert (fighter.map_token_id, fighter.x, fighter.y, fighter.hp) == (1, 100, 100, 12)
+    assert (goblin.map_token_id, goblin.x, goblin.y) == (2, None, None)
+    fighter, goblin = index.positions_at_turn(5)
+    assert (goblin.x, goblin.y, goblin.status_effects, goblin.name) == (400, 300, 'poisoned', 'Goblin')
+
+
+def test_record():
+    track = TokenTrack()
+    track.record(5, 1, 1)
+    track.record(9, 2, 2)
+    track.record(9, 3, 3)  # Same turn: replaces the save
+    track.record(7, 4, 4)  # Earlier turn: inserted in order
+    assert list(track.turns) == [5, 7, 9]
+    assert track.at(6) == (1, 1, None, None)
+    assert track.at(8) == (4, 4, None, None)
+    assert track.at(9) == (3, 3, None, None)
+
+    index = PositionIndex(1, TOKENS, DELTAS)
+    assert index.record(1, 12, 0, 0)
+    assert index.position_at_turn(1, 11) == (150, 200, 8, None)
+    assert index.position_at_turn(1, 12) == (0, 0, None, None)
+    assert not index.record(3, 12, 0, 0)
@@ -0,0 +1,67 @@
+# test_search_index.py
+import pytest
+
+from database import Database
+from search_index import match_expression
+
+
+def test_match_expression():
+    assert match_expression("") is None
+    assert match_expression("   ") is None
+    assert match_expression("dragon") == '"dragon"*'
+    assert match_expression("red  dragon") == '"red" "dragon"*'
+    # FTS5 syntax is searched for as plain words
+    assert match_expression('dragon OR NOT "lair') == '"dragon" "OR" "NOT" "lair"*'
+    assert match_expression('gob* "" (cave)') == '"gob*" "(cave)"*'
+
+
+@pytest.fixture
+def db(tmp_path):
+    database = Database(str(tmp_path / 'game_data.db'), write_behind=False, instrument=False)
+    yield database
+    database.close()
+
+
+@pytest.fixture
+def world_map(db):
+    world_id = db.create_world("Test World")
+    map_id = db.save_or_update_map({'world_id': world_id, 'name': "Overworld", 'image_path': 'overworld.png'})
+    return world_id, map_id
+
+
+def titles(results):
+    return [result.title for result in results]
+
+
+def test_search_prefix_and_quoting(db, world_map):
+    world_id, map_id = world_map
+    db.add_location_icon(map_id, 0, 0, "Dragon Lair", notes="An old red dragon sleeps here")
+    db.add_location_icon(map_id, 10, 10, "Goblin Cave", notes="Goblins OR kobolds")
+    db.add_timeline_event(world_id, 3, 'custom', "Smoke sighted", "A dragon over the mountains", map_id=map_id)
+
+    assert titles(db.search(world_id, "drag")) == ["Dragon Lair", "Smoke sighted"]  # Title matches first
+    assert titles(db.search(world_id, "red drag")) == ["Dragon Lair"]
+    assert titles(db.search(world_id, "drag", kinds=['event'])) == ["Smoke sighted"]
+    assert titles(db.search(world_id, 'goblins OR')) == ["Goblin Cave"]
+    assert titles(db.search(world_id, '"lair')) == ["Dragon Lair"]
+    assert db.search(world_id, 'NOT dragon') == []  # NOT is a word here, not an operator
+    assert db.search(world_id + 1, "drag") == []
+    assert db.search(world_id, "") == []
+
+
+def test_triggers_keep_the_index_in_step(db, world_map):
+    world_id, map_id = world_map
+    icon_id = db.add_location_icon(map_id, 0, 0, "Old Mill", notes="Flour and rats")
+    [result] = db.search(world_id, "mill")
+    assert (result.kind, result.id, result.map_id) == ('location', icon_id, map_id)
+
+    db.update_location_icon(icon_id, name="Burnt Mill", notes="Ashes")
+    assert titles(db.search(world_id, "burnt")) == ["Burnt Mill"]
+    assert db.search(world_id, "rats") == []
+
+    event_id = db.add_timeline_event(world_id, 1, 'custom', "Mill fire", "The mill burned down", map_id=map_id)
+    assert [(result.kind, result.id) for result in db.search(world_id, "fire")] == [('event', event_id)]
+
+    db.delete_location_icon(icon_id)
+    assert titles(db.search(world_id, "mill")) == ["Mill fire"]
+    assert db.rebuild_search_index() == 1
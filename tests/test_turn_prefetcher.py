@@ -0,0 +1,77 @@
+# test_turn_prefetcher.py
+from concurrent.futures import Future
+
+from position_cache import PositionCache
+from turn_prefetcher import TurnPrefetcher
+
+
+class FakeLoader:
+    """Stands in for AsyncDatabase.submit: records each load and hands back a Future nobody has started."""
+
+    def __init__(self):
+        self.futures = {}  # turn -> Future
+        self.callbacks = {}  # turn -> callback
+
+    def __call__(self, map_id, turn, callback=None):
+        future = Future()
+        self.futures[turn] = future
+        self.callbacks[turn] = callback
+        return future
+
+
+def make_prefetcher():
+    loader = FakeLoader()
+    prefetcher = TurnPrefetcher(loader, PositionCache(max_records=1000), lookahead=0.5, max_turns=4, samples=8)
+    return loader, prefetcher
+
+
+def scrub(prefetcher, turns, interval=0.1):
+    for i, turn in enumerate(turns):
+        prefetcher.observe(1, turn, max_turn=100, now=i * interval)
+
+
+def test_prefetches_ahead_of_the_handle():
+    loader, prefetcher = make_prefetcher()
+    scrub(prefetcher, [10, 20, 30])
+    assert prefetcher.predict(30, max_turn=100) == [40, 50, 60, 70]
+    assert sorted(loader.futures) == [30, 40, 50, 60, 70]
+    assert prefetcher.pending(1, 70) is loader.futures[70]
+    assert prefetcher.cancelled == 0
+
+
+def test_direction_change_cancels_queued_loads():
+    loader, prefetcher = make_prefetcher()
+    scrub(prefetcher, [10, 20, 30])
+    loader.futures[40].set_running_or_notify_cancel()  # The worker already started this one
+    prefetcher.observe(1, 20, max_turn=100, now=0.3)
+
+    assert all(loader.futures[turn].cancelled() for turn in (30, 50, 60, 70))
+    assert not loader.futures[40].cancelled()
+    assert prefetcher.cancelled == 4
+    # Now loading behind the handle, down to turn 0
+    assert prefetcher.pending(1, 10) is loader.futures[10]
+    assert prefetcher.pending(1, 0) is loader.futures[0]
+    assert prefetcher.pending(1, 40) is None
+    assert prefetcher.stats()['in_flight'] == 2
+
+
+def test_loaded_positions_go_into_the_cache():
+    loader, prefetcher = make_prefetcher()
+    scrub(prefetcher, [10, 20])
+    loader.callbacks[30]([])
+    assert (1, 30) in prefetcher.cache
+    assert prefetcher.pending(1, 30) is None
+
+    prefetcher.cache.invalidate(1)  # A move was saved while turn 40 was loading
+    loader.callbacks[40]([])
+    assert (1, 40) not in prefetcher.cache
+    assert prefetcher.discarded == 1
+
+
+def test_stop_cancels_everything():
+    loader, prefetcher = make_prefetcher()
+    scrub(prefetcher, [10, 20])
+    prefetcher.stop()
+    assert all(future.cancelled() for future in loader.futures.values())
+    assert prefetcher.stats()['in_flight'] == 0
+    assert prefetcher.predict(20) == []
@@ -0,0 +1,74 @@
+# text_cache.py
+from collections import OrderedDict
+import pygame
+import config
+
+
+class TextCache:
+    """Shared font registry and LRU cache of rendered text surfaces.
+
+    Fonts are created once per (name, size, bold, italic). Rendered text is
+    keyed by (font, text, color, antialias, background), so a label is only
+    rasterized again when its string or color changes.
+    """
+
+    def __init__(self, max_entries=None):
+        self.max_entries = max_entries or config.TEXT_CACHE_MAX_ENTRIES
+        self._fonts = {}  # (name, size, bold, italic) -> pygame.font.Font
+        self._surfaces = OrderedDict()  # (font, text, color, antialias, bg) -> surface, in LRU order
+        self.hits = 0
+        self.misses = 0
+
+    def get_font(self, name=None, size=24, bold=False, italic=False):
+        """Return the shared SysFont for these settings, creating it on first use."""
+        key = (name, size, bold, italic)
+        font = self._fonts.get(key)
+        if font is None:
+            try:
+                font = pygame.font.SysFont(name, size, bold, italic)
+            except Exception as e:
+                print(f"TextCache: Could not load font {name} {size}: {e}")
+                font = pygame.font.Font(None, size)
+            self._fonts[key] = font
+        return font
+
+    def render(self, font, text, color, antialias=True, background=None):
+        """Return font.render(text, antialias, color, background), reusing an earlier surface."""
+        text = str(text)
+        key = (font, text, tuple(color), antialias, tuple(background) if background is not None else None)
+        surface = self._surfaces.get(key)
+        if surface is not None:
+            self._surfaces.move_to_end(key)
+            self.hits += 1
+            return surface
+
+        self.misses += 1
+        surface = font.render(text, antialias, color, background)
+        self._surfaces[key] = surface
+        while len(self._surfaces) > self.max_entries:
+            self._surfaces.popitem(last=False)
+        return surface
+
+    def clear(self):
+        self._surfaces.clear()
+
+    def stats(self):
+        """Counters for debugging and profiling."""
+        return {
+            'fonts': len(self._fonts),
+            'texts': len(self._surfaces),
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+
+# Shared by every UI element, the UI manager and the map view
+text_cache = TextCache()
+
+
+def get_font(name=None, size=24, bold=False, italic=False):
+    return text_cache.get_font(name, size, bold, italic)
+
+
+def render_text(font, text, color, antialias=True, background=None):
+    return text_cache.render(font, text, color, antialias, background)
@@ -1,9 +1,22 @@
 import json
 import datetime
 from config import *
+from records import TimelineEventRecord
+from position_index import PositionIndex
+from position_cache import PositionCache
+from token_state import TokenStateStore
+from turn_prefetcher import TurnPrefetcher
+import event_cache
+from event_cache import TimelineEventCache
 
 class Timeline:
-    """Enhanced timeline system with turn-by-turn tracking and history scrubbing."""
+    """Enhanced timeline system with turn-by-turn tracking and history scrubbing.
+
+    Expects an AsyncDatabase: loads and writes are queued on the database
+    thread and results are applied by callbacks when the main loop polls.
+    Token positions at past turns come from an in-memory PositionIndex of
+    the current map once it has loaded, so scrubbing does not query SQLite.
+    """
     
     def __init__(self, database):
         """Initialize the timeline."""
@@ -12,13 +25,17 @@ class Timeline:
         self.current_map_id = None
         self.current_turn = 0
         self.max_turn = 0
-        self.initiative_order = []  # List of token instance IDs in initiative order
+        self.token_state = TokenStateStore(database)  # Tokens on the current map, kept current in memory
         self.is_scrubbing = False  # Whether we're in timeline scrubbing mode
         self.scrub_turn = 0  # The turn we're currently viewing while scrubbing
         
         # Cache for timeline data
-        self.timeline_cache = {}
-        self.token_positions_cache = {}
+        self.timeline_cache = None  # TimelineEventCache of the current world
+        self.token_positions_cache = PositionCache()  # Positions read from the database, by (map_id, turn)
+        self.position_index = None  # PositionIndex of the current map, once loaded
+        self.moves_since_index_load = None  # Saves made while the index load is queued, else None
+        # Scrub lookahead until the index is loaded
+        self.prefetcher = TurnPrefetcher(self._load_positions, self.token_positions_cache)
     
     def update(self, time_delta):
         """Update timeline state if needed."""
@@ -27,72 +44,107 @@ class Timeline:
     
     def set_world(self, world_id):
         """Set the current world and load its state."""
+        if self.timeline_cache is None or self.timeline_cache.world_id != world_id:
+            self.timeline_cache = TimelineEventCache(self.db, world_id) if world_id else None
         self.current_world_id = world_id
         self.load_world_state()
     
     def set_map(self, map_id):
         """Set the current map and load its initiative order."""
         self.current_map_id = map_id
-        self.load_initiative_order()
+        self.prefetcher.stop()
+        self.token_state.load(map_id)
         self.load_map_timeline()
+        self.load_position_index()
+
+    @property
+    def initiative_order(self):
+        """map_token_ids in initiative order; the token state store's list, not a copy."""
+        return self.token_state.initiative_order
     
     def load_world_state(self):
         """Load the current state for the world."""
         if not self.current_world_id:
             return
             
-        # Get the saved game state
-        state = self.db.get_game_state(self.current_world_id)
-        if state:
-            self.current_turn = state[0]  # current_turn
+        world_id = self.current_world_id
+        self.db.submit('get_game_state', world_id,
+                       callback=lambda state: self._on_game_state(world_id, state))
+        self.db.submit('get_max_turn_number', world_id,
+                       callback=lambda max_turn: self._on_max_turn(world_id, max_turn))
+
+    def _on_game_state(self, world_id, state):
+        if world_id != self.current_world_id or not state:
+            return
+        self.current_turn = state[0]  # current_turn
+        if self.current_map_id is None:
             self.current_map_id = state[1]  # current_map_id
-            # active_token_id = state[2]
-            # state_data = state[3]
-            # last_updated = state[4]
-        
-        # Get the maximum turn number from timeline events
-        self.max_turn = self.db.get_max_turn_number(self.current_world_id)
-        if self.max_turn < self.current_turn:
-            self.max_turn = self.current_turn
+        self.load_map_timeline()  # Events around the restored turn
+        # active_token_id = state[2]
+        # state_data = state[3]
+        # last_updated = state[4]
+
+    def _on_max_turn(self, world_id, max_turn):
+        # Queued after get_game_state, so current_turn is already restored
+        if world_id == self.current_world_id:
+            self.max_turn = max(max_turn, self.current_turn)
     
     def load_initiative_order(self):
-        """Load the initiative order for the current map."""
+        """Reload the current map's tokens, and with them the initiative order."""
         if not self.current_map_id:
             return
         
-        # Get tokens on the map with initiative values
-        tokens = self.db.get_map_tokens_with_history(self.current_map_id)
-        
-        # Sort by initiative value, descending
-        self.initiative_order = []
-        
-        for token in sorted(tokens, key=lambda t: t[11] if len(t) > 11 else 0, reverse=True):
-            # token[11] should be initiative, token[0] should be map_token_id
-            if len(token) > 11 and token[11] > 0:
-                self.initiative_order.append(token[0])
+        self.token_state.load(self.current_map_id)
     
     def load_map_timeline(self):
-        """Load timeline events for the current map."""
-        if not self.current_world_id:
+        """Load the timeline events around the displayed turn, unless they are cached already."""
+        if not self.current_world_id or self.timeline_cache is None:
             return
-            
-        # Load timeline events into cache
-        events = self.db.get_timeline_events(self.current_world_id)
-        self.timeline_cache = {}
-        
-        for event in events:
-            turn = event[2]  # turn_number
-            if turn not in self.timeline_cache:
-                self.timeline_cache[turn] = []
-            self.timeline_cache[turn].append({
-                'id': event[0],
-                'event_type': event[3],
-                'title': event[4],
-                'description': event[5],
-                'data': json.loads(event[6]) if event[6] else None,
-                'timestamp': event[7]
-            })
+
+        self.timeline_cache.ensure(*event_cache.window(self.get_current_display_turn()))
     
+    def load_position_index(self):
+        """Load the current map's position history into memory for scrubbing."""
+        self.position_index = None
+        if not self.current_map_id:
+            self.moves_since_index_load = None
+            return
+
+        map_id = self.current_map_id
+        self.moves_since_index_load = []
+        self.db.submit('get_token_position_history', map_id,
+                       callback=lambda history: self._on_position_history(map_id, history))
+
+    def _on_position_history(self, map_id, history):
+        if map_id != self.current_map_id:
+            return
+        tokens, deltas = history
+        index = PositionIndex(map_id, tokens, deltas)
+        # Saves queued after the load are not in its results
+        for move in self.moves_since_index_load or []:
+            if not index.record(*move):
+                self.load_position_index()  # A token placed after the load was queued
+                return
+        self.position_index = index
+        self.moves_since_index_load = None
+
+    def _position_index_ready(self):
+        return self.position_index is not None and self.position_index.map_id == self.current_map_id
+
+    def _load_positions(self, map_id, turn_number, callback):
+        return self.db.submit('get_all_token_positions_at_turn', map_id, turn_number, callback=callback)
+
+    def _record_position(self, map_token_id, turn_number, x, y, hp, status_effects):
+        """Mirror a position save into the index (or hold it until the index has loaded)."""
+        move = (map_token_id, turn_number, x, y, hp, status_effects)
+        if self.moves_since_index_load is None and self.position_index is not None:
+            if self.position_index.record(*move):
+                return
+            self.load_position_index()  # A token placed since the index was loaded
+        if self.moves_since_index_load is not None:
+            # The save is queued after the load, so the load won't include it
+            self.moves_since_index_load.append(move)
+
     def next_turn(self):
         """Advance to the next turn in the initiative order."""
         if self.is_scrubbing:
@@ -102,7 +154,7 @@ class Timeline:
         
         # Reset movement flags for all tokens on the current map
         if self.current_map_id:
-            self.db.reset_token_movement_flags(self.current_map_id, self.current_turn)
+            self.token_state.reset_moved(self.current_turn)
         
         # Update max turn if needed
         if self.current_turn > self.max_turn:
@@ -140,16 +192,20 @@ class Timeline:
         """Exit timeline scrubbing mode and return to current turn."""
         self.is_scrubbing = False
         self.scrub_turn = self.current_turn
+        self.prefetcher.stop()
         print(f"Timeline: Stopped scrubbing, returned to turn {self.current_turn}")
     
-    def scrub_to_turn(self, turn_number):
-        """Scrub to a specific turn number."""
+    def scrub_to_turn(self, turn_number, callback=None):
+        """Scrub to a specific turn number. Returns its positions, or None while they are being read."""
         if not self.is_scrubbing:
             self.start_scrubbing()
         
         self.scrub_turn = max(0, min(turn_number, self.max_turn))
         print(f"Timeline: Scrubbed to turn {self.scrub_turn}")
-        return self.get_token_positions_at_turn(self.scrub_turn)
+        if not self._position_index_ready():
+            # Every turn is a query until the index is loaded, so queue the ones ahead of the handle
+            self.prefetcher.observe(self.current_map_id, self.scrub_turn, self.max_turn)
+        return self.get_token_positions_at_turn(self.scrub_turn, callback)
     
     def get_current_token(self):
         """Get the token instance ID for the current turn."""
@@ -174,38 +230,65 @@ class Timeline:
         token_index = (turn_number - 1) % len(self.initiative_order)
         return self.initiative_order[token_index]
     
-    def get_token_positions_at_turn(self, turn_number):
-        """Get all token positions at a specific turn."""
+    def get_token_positions_at_turn(self, turn_number, callback=None):
+        """Get all token positions at a specific turn, or None while they are being read.
+
+        Until the position index has loaded, uncached turns are read in the
+        background; callback(positions) is called once they are available,
+        and later calls return them from the cache.
+        """
         if not self.current_map_id:
             return []
-        
-        # Check cache first
-        cache_key = f"{self.current_map_id}_{turn_number}"
-        if cache_key in self.token_positions_cache:
-            return self.token_positions_cache[cache_key]
-        
-        # Get positions from database
-        positions = self.db.get_all_token_positions_at_turn(self.current_map_id, turn_number)
-        
-        # Cache the result
-        self.token_positions_cache[cache_key] = positions
-        
-        return positions
+
+        if self._position_index_ready():
+            positions = self.position_index.positions_at_turn(turn_number)
+            if callback is not None:
+                callback(positions)
+            return positions
+
+        # Until the index has loaded, ask the database
+        map_id = self.current_map_id
+        positions = self.token_positions_cache.get(map_id, turn_number)
+        if positions is not None:
+            if callback is not None:
+                callback(positions)
+            return positions
+        if callback is None and self.prefetcher.pending(map_id, turn_number) is not None:
+            return None  # Already queued by the prefetcher, which caches it
+
+        generation = self.token_positions_cache.generation
+        def on_positions(positions):
+            self.token_positions_cache.put(map_id, turn_number, positions, generation)
+            if callback is not None:
+                callback(positions)
+        self._load_positions(map_id, turn_number, callback=on_positions)
+        return None
     
     def get_current_display_turn(self):
         """Get the turn number currently being displayed."""
         return self.scrub_turn if self.is_scrubbing else self.current_turn
     
     def get_timeline_events_for_turn(self, turn_number):
-        """Get all events that occurred during a specific turn."""
-        return self.timeline_cache.get(turn_number, [])
+        """Get all events that occurred during a specific turn.
+
+        Turns outside the cached ranges are queued for loading and read as
+        empty until their events arrive.
+        """
+        if self.timeline_cache is None:
+            return []
+        if not self.timeline_cache.is_loaded(turn_number):
+            self.timeline_cache.ensure(*event_cache.window(turn_number))
+        return self.timeline_cache.events_for_turn(turn_number)
     
     def get_timeline_summary(self, start_turn=None, end_turn=None):
-        """Get a summary of timeline events within a range."""
+        """Get a summary of timeline events within a range; turns still loading are left out."""
         if start_turn is None:
             start_turn = max(0, self.current_turn - 10)
         if end_turn is None:
             end_turn = self.current_turn
+        if self.timeline_cache is None:
+            return []
+        self.timeline_cache.ensure(start_turn, end_turn)
         
         summary = []
         for turn in range(start_turn, end_turn + 1):
@@ -219,42 +302,44 @@ class Timeline:
         
         return summary
     
-    def log_event(self, event_type, title, data=None, description=""):
-        """Log an event to the timeline."""
+    def log_event(self, event_type, title, data=None, description="", turn_number=None):
+        """Log an event to the timeline. Returns a Future for the new event's id."""
         if not self.current_world_id:
             return None
         
-        current_turn = self.current_turn
+        current_turn = self.current_turn if turn_number is None else turn_number
         if self.is_scrubbing:
             print("Warning: Cannot log events while scrubbing timeline")
             return None
         
-        event_id = self.db.add_timeline_event(
+        # Cached right away; the id is filled in once the insert has run
+        entry = TimelineEventRecord(
+            None,
+            self.current_world_id,
+            self.current_map_id,
+            current_turn,
+            event_type,
+            title,
+            description,
+            json.dumps(data) if data else None,
+            datetime.datetime.now().isoformat()
+        )
+        future = self.db.submit(
+            'add_timeline_event',
             self.current_world_id,
             current_turn,
             event_type,
             title,
             description,
             data,
-            self.current_map_id
+            self.current_map_id,
+            callback=lambda event_id: setattr(entry, 'id', event_id)
         )
-        
-        # Update cache
-        if current_turn not in self.timeline_cache:
-            self.timeline_cache[current_turn] = []
-        
-        self.timeline_cache[current_turn].append({
-            'id': event_id,
-            'event_type': event_type,
-            'title': title,
-            'description': description,
-            'data': data,
-            'timestamp': datetime.datetime.now().isoformat()
-        })
-        
-        return event_id
+        if self.timeline_cache is not None:
+            self.timeline_cache.append(current_turn, entry, future)
+        return future
     
-    def log_token_moved(self, map_token_id, token_name, from_pos, to_pos):
+    def log_token_moved(self, map_token_id, token_name, from_pos, to_pos, turn_number=None):
         """Log a token movement event."""
         return self.log_event(
             "token_move", 
@@ -265,13 +350,14 @@ class Timeline:
                 "to": to_pos,
                 "distance": self._calculate_distance(from_pos, to_pos)
             },
-            f"Moved from ({from_pos[0]}, {from_pos[1]}) to ({to_pos[0]}, {to_pos[1]})"
+            f"Moved from ({from_pos[0]}, {from_pos[1]}) to ({to_pos[0]}, {to_pos[1]})",
+            turn_number
         )
     
     def log_token_action(self, map_token_id, token_name, action_text, action_type="custom"):
         """Log a token action and save it to the database."""
         # Save the action to the database
-        self.db.add_token_action(map_token_id, self.current_turn, action_text, action_type)
+        self.db.submit('add_token_action', map_token_id, self.current_turn, action_text, action_type)
         
         # Log it as a timeline event
         return self.log_event(
@@ -366,8 +452,16 @@ class Timeline:
         if self.is_scrubbing:
             print("Warning: Cannot save token state while scrubbing")
             return False
-        
-        return self.db.save_token_position(
+
+        if isinstance(status_effects, (list, dict)):
+            status_effects = json.dumps(status_effects)  # As the database stores it
+        self._record_position(map_token_id, self.current_turn, x, y, hp, status_effects)
+        # Only this token at this turn and later changes
+        self.token_positions_cache.update_token(self.current_map_id, self.current_turn, map_token_id,
+                                                x, y, hp, status_effects)
+        
+        return self.db.submit(
+            'save_token_position',
             map_token_id, 
             self.current_turn, 
             x, y, 
@@ -376,63 +470,53 @@ class Timeline:
         )
     
     def update_token_position(self, map_token_id, x, y, token_name=None):
-        """Update a token's position and log the movement."""
+        """Update a token's position and log the movement. Returns a Future for the update."""
         if self.is_scrubbing:
             print("Warning: Cannot move tokens while scrubbing")
             return False
         
-        # Get the old position first
-        old_pos = None
-        if token_name:  # Only log if we have the token name
-            # Get current position from database
-            current_tokens = self.db.get_map_tokens_with_history(self.current_map_id)
-            for token in current_tokens:
-                if token[0] == map_token_id:  # map_token_id
-                    old_pos = (token[7], token[8])  # x, y
-                    break
-        
-        # Update the position in the database
-        success = self.db.update_token_position(map_token_id, x, y, self.current_turn, has_moved=True)
-        
-        if success:
-            # Save the position state
-            self.save_token_state(map_token_id, x, y)
-            
-            # Log the movement if we have the necessary info
-            if token_name and old_pos and old_pos != (x, y):
-                self.log_token_moved(map_token_id, token_name, old_pos, (x, y))
-            
-            # Clear position cache since positions have changed
-            self.token_positions_cache.clear()
+        old_pos = self.token_state.position(map_token_id)
+        
+        # Update the token in memory and in the database
+        future = self.token_state.move(map_token_id, x, y, self.current_turn)
         
-        return success
+        # Save the position state (this also updates the cached positions)
+        self.save_token_state(map_token_id, x, y)
+        
+        if token_name and old_pos is not None and old_pos != (x, y):  # Only log if we have the token name
+            self.log_token_moved(map_token_id, token_name, old_pos, (x, y))
+        
+        return future
     
     def get_recent_events(self, limit=10):
-        """Get the most recent events from the timeline."""
-        if not self.current_world_id:
+        """Get the events around the display turn from the event cache; turns still loading are left out."""
+        if not self.current_world_id or self.timeline_cache is None:
             return []
         
         # Get events around the current display turn
         display_turn = self.get_current_display_turn()
         start_turn = max(0, display_turn - 5)
         end_turn = display_turn + 1
+        self.timeline_cache.ensure(start_turn, end_turn)
         
-        return self.db.get_timeline_events(self.current_world_id, start_turn, end_turn, limit)
+        events = []
+        for turn in range(start_turn, end_turn + 1):
+            events.extend(self.timeline_cache.events_for_turn(turn))
+        return events[:limit]
     
     def reset_initiative(self):
         """Clear the initiative order."""
-        self.initiative_order = []
+        self.initiative_order.clear()
     
     def set_token_initiative(self, map_token_id, initiative_value):
         """Set the initiative value for a token and update the order."""
-        # Update token initiative in database would go here
-        # For now, just reload the initiative order
-        self.load_initiative_order()
+        return self.token_state.set_initiative(map_token_id, initiative_value)
     
     def _save_current_state(self):
         """Save the current game state to the database."""
         if self.current_world_id and not self.is_scrubbing:
-            self.db.save_game_state(
+            self.db.submit(
+                'save_game_state',
                 self.current_world_id,
                 self.current_turn,
                 self.current_map_id
@@ -444,13 +528,14 @@ class Timeline:
         dy = pos2[1] - pos1[1]
         return round((dx**2 + dy**2)**0.5, 2)
     
-    def export_timeline(self, start_turn=None, end_turn=None):
-        """Export timeline events as JSON for backup or sharing."""
+    def export_timeline(self, callback, start_turn=None, end_turn=None):
+        """Export timeline events as JSON for backup or sharing: callback(json_text) once they are read."""
         if not self.current_world_id:
             return None
-        
-        events = self.db.get_timeline_events(self.current_world_id, start_turn, end_turn)
-        
+        return self.db.submit('get_timeline_events', self.current_world_id, start_turn, end_turn,
+                              callback=lambda events: callback(self._export_events(events)))
+    
+    def _export_events(self, events):
         export_data = {
             'world_id': self.current_world_id,
             'current_turn': self.current_turn,
@@ -461,23 +546,24 @@ class Timeline:
         
         for event in events:
             export_data['events'].append({
-                'turn_number': event[2],
-                'event_type': event[3],
-                'title': event[4],
-                'description': event[5],
-                'data': json.loads(event[6]) if event[6] else None,
-                'timestamp': event[7]
+                'turn_number': event.turn_number,
+                'event_type': event.event_type,
+                'title': event.title,
+                'description': event.description,
+                'data': event.data,
+                'timestamp': event.timestamp
             })
         
         return json.dumps(export_data, indent=2)
     
-    def get_timeline_statistics(self):
-        """Get statistics about the timeline."""
+    def get_timeline_statistics(self, callback):
+        """Get statistics about the timeline: callback(stats) once the events are read."""
         if not self.current_world_id:
-            return {}
-        
-        events = self.db.get_timeline_events(self.current_world_id)
-        
+            return None
+        return self.db.submit('get_timeline_events', self.current_world_id,
+                              callback=lambda events: callback(self._event_statistics(events)))
+    
+    def _event_statistics(self, events):
         stats = {
             'total_turns': self.max_turn,
             'total_events': len(events),
@@ -489,8 +575,8 @@ class Timeline:
         turn_counts = {}
         
         for event in events:
-            event_type = event[3]  # event_type
-            turn = event[2]  # turn_number
+            event_type = event.event_type
+            turn = event.turn_number
             
             # Count by type
             if event_type not in stats['events_by_type']:
@@ -0,0 +1,173 @@
+# token_history.py
+"""Keyframe + delta storage for token positions over time.
+
+Every token change is stored as one delta row per token per turn. Every
+HISTORY_KEYFRAME_INTERVAL turns a map gets a keyframe holding the full
+state of all its tokens as of the end of the previous turn, so the state at
+any turn is the nearest keyframe plus at most one interval of deltas.
+Keyframes are derived data, written on the save path: the first save past
+an interval boundary writes the keyframes up to it. Writing a delta into
+the past drops the keyframes after it, until later saves write them again.
+Reads never write.
+
+A state is a dict of map_token_id -> (x, y, hp, status_effects).
+"""
+import json
+import config
+
+
+def create_tables(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS token_history_deltas (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            map_id INTEGER NOT NULL,
+            map_token_id INTEGER NOT NULL,
+            turn_number INTEGER NOT NULL,
+            x INTEGER NOT NULL,
+            y INTEGER NOT NULL,
+            hp INTEGER,
+            status_effects TEXT,
+            UNIQUE (map_token_id, turn_number),
+            FOREIGN KEY (map_token_id) REFERENCES map_tokens (id) ON DELETE CASCADE
+        )
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_token_history_deltas_map_turn
+        ON token_history_deltas (map_id, turn_number, map_token_id, x, y, hp, status_effects)
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS token_history_keyframes (
+            map_id INTEGER NOT NULL,
+            turn_number INTEGER NOT NULL,
+            state TEXT NOT NULL,
+            PRIMARY KEY (map_id, turn_number)
+        )
+    ''')
+
+
+def _interval(interval):
+    return interval or config.HISTORY_KEYFRAME_INTERVAL
+
+
+def _encode(state):
+    return json.dumps({str(map_token_id): list(values) for map_token_id, values in state.items()})
+
+
+def _decode(text):
+    return {int(map_token_id): tuple(values) for map_token_id, values in json.loads(text).items()}
+
+
+def _apply_deltas(conn, map_id, state, first_turn, last_turn):
+    """Apply the deltas of turns first_turn..last_turn (first_turn None = from the start) to state."""
+    # Only each token's latest delta in the range matters; SQLite returns the
+    # row holding MAX(turn_number) for the bare columns
+    rows = conn.execute('''
+        SELECT map_token_id, x, y, hp, status_effects, MAX(turn_number)
+        FROM token_history_deltas
+        WHERE map_id = ? AND turn_number >= ? AND turn_number <= ?
+        GROUP BY map_token_id
+    ''', (map_id, first_turn if first_turn is not None else -1, last_turn))
+    for map_token_id, x, y, hp, status_effects, _ in rows:
+        state[map_token_id] = (x, y, hp, status_effects)
+    return state
+
+
+def _nearest_keyframe(conn, map_id, turn_number):
+    """(turn, state) of the newest keyframe at or before turn_number, or (None, {})."""
+    row = conn.execute('''
+        SELECT turn_number, state FROM token_history_keyframes
+        WHERE map_id = ? AND turn_number <= ?
+        ORDER BY turn_number DESC LIMIT 1
+    ''', (map_id, turn_number)).fetchone()
+    return (row[0], _decode(row[1])) if row else (None, {})
+
+
+def state_at_turn(conn, map_id, turn_number):
+    """Full token state of a map at the end of turn_number, from the nearest keyframe."""
+    current_turn, state = _nearest_keyframe(conn, map_id, turn_number)
+    return _apply_deltas(conn, map_id, state, current_turn, turn_number)
+
+
+def write_keyframes(conn, map_id, turn_number, interval=None):
+    """Write the missing keyframes of a map up to turn_number. Returns how many were written."""
+    interval = _interval(interval)
+    current_turn, state = _nearest_keyframe(conn, map_id, turn_number)
+    written = 0
+    next_keyframe = (current_turn // interval + 1) * interval if current_turn is not None else interval
+    while next_keyframe <= turn_number:
+        _apply_deltas(conn, map_id, state, current_turn, next_keyframe - 1)
+        conn.execute('''
+            INSERT INTO token_history_keyframes (map_id, turn_number, state)
+            VALUES (?, ?, ?)
+            ON CONFLICT (map_id, turn_number) DO UPDATE SET state = excluded.state
+        ''', (map_id, next_keyframe, _encode(state)))
+        written += 1
+        current_turn = next_keyframe
+        next_keyframe += interval
+    return written
+
+
+def save_delta(conn, map_id, map_token_id, turn_number, x, y, hp=None, status_effects=None, interval=None):
+    """Record a token's state for a turn, replacing an earlier save in the same turn.
+
+    Returns the number of keyframes written, which is only non-zero for the
+    first save past an interval boundary.
+    """
+    interval = _interval(interval)
+    conn.execute('''
+        INSERT INTO token_history_deltas
+        (map_id, map_token_id, turn_number, x, y, hp, status_effects)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (map_token_id, turn_number) DO UPDATE SET
+            map_id = excluded.map_id,
+            x = excluded.x,
+            y = excluded.y,
+            hp = excluded.hp,
+            status_effects = excluded.status_effects
+    ''', (map_id, map_token_id, turn_number, x, y, hp, status_effects))
+    # Keyframes after this turn no longer describe the history
+    conn.execute('''
+        DELETE FROM token_history_keyframes WHERE map_id = ? AND turn_number > ?
+    ''', (map_id, turn_number))
+    boundary = turn_number // interval * interval
+    if boundary and not conn.execute('''
+        SELECT 1 FROM token_history_keyframes WHERE map_id = ? AND turn_number = ?
+    ''', (map_id, boundary)).fetchone():
+        return write_keyframes(conn, map_id, turn_number, interval)
+    return 0
+
+
+def token_state_at_turn(conn, map_token_id, turn_number):
+    """(x, y, hp, status_effects) of one token at the end of turn_number, or None."""
+    return conn.execute('''
+        SELECT x, y, hp, status_effects FROM token_history_deltas
+        WHERE map_token_id = ? AND turn_number <= ?
+        ORDER BY turn_number DESC LIMIT 1
+    ''', (map_token_id, turn_number)).fetchone()
+
+
+def map_deltas(conn, map_id):
+    """Every delta of a map as (map_token_id, turn_number, x, y, hp, status_effects) in turn order."""
+    # Turn order is the covering index's order, so SQLite doesn't have to sort
+    return conn.execute('''
+        SELECT map_token_id, turn_number, x, y, hp, status_effects FROM token_history_deltas
+        WHERE map_id = ?
+        ORDER BY turn_number
+    ''', (map_id,)).fetchall()
+
+
+def rebuild_keyframes(conn, map_id=None, interval=None):
+    """Drop and rebuild the keyframes of one map, or of every map with history."""
+    if map_id is None:
+        map_ids = [row[0] for row in conn.execute("SELECT DISTINCT map_id FROM token_history_deltas")]
+    else:
+        map_ids = [map_id]
+    written = 0
+    for current_map_id in map_ids:
+        conn.execute("DELETE FROM token_history_keyframes WHERE map_id = ?", (current_map_id,))
+        last_turn = conn.execute('''
+            SELECT MAX(turn_number) FROM token_history_deltas WHERE map_id = ?
+        ''', (current_map_id,)).fetchone()[0]
+        if last_turn is not None:
+            written += write_keyframes(conn, current_map_id, last_turn, interval)
+    return written
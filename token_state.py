@@ -0,0 +1,127 @@
+# token_state.py
+
+
+class TokenStateStore:
+    """The tokens on the active map, kept in memory as the authority on their current state.
+
+    Loaded once per map from Database.get_map_tokens_with_history() on the
+    database worker; after that, moves and initiative changes update the
+    MapTokenRecords in place and are written through the worker. tokens and
+    initiative_order are updated in place too, never replaced, so
+    GameApp.tokens_on_map, Timeline.initiative_order and the UI token list
+    can all hold the same lists. on_loaded(map_id) is called whenever a load
+    has been applied and on_moved(record) after a record was moved in place.
+    """
+
+    def __init__(self, db):
+        self.db = db  # An AsyncDatabase
+        self.map_id = None
+        self.tokens = []  # MapTokenRecords, highest initiative first
+        self.initiative_order = []  # map_token_ids with an initiative, highest first
+        self._by_id = {}  # map_token_id -> MapTokenRecord
+        self._load = None  # Future of the load being waited for
+        self.on_loaded = None
+        self.on_moved = None
+        self.loads = 0
+        self.moves = 0
+
+    def load(self, map_id):
+        """Queue a read of a map's tokens. The store is empty until it arrives, or if map_id is None."""
+        if map_id != self.map_id:
+            self._apply([])  # Nothing of the previous map may linger
+        self.map_id = map_id
+        if not map_id:
+            self._load = None
+            return None
+        # A newer load supersedes this one, e.g. after a change made while it was queued
+        future = self._load = self.db.submit('get_map_tokens_with_history', map_id,
+                                             callback=lambda tokens: self._on_loaded(future, map_id, tokens))
+        self.loads += 1
+        return future
+
+    @property
+    def loading(self):
+        return self._load is not None
+
+    def _on_loaded(self, future, map_id, tokens):
+        if future is not self._load:
+            return
+        self._load = None
+        self._apply(tokens)
+        if self.on_loaded is not None:
+            self.on_loaded(map_id)
+
+    def _apply(self, tokens):
+        self.tokens[:] = tokens
+        self._by_id = {token.map_token_id: token for token in self.tokens}
+        self._update_initiative_order()
+
+    def _update_initiative_order(self):
+        # Stable, so tokens with equal initiative keep their order
+        self.tokens.sort(key=lambda token: token.initiative or 0, reverse=True)
+        self.initiative_order[:] = [token.map_token_id for token in self.tokens
+                                    if token.initiative and token.initiative > 0]
+
+    def __len__(self):
+        return len(self.tokens)
+
+    def __contains__(self, map_token_id):
+        return map_token_id in self._by_id
+
+    def get(self, map_token_id):
+        """The MapTokenRecord of a token on the map, or None."""
+        return self._by_id.get(map_token_id)
+
+    def position(self, map_token_id):
+        """(x, y) of a token, or None if it is not on the map."""
+        token = self._by_id.get(map_token_id)
+        return (token.x, token.y) if token is not None else None
+
+    def move(self, map_token_id, x, y, current_turn):
+        """Move a token and mark it as moved this turn. Returns the Future of the database update."""
+        future = self.db.submit('update_token_position', map_token_id, x, y, current_turn, has_moved=True)
+        token = self._by_id.get(map_token_id)
+        if token is None or self.loading:
+            # Placed since the map was loaded, or a load queued before the update would undo it
+            self.load(self.map_id)
+        else:
+            token.x, token.y, token.has_moved = x, y, 1
+            if self.on_moved is not None:
+                self.on_moved(token)
+        self.moves += 1
+        return future
+
+    def set_initiative(self, map_token_id, initiative):
+        """Change a token's initiative and re-sort tokens and initiative_order in place.
+
+        Returns the Future of the database update, or None.
+        """
+        token = self._by_id.get(map_token_id)
+        if token is None:
+            return None
+        token.initiative = initiative
+        self._update_initiative_order()
+        future = self.db.submit('update_token_initiative', map_token_id, initiative)
+        if self.loading:
+            self.load(self.map_id)
+        return future
+
+    def reset_moved(self, current_turn):
+        """Clear every token's has_moved flag at the start of a turn."""
+        if not self.map_id:
+            return None
+        for token in self.tokens:
+            token.has_moved = 0
+        future = self.db.submit('reset_token_movement_flags', self.map_id, current_turn)
+        if self.loading:
+            self.load(self.map_id)
+        return future
+
+    def stats(self):
+        """Counters for debugging and profiling."""
+        return {
+            'tokens': len(self.tokens),
+            'in_initiative': len(self.initiative_order),
+            'loads': self.loads,
+            'moves': self.moves,
+        }
@@ -0,0 +1,105 @@
+# turn_prefetcher.py
+import math
+import time
+from collections import deque
+import config
+
+
+class TurnPrefetcher:
+    """Loads the turns a scrubbing user is about to reach before the slider gets there.
+
+    observe() is told every turn the handle moves to; the direction and
+    speed of the last few moves decide which turns ahead of it to load
+    through load(map_id, turn, callback), which must return a Future (an
+    AsyncDatabase.submit). Results go into cache, a PositionCache shared
+    with the timeline's own lookups. Loads that the handle has moved away
+    from are cancelled if the worker hasn't started them yet.
+    """
+
+    def __init__(self, load, cache, lookahead=None, max_turns=None, samples=None):
+        self.load = load
+        self.cache = cache
+        self.lookahead = config.SCRUB_PREFETCH_LOOKAHEAD if lookahead is None else lookahead
+        self.max_turns = max_turns or config.SCRUB_PREFETCH_MAX_TURNS
+        self._in_flight = {}  # (map_id, turn) -> Future
+        self._samples = deque(maxlen=samples or config.SCRUB_PREFETCH_SAMPLES)  # (time, turn)
+        self.prefetched = 0
+        self.cancelled = 0
+        self.discarded = 0
+
+    def pending(self, map_id, turn):
+        """The Future of a load for this turn that is already queued, or None."""
+        return self._in_flight.get((map_id, turn))
+
+    def predict(self, turn, max_turn=None):
+        """Turns ahead of the handle in the direction it is moving, nearest first."""
+        samples = list(self._samples)
+        if len(samples) < 2:
+            return []
+        last_time, last_turn = samples[-1]
+        direction = 1 if last_turn > samples[-2][1] else -1
+        # Only the moves since the handle last changed direction say where it is going
+        first = len(samples) - 2
+        while first > 0 and (samples[first][1] - samples[first - 1][1]) * direction > 0:
+            first -= 1
+        first_time, first_turn = samples[first]
+        distance = last_turn - first_turn
+        # Turns the handle jumps per slider event, and turns it covers per second
+        step = max(1, round(abs(distance) / (len(samples) - 1 - first)))
+        speed = abs(distance) / max(last_time - first_time, 1e-3)
+        span = max(step, min(int(speed * self.lookahead), step * self.max_turns))
+        stride = max(step, math.ceil(span / self.max_turns))
+        turns = []
+        for offset in range(stride, span + 1, stride):
+            target = turn + direction * offset
+            if target < 0 or (max_turn is not None and target > max_turn):
+                break
+            turns.append(target)
+        return turns
+
+    def observe(self, map_id, turn, max_turn=None, now=None):
+        """Record a handle position and queue loads for the turns predicted to come next."""
+        now = time.monotonic() if now is None else now
+        if self._samples and self._samples[-1][1] == turn:
+            return
+        self._samples.append((now, turn))
+        wanted = {(map_id, target) for target in self.predict(turn, max_turn)}
+        wanted.add((map_id, turn))
+
+        # The handle has moved on from these
+        for key in [key for key in self._in_flight if key not in wanted]:
+            if self._in_flight.pop(key).cancel():
+                self.cancelled += 1
+
+        for key in sorted(wanted - {(map_id, turn)}, key=lambda key: abs(key[1] - turn)):
+            if key in self.cache or key in self._in_flight:
+                continue
+            self._in_flight[key] = self.load(key[0], key[1], callback=self._loaded(key))
+            self.prefetched += 1
+
+    def _loaded(self, key):
+        generation = self.cache.generation
+
+        def on_loaded(positions):
+            self._in_flight.pop(key, None)
+            # Loads that were too far along to cancel are kept too; the handle may come back
+            if not self.cache.put(key[0], key[1], positions, generation):
+                self.discarded += 1  # Positions changed since the load was queued
+        return on_loaded
+
+    def stop(self):
+        """Forget the scrub motion and cancel queued loads (the user let go of the slider)."""
+        self._samples.clear()
+        for future in self._in_flight.values():
+            if future.cancel():
+                self.cancelled += 1
+        self._in_flight.clear()
+
+    def stats(self):
+        """Counters for debugging and profiling; hits and evictions are the cache's."""
+        return {
+            'in_flight': len(self._in_flight),
+            'prefetched': self.prefetched,
+            'cancelled': self.cancelled,
+            'discarded': self.discarded,
+        }
@@ -2,6 +2,7 @@ import pygame
 import tkinter as tk
 from tkinter import scrolledtext
 import os
+from text_cache import get_font, render_text
 
 class UIElement:
     """Base class for UI elements."""
@@ -54,7 +55,7 @@ class Button(UIElement):
         self.draggable = draggable
         self.dragging = False
         self.drag_offset = (0, 0)
-        self.font = pygame.font.SysFont(None, 24)
+        self.font = get_font(None, 24)
         self.color = bg_color  # Current color
         
     def draw(self, screen):
@@ -67,7 +68,7 @@ class Button(UIElement):
         pygame.draw.rect(screen, color, self.rect, border_radius=self.border_radius)
         
         # Draw button text
-        text_surf = self.font.render(self.text, True, self.text_color)
+        text_surf = render_text(self.font, self.text, self.text_color)
         text_rect = text_surf.get_rect(center=self.rect.center)
         screen.blit(text_surf, text_rect)
         
@@ -162,8 +163,8 @@ class TimelineSlider(UIElement):
         pygame.draw.rect(screen, self.handle_color, self.handle_rect, border_radius=5)
         
         # Draw current turn text
-        font = pygame.font.SysFont(None, 20)
-        turn_text = font.render(f"Turn: {self.current_turn}", True, (255, 255, 255))
+        font = get_font(None, 20)
+        turn_text = render_text(font, f"Turn: {self.current_turn}", (255, 255, 255))
         screen.blit(turn_text, (self.x, self.y - 25))
         
     def handle_event(self, event):
@@ -247,16 +248,16 @@ class LocationIcon(UIElement):
         pygame.draw.circle(screen, (255, 255, 255), self.rect.center, 16, 2)
         
         # Draw icon (using text for now - could be replaced with actual icons)
-        font = pygame.font.SysFont(None, 24)
+        font = get_font(None, 24)
         icon_text = self.icons.get(self.location_type, self.icons["generic"])
-        text_surf = font.render(icon_text, True, (255, 255, 255))
+        text_surf = render_text(font, icon_text, (255, 255, 255))
         text_rect = text_surf.get_rect(center=self.rect.center)
         screen.blit(text_surf, text_rect)
         
         # Draw name below icon if hovered
         if self.hovered:
-            name_font = pygame.font.SysFont(None, 18)
-            name_surf = name_font.render(self.name, True, (255, 255, 255))
+            name_font = get_font(None, 18)
+            name_surf = render_text(name_font, self.name, (255, 255, 255))
             name_rect = name_surf.get_rect(centerx=self.rect.centerx, top=self.rect.bottom + 5)
             
             # Draw background for text
@@ -473,7 +474,7 @@ class MapNavigationBreadcrumb(UIElement):
     def __init__(self, x, y, width, height):
         super().__init__(x, y, width, height)
         self.map_stack = []  # Stack of (map_id, map_name) tuples
-        self.font = pygame.font.SysFont(None, 20)
+        self.font = get_font(None, 20)
         
     def push_map(self, map_id, map_name):
         """Add a map to the navigation stack."""
@@ -501,13 +502,13 @@ class MapNavigationBreadcrumb(UIElement):
         for i, (map_id, map_name) in enumerate(self.map_stack):
             if i > 0:
                 # Draw separator
-                sep_surf = self.font.render(" > ", True, (160, 160, 160))
+                sep_surf = render_text(self.font, " > ", (160, 160, 160))
                 screen.blit(sep_surf, (x_offset, y_center - sep_surf.get_height() // 2))
                 x_offset += sep_surf.get_width()
             
             # Draw map name (clickable if not the current map)
             color = (255, 255, 255) if i == len(self.map_stack) - 1 else (100, 150, 255)
-            name_surf = self.font.render(map_name, True, color)
+            name_surf = render_text(self.font, map_name, color)
             screen.blit(name_surf, (x_offset, y_center - name_surf.get_height() // 2))
             x_offset += name_surf.get_width()
             
@@ -594,7 +595,7 @@ class TextInput(UIElement):
         self.text_color = text_color
         self.active_color = active_color
         self.active = False
-        self.font = pygame.font.SysFont(None, 24)
+        self.font = get_font(None, 24)
         self.cursor_pos = len(default_text)
         self.cursor_visible = True
         self.cursor_timer = 0
@@ -609,7 +610,7 @@ class TextInput(UIElement):
         pygame.draw.rect(screen, color, self.rect, border_radius=3)
         
         # Draw input text
-        text_surf = self.font.render(self.text, True, self.text_color)
+        text_surf = render_text(self.font, self.text, self.text_color)
         text_rect = text_surf.get_rect(midleft=(self.x + 10, self.y + self.height // 2))
         screen.blit(text_surf, text_rect)
         
@@ -757,7 +758,7 @@ class Label(UIElement):
         """Initialize the label."""
         super().__init__(x, y, width, height)
         self.text = text
-        self.font = font or pygame.font.SysFont(None, 24)
+        self.font = font or get_font(None, 24)
         self.text_color = text_color
         self.bg_color = bg_color
         self.align = align  # "left", "center", "right"
@@ -772,7 +773,7 @@ class Label(UIElement):
             pygame.draw.rect(screen, self.bg_color, self.rect)
             
         # Draw text
-        text_surf = self.font.render(self.text, True, self.text_color)
+        text_surf = render_text(self.font, self.text, self.text_color)
         
         if self.align == "left":
             text_rect = text_surf.get_rect(midleft=(self.x + 5, self.y + self.height // 2))
@@ -798,7 +799,7 @@ class ListBox(UIElement):
         self.hover_color = hover_color
         self.select_color = select_color
         self.text_color = text_color
-        self.font = pygame.font.SysFont(None, 24)
+        self.font = get_font(None, 24)
         self.scroll_y = 0
         self.item_height = 30
         self.hovered_index = -1
@@ -845,7 +846,7 @@ class ListBox(UIElement):
             pygame.draw.rect(screen, item_bg, item_rect)
             
             # Draw item text
-            text_surf = self.font.render(item_text, True, self.text_color)
+            text_surf = render_text(self.font, item_text, self.text_color)
             text_rect = text_surf.get_rect(midleft=(self.x + 10, self.y + i * self.item_height + self.item_height // 2))
             screen.blit(text_surf, text_rect)
             
@@ -907,7 +908,7 @@ class ToggleButton(UIElement):
         self.bg_color = bg_color
         self.active_color = active_color
         self.text_color = text_color
-        self.font = pygame.font.SysFont(None, 20)
+        self.font = get_font(None, 20)
         self.hovered = False
         
     def draw(self, screen):
@@ -926,7 +927,7 @@ class ToggleButton(UIElement):
         
         # Draw text
         display_text = f"{self.text}: {self.current_value}"
-        text_surface = self.font.render(display_text, True, self.text_color)
+        text_surface = render_text(self.font, display_text, self.text_color)
         text_rect = text_surface.get_rect(center=self.rect.center)
         screen.blit(text_surface, text_rect)
         
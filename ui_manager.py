@@ -2,6 +2,7 @@
 import pygame
 import config
 from ui_elements import Button, Label, Slider, TextInput, ToggleButton
+from text_cache import render_text
 
 class UIManager:
     def __init__(self, app_ref):
@@ -48,6 +49,9 @@ class UIManager:
         # Token info state
         self.active_token_tab = 'stats'
 
+        # Screen areas changed since the last draw (retained rendering)
+        self.dirty_rects = []
+
         # --- Create Base UI Elements ---
         self.create_main_ui()
         
@@ -559,16 +563,64 @@ class UIManager:
             self.close_menu()
             self.active_menu = menu_name
             self.elements.extend(self.menu_items[menu_name])
+            self.mark_dirty(self._get_menu_panel_rect(menu_name))
 
     def close_menu(self):
         """Removes submenu items from the active elements list."""
         if self.active_menu and self.active_menu in self.menu_items:
             submenu = self.menu_items[self.active_menu]
             self.elements = [elem for elem in self.elements if elem not in submenu]
+            self.mark_dirty(self._get_menu_panel_rect(self.active_menu))
         self.active_menu = None
 
+    def mark_dirty(self, rect=None):
+        """Queue a screen area for redraw, the whole screen if rect is None."""
+        if rect is None:
+            surface = pygame.display.get_surface()
+            rect = surface.get_rect() if surface else pygame.Rect(0, 0, config.SCREEN_WIDTH, config.SCREEN_HEIGHT)
+        self.dirty_rects.append(pygame.Rect(rect))
+
+    def get_dirty_rects(self):
+        """Return and reset the areas queued for redraw."""
+        rects = self.dirty_rects
+        self.dirty_rects = []
+        return rects
+
+    def _interactive_elements(self):
+        """Elements that can change appearance on mouse motion."""
+        elements = list(self.elements)
+        if self.active_menu:
+            elements.extend(self.menu_items.get(self.active_menu, []))
+        if self.app.app_mode == "MAP_CREATOR":
+            elements.extend(self.creator_elements)
+            elements.extend(getattr(self, 'creator_grid_controls', []))
+        return [element for element in elements if element is not None and hasattr(element, 'rect')]
+
+    @staticmethod
+    def _element_state(element):
+        """What an element's appearance depends on, to see whether an event changed it."""
+        return (element.rect.copy(), getattr(element, 'hovered', None), getattr(element, 'dragging', False),
+                getattr(element, 'active', None), getattr(element, 'visible', None), getattr(element, 'text', None),
+                getattr(element, 'value', None), getattr(element, 'color', None))
+
     def process_event(self, event):
         """Handle UI events. Returns an action if one should be taken."""
+        # Redraw only the elements the event changed, appeared or disappeared
+        before = {id(e): (e, self._element_state(e)) for e in self._interactive_elements()}
+        action = self._process_event(event)
+        after = self._interactive_elements()
+        for element in after:
+            old = before.pop(id(element), None)
+            state = self._element_state(element)
+            if old is None or old[1] != state or state[2]:
+                if old is not None:
+                    self.mark_dirty(old[1][0])
+                self.mark_dirty(element.rect)
+        for element, state in before.values():
+            self.mark_dirty(state[0])
+        return action
+
+    def _process_event(self, event):
         if event.type == pygame.MOUSEMOTION:
             for menu, items in self.menu_items.items():
                 if self.active_menu == menu:
@@ -652,6 +704,8 @@ class UIManager:
 
     def _update_dice_buttons(self):
         """Update the visual state of dice type and number buttons"""
+        for btn in list(self.dice_type_buttons.values()) + list(self.num_dice_buttons.values()):
+            self.mark_dirty(btn.rect)
         for dice_type, btn in self.dice_type_buttons.items():
             if dice_type == self.selected_dice_type:
                 btn.color = (120, 120, 200)
@@ -667,6 +721,7 @@ class UIManager:
     def _update_roll_button(self):
         """Update the roll button to reflect current selections"""
         self.roll_button.text = f"Roll {self.num_dice} {self.selected_dice_type}"
+        self.mark_dirty(self.roll_button.rect)
 
     def _get_menu_panel_rect(self, menu_name):
         """Calculate the rectangle for a dropdown menu panel."""
@@ -750,7 +805,7 @@ class UIManager:
                     if 'title' in self.grid_control_panel:
                         title_text = self.grid_control_panel['title']
                         if hasattr(config, 'DEFAULT_FONT') and config.DEFAULT_FONT is not None:
-                            title_surface = config.DEFAULT_FONT.render(title_text, True, config.UI_TEXT_COLOR)
+                            title_surface = render_text(config.DEFAULT_FONT, title_text, config.UI_TEXT_COLOR)
                             surface.blit(title_surface, (self.grid_control_panel['rect'].left + 10, self.grid_control_panel['rect'].top + 5))
                     
                     # Draw grid control sliders
@@ -771,9 +826,9 @@ class UIManager:
                     self.creator_map_name_label["text"] = f"Map: {current_name}{suffix}" if current_name else "Untitled Map"
                     
                     if "font" in self.creator_map_name_label and self.creator_map_name_label["font"] is not None:
-                        text_surface = self.creator_map_name_label["font"].render(
-                            self.creator_map_name_label["text"], 
-                            True, 
+                        text_surface = render_text(
+                            self.creator_map_name_label["font"],
+                            self.creator_map_name_label["text"],
                             self.creator_map_name_label["color"]
                         )
                         surface.blit(text_surface, self.creator_map_name_label["rect"].topleft)
@@ -792,6 +847,7 @@ class UIManager:
 
     def update_token_info(self, token_data):
         """Update token information display."""
+        self.mark_dirty(self.token_info_panel_rect)
         if token_data:
             stats = token_data.get('current_stats', {})
             base_stats = token_data.get('base_stats', {})
@@ -814,9 +870,11 @@ class UIManager:
         """Update timeline display."""
         if self.timeline_label:
             self.timeline_label.text = f"Time: {current_turn}"
+            self.mark_dirty(self.timeline_label.rect)
 
     def update_token_list(self, tokens_on_map):
         """Update the token list display."""
+        self.mark_dirty(self.right_panel_rect)
         # Clear existing token list elements
         self.elements = [e for e in self.elements if e not in self.token_list_elements]
         self.token_list_elements.clear()
@@ -831,8 +889,9 @@ class UIManager:
                  break
 
              name = token_data.get('name', 'Unknown')
-             instance_id = token_data.get('instance_id')
-             moved = token_data.get('current_stats', {}).get('HasMoved', False)
+             # Token dicts or the MapTokenRecords of the token state store
+             instance_id = token_data.get('instance_id', token_data.get('map_token_id'))
+             moved = token_data.get('current_stats', {}).get('HasMoved', token_data.get('has_moved', False))
 
              token_button = Button(
                  self.right_panel_rect.left + 5, list_item_y, list_width, item_height,
@@ -846,7 +905,7 @@ class UIManager:
              moved_indicator = Label(
                  self.right_panel_rect.left + list_width - 30, list_item_y, 20, item_height,
                  "✓" if moved else "✗",
-                 color=(100, 200, 100) if moved else (200, 100, 100)
+                 text_color=(100, 200, 100) if moved else (200, 100, 100)
              )
 
              self.elements.append(token_button)
@@ -858,6 +917,7 @@ class UIManager:
 
     def update_dice_results(self, results):
         """Update the dice roller results display"""
+        self.mark_dirty(self.dice_result_label.rect)
         if isinstance(results, str):
             self.dice_result_label.text = f"Results: {results}"
         elif isinstance(results, list):
@@ -877,4 +937,5 @@ class UIManager:
     def update_creator_map_name(self, name):
         """Update the map name displayed in the creator."""
         if hasattr(self, 'creator_map_name_label'):
-            self.creator_map_name_label["text"] = f"Map: {name}" if name else "Untitled Map"
\ No newline at end of file
+            self.creator_map_name_label["text"] = f"Map: {name}" if name else "Untitled Map"
+            self.mark_dirty(self.creator_map_name_label["rect"])
\ No newline at end of file